@@ -0,0 +1,59 @@
+"""
+Compare two benchmark reports written by benchmarks/run_benchmarks.py.
+
+Prints the p50 change of every (data source, scale, stage) present in both reports and
+exits with status 1 if any stage got slower than the threshold allows, so it can gate CI.
+
+    python -m benchmarks.compare baseline.json candidate.json --threshold 0.15
+"""
+
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+ResultKey = Tuple[str, int, str]
+
+
+def load_results(path: str) -> Dict[ResultKey, Dict[str, Any]]:
+    with open(path, 'r', encoding='utf-8') as f:
+        report = json.load(f)
+    return {(r["data_source"], r["scale"], r["stage"]): r for r in report["results"]}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Compare two benchmark reports.")
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Allowed relative p50 slowdown (default: 0.15)")
+    parser.add_argument("--min-ms", type=float, default=5.0,
+                        help="Ignore changes smaller than this many milliseconds, which are within timer noise")
+    args = parser.parse_args(argv)
+
+    baseline = load_results(args.baseline)
+    candidate = load_results(args.candidate)
+
+    regressions = 0
+    print(f"{'data source':<26}{'scale':>6}  {'stage':<16}{'base ms':>11}{'new ms':>11}{'change':>9}")
+    for key in sorted(baseline.keys() & candidate.keys()):
+        old, new = baseline[key], candidate[key]
+        prefix = f"{key[0]:<26}{key[1]:>6}  {key[2]:<16}"
+        if old["error"] or new["error"]:
+            status = "fixed" if old["error"] and not new["error"] else "ERROR" if new["error"] else "still failing"
+            print(f"{prefix}{status:>31}")
+            regressions += bool(new["error"] and not old["error"])
+            continue
+        change = (new["p50_ms"] - old["p50_ms"]) / old["p50_ms"] if old["p50_ms"] else 0.0
+        slower = change > args.threshold and new["p50_ms"] - old["p50_ms"] > args.min_ms
+        regressions += slower
+        print(f"{prefix}{old['p50_ms']:>11,.1f}{new['p50_ms']:>11,.1f}{change:>+9.0%}{'  REGRESSION' if slower else ''}")
+
+    for key in sorted(baseline.keys() - candidate.keys()):
+        print(f"missing from candidate: {' / '.join(map(str, key))}")
+
+    print(f"\n{regressions} regression(s) beyond {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
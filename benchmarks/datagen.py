@@ -0,0 +1,500 @@
+"""
+Synthetic Data Generator
+
+Generates realistic data for the reporting schema that data_logic/sql/ reads: the workspace,
+storefront, keyword and product dimensions and the daily metric tables
+(`metric_share_of_search_storefront`, `metric_share_of_search_product`,
+`onsite_storefront_keyword_ads_performance`, `kw_discovery_storefront_keyword_perf`,
+`ads_ops_ads_campaigns_performance`, `dashboard_ads`).
+
+The data is skewed the way production data is:
+- workspace sizes follow a Zipf distribution, so workspace 1 is the largest;
+- keyword popularity is Zipf-distributed, so a few keywords are tracked by most storefronts
+  and the long tail by few;
+- the number of keywords per storefront and the search volumes are log-normal;
+- long-tail keywords only have metric rows on some days, popular ones on nearly every day;
+- metrics have a weekly cycle.
+
+Tables are produced as a stream of column chunks, at most one storefront's worth of rows at
+a time, so memory stays flat whatever the size of the data set. Output is either the SQLite
+stand-in database of the benchmarks or one Parquet file per table, e.g. for loading into a
+SingleStore development cluster:
+
+    python -m benchmarks.datagen --storefronts 2000 --keywords 200000 --days 90 --sqlite standin.db
+    python -m benchmarks.datagen --scale 50 --parquet-dir ./synthetic
+"""
+
+import argparse
+import time
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+# Last day of generated data. Fixed, so data sets built on different days are identical
+DEFAULT_END_DATE = date(2026, 1, 30)
+
+# Ads-ops storefront IDs are offset from onsite storefront IDs, so joining on the wrong one finds nothing
+ADS_OPS_ID_OFFSET = 1000
+
+# (country_code, marketplace_code, country_name, marketplace_name)
+MARKETS = [
+    ("VN", "SHOPEE", "Vietnam", "Shopee"),
+    ("ID", "SHOPEE", "Indonesia", "Shopee"),
+    ("ID", "TOKOPEDIA", "Indonesia", "Tokopedia"),
+    ("PH", "LAZADA", "Philippines", "Lazada"),
+    ("TH", "LAZADA", "Thailand", "Lazada"),
+]
+DEVICE_TYPES = ["Mobile", "Desktop"]
+DISPLAY_TYPES = ["Organic", "Paid"]
+PRODUCT_POSITIONS = ["-1", "4", "10"]
+
+# Share of days with data for the most popular and for the least popular keyword
+_MAX_ACTIVITY = 0.98
+_MIN_ACTIVITY = 0.2
+
+# Relative metric volume per weekday, Monday first
+_WEEKLY_CYCLE = np.array([1.0, 0.97, 0.95, 0.98, 1.05, 1.2, 1.15])
+
+Chunk = Dict[str, object]  # Column name -> numpy array or list, all of equal length
+
+
+@dataclass
+class GeneratorConfig:
+    """Size and shape of a synthetic data set."""
+    workspaces: int = 5
+    storefronts: int = 50
+    keywords: int = 5_000
+    days: int = 30
+    end_date: date = DEFAULT_END_DATE
+    # Median number of keywords a storefront tracks (log-normally distributed)
+    keywords_per_storefront: int = 100
+    products_per_storefront: int = 20
+    campaigns_per_storefront: int = 5
+    # Zipf exponents: larger means more skew
+    workspace_skew: float = 1.2
+    keyword_skew: float = 1.05
+    seed: int = 0
+    # First day of generated data, derived from `end_date` and `days`
+    start_date: date = field(init=False)
+
+    def __post_init__(self):
+        self.start_date = self.end_date - timedelta(days=self.days - 1)
+
+    @classmethod
+    def for_scale(cls, scale: int, **overrides) -> "GeneratorConfig":
+        """A configuration whose row counts grow linearly with `scale`."""
+        params = dict(
+            workspaces=3 + scale,
+            storefronts=10 * scale,
+            keywords=400 * scale,
+            keywords_per_storefront=40,
+            products_per_storefront=10,
+            campaigns_per_storefront=3,
+        )
+        params.update(overrides)
+        return cls(**params)
+
+
+@dataclass
+class _Universe:
+    """The dimension data every fact table is generated from."""
+    storefront_workspace: np.ndarray  # Workspace ID per storefront (index = storefront ID - 1)
+    storefront_market: np.ndarray  # Index into MARKETS per storefront
+    storefront_keywords: List[np.ndarray]  # Keyword IDs tracked per storefront, most popular first
+    keyword_popularity: np.ndarray  # Normalized popularity per keyword (index = keyword ID - 1), max 1
+    keyword_volume: np.ndarray  # Baseline daily search volume per keyword
+    days: np.ndarray  # 'YYYY-MM-DD' strings
+    weekday_factor: np.ndarray  # Weekly cycle factor per day
+
+
+def generate_tables(config: GeneratorConfig) -> Iterator[Tuple[str, Chunk]]:
+    """Yield (table name, column chunk) pairs for every table; a table may span many chunks."""
+    rng = np.random.default_rng(config.seed)
+    universe = _build_universe(config, rng)
+    yield from _dimension_tables(config, universe, rng)
+    for storefront_index in range(config.storefronts):
+        yield from _storefront_facts(config, universe, storefront_index, rng)
+
+
+def _zipf_weights(count: int, exponent: float) -> np.ndarray:
+    weights = 1.0 / np.arange(1, count + 1) ** exponent
+    return weights / weights.sum()
+
+
+def _build_universe(config: GeneratorConfig, rng: np.random.Generator) -> _Universe:
+    # Every workspace gets one storefront; the rest go to workspaces by Zipf weight
+    workspace_of = np.concatenate([
+        np.arange(1, min(config.workspaces, config.storefronts) + 1),
+        rng.choice(np.arange(1, config.workspaces + 1), size=max(config.storefronts - config.workspaces, 0),
+                   p=_zipf_weights(config.workspaces, config.workspace_skew)),
+    ])
+
+    keyword_weights = _zipf_weights(config.keywords, config.keyword_skew)
+    popularity = keyword_weights / keyword_weights[0]
+    counts = np.clip(
+        rng.lognormal(np.log(config.keywords_per_storefront), 0.8, size=config.storefronts).astype(int),
+        1, config.keywords,
+    )
+    storefront_keywords = []
+    for count in counts:
+        chosen = rng.choice(config.keywords, size=count, replace=False, p=keyword_weights) + 1
+        storefront_keywords.append(np.sort(chosen))
+
+    days = np.array([(config.start_date + timedelta(days=i)).isoformat() for i in range(config.days)], dtype=object)
+    weekday_factor = _WEEKLY_CYCLE[[(config.start_date + timedelta(days=i)).weekday() for i in range(config.days)]]
+    return _Universe(
+        storefront_workspace=workspace_of,
+        storefront_market=rng.integers(0, len(MARKETS), size=config.storefronts),
+        storefront_keywords=storefront_keywords,
+        keyword_popularity=popularity,
+        # Popular keywords are searched more, with log-normal noise around the trend
+        keyword_volume=np.round(20 + 200_000 * popularity ** 0.8 * rng.lognormal(0, 0.5, size=config.keywords)),
+        days=days,
+        weekday_factor=weekday_factor,
+    )
+
+
+def _dimension_tables(config: GeneratorConfig, universe: _Universe, rng: np.random.Generator) -> Iterator[Tuple[str, Chunk]]:
+    storefront_ids = np.arange(1, config.storefronts + 1)
+    keyword_ids = np.arange(1, config.keywords + 1)
+    markets = [MARKETS[i] for i in universe.storefront_market]
+    num_companies = max(3, config.storefronts // 10)
+    company_of = rng.integers(1, num_companies + 1, size=config.storefronts)
+
+    yield "global_company", {"id": np.arange(1, num_companies + 1), "name": [f"Company {i}" for i in range(1, num_companies + 1)]}
+    yield "passport_workspace", {"id": np.arange(1, config.workspaces + 1)}
+    yield "ads_ops_storefront", {
+        "id": storefront_ids + ADS_OPS_ID_OFFSET,
+        "name": [f"Store {s}" for s in storefront_ids],
+        "country_code": [m[0] for m in markets],
+        "marketplace_code": [m[1] for m in markets],
+        "global_company_id": company_of,
+    }
+    yield "onsite_storefront", {
+        "id": storefront_ids,
+        "storefront_sid": [f"sid{s}" for s in storefront_ids],
+        "ads_ops_storefront_id": storefront_ids + ADS_OPS_ID_OFFSET,
+        "country_code": [m[0] for m in markets],
+        "marketplace_code": [m[1] for m in markets],
+        "storefront_name": [f"Store {s}" for s in storefront_ids],
+        "udc__search_group_tag": rng.choice(["beauty", "fmcg", "electronics", "fashion"], size=config.storefronts).tolist(),
+        "storefront_type": rng.choice(["mall", "official", "regular"], size=config.storefronts).tolist(),
+        "shop_created_at": ["2020-01-01"] * config.storefronts,
+        "global_company_id": company_of,
+        "storefront_url": [f"https://shop.example/{s}" for s in storefront_ids],
+        "country_name": [m[2] for m in markets],
+        "marketplace_name": [m[3] for m in markets],
+    }
+    yield "kw_discovery_storefront_workspace", {"storefront_id": storefront_ids, "workspace_id": universe.storefront_workspace}
+    yield "onsite_storefront_workspace", {
+        "storefront_id": storefront_ids,
+        "workspace_id": universe.storefront_workspace,
+        "ads_ops_storefront_id": storefront_ids + ADS_OPS_ID_OFFSET,
+    }
+
+    keyword_market = rng.integers(0, len(MARKETS), size=config.keywords)
+    yield "onsite_keyword_sharded", {
+        "id": keyword_ids,
+        "keyword": [f"keyword {k}" for k in keyword_ids],
+        "marketplace_name": [MARKETS[i][3] for i in keyword_market],
+        "country_name": [MARKETS[i][2] for i in keyword_market],
+        "keyword_type": rng.choice(["generic", "branded", "competitor"], size=config.keywords, p=[0.7, 0.2, 0.1]).tolist(),
+        "status": rng.choice(["active", "inactive"], size=config.keywords, p=[0.9, 0.1]).tolist(),
+        "first_interaction_at": ["2024-01-01"] * config.keywords,
+    }
+    yield "onsite_keyword", {"id": keyword_ids, "keyword": [f"keyword {k}" for k in keyword_ids]}
+
+    # A workspace holds the keywords of all its storefronts
+    workspace_ids, workspace_keyword_ids = [], []
+    for workspace_id in range(1, config.workspaces + 1):
+        members = np.flatnonzero(universe.storefront_workspace == workspace_id)
+        keywords = np.unique(np.concatenate([universe.storefront_keywords[i] for i in members])) if len(members) else np.array([], dtype=int)
+        workspace_ids.append(np.full(len(keywords), workspace_id))
+        workspace_keyword_ids.append(keywords)
+    workspace_ids = np.concatenate(workspace_ids)
+    link_ids = np.arange(1, len(workspace_ids) + 1)
+    yield "onsite_keyword_workspace", {"id": link_ids, "workspace_id": workspace_ids, "keyword_id": np.concatenate(workspace_keyword_ids)}
+
+    num_tags = 12
+    yield "onsite_workspace_tag", {"id": np.arange(1, num_tags + 1), "name": [f"Tag {t}" for t in range(1, num_tags + 1)]}
+    tagged = link_ids[rng.random(len(link_ids)) < 0.7]
+    yield "onsite_keyword_workspace_tag", {
+        "keyword_workspace_id": tagged,
+        "workspace_tag_id": rng.choice(num_tags, size=len(tagged), p=_zipf_weights(num_tags, 1.0)) + 1,
+    }
+
+
+def _activity_mask(universe: _Universe, keyword_ids: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """Which (keyword, day) cells have data: popular keywords nearly every day, the long tail rarely."""
+    probability = _MIN_ACTIVITY + (_MAX_ACTIVITY - _MIN_ACTIVITY) * universe.keyword_popularity[keyword_ids - 1] ** 0.25
+    return rng.random(len(keyword_ids)) < probability
+
+
+def _storefront_facts(config: GeneratorConfig, universe: _Universe, index: int, rng: np.random.Generator) -> Iterator[Tuple[str, Chunk]]:
+    storefront_id = index + 1
+    ads_ops_id = storefront_id + ADS_OPS_ID_OFFSET
+    keywords = universe.storefront_keywords[index]
+    num_keywords, num_days = len(keywords), config.days
+
+    yield "kw_discovery_storefront_keyword", {
+        "storefront_id": np.full(num_keywords, storefront_id),
+        "keyword_id": keywords,
+        "keyword_type": rng.choice(["generic", "branded", "irrelevant"], size=num_keywords, p=[0.75, 0.15, 0.1]).tolist(),
+        "operational_status": rng.choice(["active", "paused"], size=num_keywords, p=[0.85, 0.15]).tolist(),
+        "category_name": rng.choice(["Skincare", "Makeup", "Haircare", "Snacks", "Phones"], size=num_keywords).tolist(),
+        "active_skus": rng.integers(0, 50, size=num_keywords),
+        "shop_ads_status": rng.choice(["on", "off"], size=num_keywords).tolist(),
+        "product_ads_status": rng.choice(["on", "off"], size=num_keywords).tolist(),
+        "translation": [None] * num_keywords,
+        "brand_name": [f"Brand {storefront_id}"] * num_keywords,
+        "tag_1": [None] * num_keywords,
+        "tag_2": [None] * num_keywords,
+        "tag_3": [None] * num_keywords,
+        "note_1": [None] * num_keywords,
+        "note_2": [None] * num_keywords,
+        "storefront_division": ["Division"] * num_keywords,
+        "peak_day_ads_gmv": np.round(rng.lognormal(5, 1.5, size=num_keywords), 2),
+        "peak_day_bau_ads_gmv": np.round(rng.lognormal(4, 1.5, size=num_keywords), 2),
+    }
+
+    # Keyword x day grid of this storefront, restricted to the cells with data
+    grid_keywords = np.repeat(keywords, num_days)
+    grid_days = np.tile(np.arange(num_days), num_keywords)
+    active = _activity_mask(universe, grid_keywords, rng)
+    grid_keywords, grid_days = grid_keywords[active], grid_days[active]
+    rows = len(grid_keywords)
+    dates = universe.days[grid_days]
+    volume = universe.keyword_volume[grid_keywords - 1] * universe.weekday_factor[grid_days] * rng.lognormal(0, 0.2, size=rows)
+    impression = np.round(volume * rng.beta(2, 8, size=rows))
+    click = rng.binomial(impression.astype(np.int64), 0.02)
+    cpc = rng.lognormal(-1, 0.5, size=rows)
+    cost = np.round(click * cpc, 2)
+    orders = rng.binomial(click, 0.05)
+    gmv = np.round(orders * rng.lognormal(3, 0.8, size=rows), 2)
+
+    yield "kw_discovery_storefront_keyword_perf", {
+        "storefront_id": np.full(rows, storefront_id),
+        "keyword_id": grid_keywords,
+        "created_datetime": dates,
+        "est_daily_search_volume": np.round(volume),
+        "ads_gmv": gmv,
+        "cost": cost,
+        "click": click,
+        "impression": impression,
+        "ads_item_sold": orders,
+        "current_avg_bidding_price": np.round(cpc, 3),
+        "suggested_bidding_price": np.round(cpc * rng.uniform(0.8, 1.4, size=rows), 3),
+        "company_competitor": [None] * rows,
+        "product_competitor": [None] * rows,
+        "storefront_competitor": [None] * rows,
+    }
+
+    # Share of search is tracked for every device and display type
+    combos = len(DEVICE_TYPES) * len(DISPLAY_TYPES)
+    yield "metric_share_of_search_storefront", {
+        "created_datetime": np.repeat(dates, combos),
+        "keyword_id": np.repeat(grid_keywords, combos),
+        "storefront_id": np.full(rows * combos, storefront_id),
+        "timing": ["daily"] * (rows * combos),
+        "device_type": np.tile(np.repeat(DEVICE_TYPES, len(DISPLAY_TYPES)), rows).tolist(),
+        "display_type": np.tile(DISPLAY_TYPES, rows * len(DEVICE_TYPES)).tolist(),
+        "product_position": rng.choice(PRODUCT_POSITIONS, size=rows * combos).tolist(),
+        "share_of_search": np.round(rng.beta(1, 6, size=rows * combos), 4),
+        "search_volume": np.repeat(np.round(volume), combos),
+        "suggested_bidding_price": np.round(np.repeat(cpc, combos) * rng.uniform(0.8, 1.4, size=rows * combos), 3),
+    }
+
+    # About half of the tracked keywords are advertised on
+    advertised = rng.random(rows) < 0.5
+    n = int(advertised.sum())
+    ad_click, ad_impression, ad_orders = click[advertised], impression[advertised], orders[advertised]
+    yield "onsite_storefront_keyword_ads_performance", {
+        "ads_ops_storefront_id": np.full(n, ads_ops_id),
+        "keyword_id": grid_keywords[advertised],
+        "tool_id": rng.integers(1, 4, size=n),
+        "created_datetime": dates[advertised],
+        "timing": ["daily"] * n,
+        "ads_order": ad_orders,
+        "cost": cost[advertised],
+        "direct_order": rng.binomial(ad_orders, 0.6),
+        "ads_gmv": gmv[advertised],
+        "direct_atc": rng.binomial(ad_click, 0.03),
+        "direct_gmv": np.round(gmv[advertised] * rng.uniform(0.4, 0.8, size=n), 2),
+        "direct_item_sold": rng.binomial(ad_orders, 0.7),
+        "click": ad_click,
+        "atc": rng.binomial(ad_click, 0.08),
+        "ads_item_sold": ad_orders,
+        "impression": ad_impression,
+        "active_skus": rng.integers(1, 50, size=n),
+        "direct_conversion": np.round(rng.beta(1, 30, size=n), 4),
+        "conversion": np.round(rng.beta(1, 20, size=n), 4),
+        "active_shops": rng.integers(1, 5, size=n),
+    }
+
+    # Storefront-level ads dashboard: one row per day, the sum of a busy storefront's ads
+    scale = rng.lognormal(0, 1)
+    dashboard_click = rng.poisson(500 * scale * universe.weekday_factor)
+    dashboard_orders = rng.binomial(dashboard_click, 0.04)
+    dashboard_gmv = np.round(dashboard_orders * rng.lognormal(3, 0.5, size=num_days), 2)
+    yield "dashboard_ads", {
+        "storefront_id": np.full(num_days, ads_ops_id),
+        "created_datetime": universe.days,
+        "gmv": dashboard_gmv,
+        "cost": np.round(dashboard_click * rng.lognormal(-1, 0.3, size=num_days), 2),
+        "click": dashboard_click,
+        "impression": dashboard_click * rng.integers(20, 80, size=num_days),
+        "ads_order": dashboard_orders,
+        "direct_gmv": np.round(dashboard_gmv * 0.6, 2),
+        "direct_ads_order": rng.binomial(dashboard_orders, 0.6),
+        "direct_item_sold": rng.binomial(dashboard_orders, 0.7),
+        "item_sold": dashboard_orders + rng.poisson(1, size=num_days),
+    }
+
+    yield from _campaign_facts(config, universe, ads_ops_id, rng)
+    yield from _product_facts(config, universe, storefront_id, keywords, rng)
+
+
+def _campaign_facts(config: GeneratorConfig, universe: _Universe, ads_ops_id: int, rng: np.random.Generator) -> Iterator[Tuple[str, Chunk]]:
+    num_campaigns = 1 + rng.poisson(config.campaigns_per_storefront - 1) if config.campaigns_per_storefront > 1 else 1
+    campaign_ids = ads_ops_id * 1000 + np.arange(num_campaigns)
+    yield "ads_ops_ads_campaigns", {
+        "id": campaign_ids,
+        "storefront_id": np.full(num_campaigns, ads_ops_id),
+        "general_tag": rng.choice(["always-on", "mega-sale", "launch"], size=num_campaigns).tolist(),
+        "country_code": ["VN"] * num_campaigns,
+        "marketplace_code": ["SHOPEE"] * num_campaigns,
+        "tool_code": rng.choice(["search", "discovery", "shop"], size=num_campaigns).tolist(),
+        "name": [f"Campaign {c}" for c in campaign_ids],
+        "note": [None] * num_campaigns,
+        "status": rng.choice(["running", "paused", "ended"], size=num_campaigns, p=[0.6, 0.2, 0.2]).tolist(),
+        "target": ["gmv"] * num_campaigns,
+        "objective": rng.choice(["sales", "traffic"], size=num_campaigns).tolist(),
+        "ads_status": ["ongoing"] * num_campaigns,
+        "budget_distributed_method": ["even"] * num_campaigns,
+        "daily_budget": np.round(rng.lognormal(4, 1, size=num_campaigns), 2),
+        "assessment": [None] * num_campaigns,
+        "timeline_from": [config.start_date.isoformat()] * num_campaigns,
+        "timeline_to": [(config.end_date + timedelta(days=90)).isoformat()] * num_campaigns,
+        "first_search_slot": rng.integers(0, 2, size=num_campaigns),
+        "max_bidding_price": np.round(rng.uniform(0.5, 5, size=num_campaigns), 2),
+    }
+
+    grid_campaigns = np.repeat(campaign_ids, config.days)
+    grid_days = np.tile(np.arange(config.days), num_campaigns)
+    # Some campaigns are paused on some days
+    active = rng.random(len(grid_campaigns)) < 0.85
+    grid_campaigns, grid_days = grid_campaigns[active], grid_days[active]
+    rows = len(grid_campaigns)
+    click = rng.poisson(80 * universe.weekday_factor[grid_days])
+    yield "ads_ops_ads_campaigns_performance", {
+        "ads_campaign_id": grid_campaigns,
+        "created_datetime": universe.days[grid_days],
+        "click": click,
+        "impression": click * rng.integers(20, 80, size=rows),
+        "ads_gmv": np.round(rng.binomial(click, 0.04) * rng.lognormal(3, 0.5, size=rows), 2),
+        "cost": np.round(click * rng.lognormal(-1, 0.3, size=rows), 2),
+    }
+
+
+def _product_facts(config: GeneratorConfig, universe: _Universe, storefront_id: int, keywords: np.ndarray,
+                   rng: np.random.Generator) -> Iterator[Tuple[str, Chunk]]:
+    num_products = max(1, rng.poisson(config.products_per_storefront))
+    product_ids = storefront_id * 10_000 + np.arange(num_products)
+    market = MARKETS[universe.storefront_market[storefront_id - 1]]
+    yield "onsite_product", {
+        "id": product_ids,
+        "storefront_id": np.full(num_products, storefront_id),
+        "marketplace_name": [market[3]] * num_products,
+        "product_url": [f"https://shop.example/{storefront_id}/{p}" for p in product_ids],
+        "historical_sold": rng.zipf(1.8, size=num_products).clip(max=1_000_000),
+        "brand_name": [f"Brand {storefront_id}"] * num_products,
+        "product_name": [f"Product {p}" for p in product_ids],
+        "selling_price": np.round(rng.lognormal(3, 1, size=num_products), 2),
+        "sold": rng.zipf(2.0, size=num_products).clip(max=100_000),
+        "discount": np.round(rng.uniform(0, 0.5, size=num_products), 2),
+    }
+
+    # Products rank for the storefront's most popular keywords only
+    top_keywords = keywords[np.argsort(-universe.keyword_popularity[keywords - 1])[:5]]
+    grid_products = np.repeat(product_ids, len(top_keywords) * config.days)
+    grid_keywords = np.tile(np.repeat(top_keywords, config.days), num_products)
+    grid_days = np.tile(np.arange(config.days), num_products * len(top_keywords))
+    active = _activity_mask(universe, grid_keywords, rng) & (rng.random(len(grid_products)) < 0.5)
+    rows = int(active.sum())
+    yield "metric_share_of_search_product", {
+        "created_datetime": universe.days[grid_days[active]],
+        "keyword_id": grid_keywords[active],
+        "product_id": grid_products[active],
+        "timing": ["daily"] * rows,
+        "device_type": rng.choice(DEVICE_TYPES, size=rows).tolist(),
+        "display_type": rng.choice(DISPLAY_TYPES, size=rows).tolist(),
+        "slot": rng.integers(1, 61, size=rows),
+    }
+
+
+# --- Output ---
+def write_parquet(directory: Path, tables: Iterator[Tuple[str, Chunk]]) -> Dict[str, int]:
+    """Write one Parquet file per table, appending chunks as row groups. Returns the row count per table."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    writers: Dict[str, "pq.ParquetWriter"] = {}
+    counts: Dict[str, int] = {}
+    try:
+        for table, chunk in tables:
+            arrow_table = pa.table({name: np.asarray(values) if isinstance(values, np.ndarray) else pa.array(values)
+                                    for name, values in chunk.items()})
+            writer = writers.get(table)
+            if writer is None:
+                writer = writers[table] = pq.ParquetWriter(directory / f"{table}.parquet", arrow_table.schema, compression="zstd")
+            else:
+                arrow_table = arrow_table.cast(writer.schema)
+            writer.write_table(arrow_table)
+            counts[table] = counts.get(table, 0) + arrow_table.num_rows
+    finally:
+        for writer in writers.values():
+            writer.close()
+    return counts
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate synthetic data for the reporting schema.")
+    parser.add_argument("--scale", type=int, help="Preset sizes growing linearly with this factor (overridden by the options below)")
+    parser.add_argument("--workspaces", type=int)
+    parser.add_argument("--storefronts", type=int)
+    parser.add_argument("--keywords", type=int)
+    parser.add_argument("--keywords-per-storefront", type=int)
+    parser.add_argument("--days", type=int)
+    parser.add_argument("--end-date", type=date.fromisoformat)
+    parser.add_argument("--workspace-skew", type=float)
+    parser.add_argument("--keyword-skew", type=float)
+    parser.add_argument("--seed", type=int, default=0)
+    output = parser.add_mutually_exclusive_group(required=True)
+    output.add_argument("--sqlite", type=Path, help="Write a SQLite stand-in database to this file")
+    output.add_argument("--parquet-dir", type=Path, help="Write one Parquet file per table to this directory")
+    args = parser.parse_args(argv)
+
+    overrides = {name: getattr(args, name) for name in (
+        "workspaces", "storefronts", "keywords", "keywords_per_storefront", "days", "end_date",
+        "workspace_skew", "keyword_skew", "seed",
+    ) if getattr(args, name) is not None}
+    config = GeneratorConfig.for_scale(args.scale, **overrides) if args.scale else GeneratorConfig(**overrides)
+
+    start = time.perf_counter()
+    if args.sqlite:
+        from benchmarks.standin import write_standin_database
+        counts = write_standin_database(args.sqlite, generate_tables(config))
+    else:
+        counts = write_parquet(args.parquet_dir, generate_tables(config))
+    for table, count in counts.items():
+        print(f"{table:<45}{count:>14,}")
+    print(f"{sum(counts.values()):,} rows in {time.perf_counter() - start:.1f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Benchmark Harness
+
+Runs every data source through the stages of an export against a local stand-in database
+(see benchmarks/standin.py) at several scale factors, and reports per-stage latency,
+throughput and peak Python memory:
+
+- count:    the exact row count query (`get_data('count', ...)`)
+- probe:    the bounded row count probe of the admission check (`get_data('probe', ...)`)
+- prepare:  evaluating the data query into the result cache (`materialize_result`)
+- preview:  reading the first preview page from the materialized result
+- export_*: encoding the materialized result in each export format
+
+Caches are cold on every repeat unless --warm-cache is given. Each scale factor runs in its
+own subprocess, so the database URL and the caches of one scale never leak into another.
+
+    python -m benchmarks.run_benchmarks --scales 1 2 4 --repeats 5 --output bench.json
+    python -m benchmarks.compare baseline.json bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from benchmarks.standin import END_DATE, START_DATE, WORKSPACE_ID, benchmark_storefront_ids, build_standin_database
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+ALL_FORMATS = ("csv", "parquet", "feather")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = _parse_args(argv)
+    if args.worker:
+        _run_worker(args)
+        return 0
+
+    from utils.input_config import DATA_SOURCE_CONFIGS
+
+    sources = args.sources or list(DATA_SOURCE_CONFIGS)
+    workdir = Path(args.workdir or tempfile.mkdtemp(prefix="export_bench_"))
+    workdir.mkdir(parents=True, exist_ok=True)
+
+    report = {"meta": _collect_meta(args), "databases": {}, "results": []}
+    for scale in args.scales:
+        db_path = workdir / f"standin_s{scale}.db"
+        print(f"[scale {scale}] building stand-in database ...", flush=True)
+        start = time.perf_counter()
+        table_rows = build_standin_database(db_path, scale, seed=args.seed)
+        report["databases"][str(scale)] = {"build_seconds": round(time.perf_counter() - start, 2), "table_rows": table_rows}
+
+        worker_output = workdir / f"results_s{scale}.json"
+        env = dict(
+            os.environ,
+            DATABASE_URL=f"sqlite:///{db_path}",
+            EXPORT_DIR=str(workdir / f"export_s{scale}"),
+            DB_POOL_WARMUP="0",
+            QUERY_PROFILING="off",
+        )
+        if not args.warm_cache:
+            env.update(RESULT_CACHE_TTL_SECONDS="0", PARTIAL_CACHE_TTL_SECONDS="0")
+        command = [
+            sys.executable, "-m", "benchmarks.run_benchmarks", "--worker",
+            "--scales", str(scale), "--repeats", str(args.repeats), "--max-rows", str(args.max_rows),
+            "--sources", *sources, "--formats", *args.formats, "--output", str(worker_output),
+        ]
+        print(f"[scale {scale}] running {len(sources)} data sources x {args.repeats} repeats ...", flush=True)
+        subprocess.run(command, env=env, cwd=PROJECT_ROOT, check=True)
+        with open(worker_output, 'r', encoding='utf-8') as f:
+            report["results"].extend(json.load(f))
+
+    _print_table(report["results"])
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"\nResults written to {args.output}")
+    return 0
+
+
+def _parse_args(argv: Optional[List[str]]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Benchmark every data source against a local stand-in database.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 2, 4], help="Scale factors of the stand-in data")
+    parser.add_argument("--repeats", type=int, default=5, help="Timed repetitions per stage")
+    parser.add_argument("--sources", nargs="+", help="Data sources to run (default: all)")
+    parser.add_argument("--formats", nargs="+", default=list(ALL_FORMATS), choices=ALL_FORMATS, help="Export formats to encode")
+    parser.add_argument("--max-rows", type=int, default=10_000_000, help="Row limit passed to materialize_result")
+    parser.add_argument("--seed", type=int, default=0, help="Seed of the data generator")
+    parser.add_argument("--warm-cache", action="store_true", help="Keep the result caches between repeats")
+    parser.add_argument("--workdir", help="Directory for the stand-in databases and export files (default: a temp dir)")
+    parser.add_argument("--output", help="Write the full report as JSON to this file")
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+def _collect_meta(args: argparse.Namespace) -> Dict[str, Any]:
+    import pandas as pd
+    import pyarrow as pa
+    import sqlalchemy
+
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "sqlite": sqlite3.sqlite_version,
+        "pandas": pd.__version__,
+        "pyarrow": pa.__version__,
+        "sqlalchemy": sqlalchemy.__version__,
+        "scales": args.scales,
+        "repeats": args.repeats,
+        "warm_cache": args.warm_cache,
+        "date_range": [START_DATE.isoformat(), END_DATE.isoformat()],
+    }
+
+
+# --- Worker: runs inside a subprocess with DATABASE_URL pointing at the stand-in database ---
+def _run_worker(args: argparse.Namespace):
+    from sqlalchemy import event
+
+    from benchmarks.standin import register_functions
+    from utils import database
+    from utils.config import PREVIEW_ROW_LIMIT
+    from utils.exporters import EXPORT_FORMATS, write_export
+    from utils.logic import get_data, materialize_result
+    from utils.materialize import iter_result_chunks, read_result_rows
+
+    event.listen(database.engine, "connect", lambda dbapi_connection, record: register_functions(dbapi_connection))
+    scale = args.scales[0]
+    with sqlite3.connect(database.engine.url.database) as connection:
+        storefront_ids = benchmark_storefront_ids(connection)
+    export_dir = Path(os.environ["EXPORT_DIR"]) / "bench_exports"
+    export_dir.mkdir(parents=True, exist_ok=True)
+
+    results = []
+    for data_source in args.sources:
+        params = _benchmark_params(data_source, storefront_ids)
+
+        def record(stage: str, fn: Callable[[], Any], rows_of: Callable[[Any], int]) -> Any:
+            try:
+                timings, peak, value = _measure(fn, args.repeats)
+            except Exception as e:
+                results.append(_result(data_source, scale, stage, error=_describe_error(e)))
+                raise
+            results.append(_result(data_source, scale, stage, rows=rows_of(value), timings=timings, peak=peak))
+            return value
+
+        try:
+            record("count", lambda: get_data('count', data_source, **params), lambda df: int(df.iloc[0, 0]))
+            record("probe", lambda: get_data('probe', data_source, limit=args.max_rows + 1, **params),
+                   lambda df: int(df.iloc[0, 0]))
+            result = record("prepare", lambda: materialize_result(data_source, params, max_rows=args.max_rows),
+                            lambda r: r.num_rows)
+            if not result.is_available:
+                continue
+            record("preview", lambda: read_result_rows(result, 0, PREVIEW_ROW_LIMIT), len)
+            for export_format in args.formats:
+                path = export_dir / f"{data_source}.{EXPORT_FORMATS[export_format]['extension']}"
+                record(f"export_{export_format}",
+                       lambda: write_export(iter_result_chunks(result), path, export_format), lambda rows: rows)
+        except Exception:
+            # Recorded above; the remaining stages of this source depend on the failed one
+            continue
+        finally:
+            print(f"  {data_source}: done", flush=True)
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+
+
+def _benchmark_params(data_source: str, storefront_ids: List[int]) -> Dict[str, Any]:
+    """Request parameters covering the whole stand-in data set, built from the inputs of the data source."""
+    from utils.input_config import DATA_SOURCE_CONFIGS
+
+    params: Dict[str, Any] = {}
+    for field_name in DATA_SOURCE_CONFIGS[data_source]["inputs"]:
+        if field_name == "workspace_id":
+            params["workspace_id"] = WORKSPACE_ID
+        elif field_name == "storefront_ids":
+            params["storefront_ids"] = storefront_ids
+        elif field_name == "date_range":
+            params["start_date"], params["end_date"] = START_DATE.isoformat(), END_DATE.isoformat()
+        else:
+            # Optional filters are left unset
+            params[field_name] = None
+    return params
+
+
+def _measure(fn: Callable[[], Any], repeats: int) -> Tuple[List[float], int, Any]:
+    """
+    Run `fn` once under tracemalloc for its peak memory (this also warms up imports and
+    connections), then `repeats` times for timing. Returns the timings, the peak in bytes
+    and the value of the last call.
+    """
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    timings = []
+    value = None
+    for _ in range(repeats):
+        start = time.perf_counter()
+        value = fn()
+        timings.append(time.perf_counter() - start)
+    return timings, peak, value
+
+
+def _describe_error(error: Exception) -> str:
+    # Wrapped driver errors quote the whole statement; the innermost cause carries the reason
+    root = error
+    while root.__cause__ is not None:
+        root = root.__cause__
+    lines = str(root).strip().splitlines() or [""]
+    return f"{type(error).__name__}: {lines[0][:200]}"
+
+
+def _result(data_source: str, scale: int, stage: str, rows: Optional[int] = None,
+            timings: Optional[List[float]] = None, peak: Optional[int] = None, error: Optional[str] = None) -> Dict[str, Any]:
+    result = {"data_source": data_source, "scale": scale, "stage": stage, "rows": rows, "error": error}
+    if timings:
+        p50 = statistics.median(timings)
+        p95 = statistics.quantiles(timings, n=20, method="inclusive")[18] if len(timings) > 1 else timings[0]
+        result.update(
+            repeats=len(timings),
+            p50_ms=round(p50 * 1000, 2),
+            p95_ms=round(p95 * 1000, 2),
+            min_ms=round(min(timings) * 1000, 2),
+            max_ms=round(max(timings) * 1000, 2),
+            rows_per_s=round(rows / p50) if rows and p50 > 0 else None,
+            peak_mem_mb=round(peak / 2**20, 2) if peak is not None else None,
+        )
+    return result
+
+
+def _print_table(results: List[Dict[str, Any]]):
+    header = f"{'data source':<26}{'scale':>6}  {'stage':<16}{'rows':>10}{'p50 ms':>11}{'p95 ms':>11}{'rows/s':>12}{'peak MB':>10}"
+    print("\n" + header)
+    print("-" * len(header))
+    for result in results:
+        prefix = f"{result['data_source']:<26}{result['scale']:>6}  {result['stage']:<16}"
+        if result["error"]:
+            print(f"{prefix}ERROR {result['error']}")
+            continue
+        rows_per_s = f"{result['rows_per_s']:,}" if result.get("rows_per_s") else "-"
+        print(f"{prefix}{result['rows']:>10,}{result['p50_ms']:>11,.1f}{result['p95_ms']:>11,.1f}"
+              f"{rows_per_s:>12}{result['peak_mem_mb']:>10,.1f}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""
+Stand-in Database
+
+A local SQLite database with every table and column the SQL files in data_logic/sql/ read,
+so the full pipeline can run offline. The few MySQL functions the queries use and SQLite
+lacks (`month`, `concat`) are registered on each connection by `register_functions`.
+
+`build_standin_database` fills the tables with skewed synthetic data from benchmarks/datagen.py
+whose volume grows linearly with a scale factor. Daily metric tables store `created_datetime`
+as 'YYYY-MM-DD', which compares with the date parameters the same way a DATETIME column
+does on SingleStore.
+
+Known difference: SQLite turns `CAST(x AS DATETIME)` into a number, so
+competition_landscape returns the year instead of the date in `created_datetime`.
+Row counts and timings are unaffected.
+"""
+
+import sqlite3
+from datetime import timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Sequence, Tuple
+
+from benchmarks.datagen import DEFAULT_END_DATE, Chunk, GeneratorConfig, generate_tables
+
+# --- Schema: every table and column referenced by data_logic/sql/ ---
+SCHEMA: Dict[str, List[Tuple[str, str]]] = {
+    "global_company": [("id", "INTEGER PRIMARY KEY"), ("name", "TEXT")],
+    "passport_workspace": [("id", "INTEGER PRIMARY KEY")],
+    "ads_ops_storefront": [
+        ("id", "INTEGER PRIMARY KEY"), ("name", "TEXT"), ("country_code", "TEXT"),
+        ("marketplace_code", "TEXT"), ("global_company_id", "INTEGER"),
+    ],
+    "onsite_storefront": [
+        ("id", "INTEGER PRIMARY KEY"), ("storefront_sid", "TEXT"), ("ads_ops_storefront_id", "INTEGER"),
+        ("country_code", "TEXT"), ("marketplace_code", "TEXT"), ("storefront_name", "TEXT"),
+        ("udc__search_group_tag", "TEXT"), ("storefront_type", "TEXT"), ("shop_created_at", "TEXT"),
+        ("global_company_id", "INTEGER"), ("storefront_url", "TEXT"), ("country_name", "TEXT"),
+        ("marketplace_name", "TEXT"),
+    ],
+    "kw_discovery_storefront_workspace": [("storefront_id", "INTEGER"), ("workspace_id", "INTEGER")],
+    "onsite_storefront_workspace": [
+        ("storefront_id", "INTEGER"), ("workspace_id", "INTEGER"), ("ads_ops_storefront_id", "INTEGER"),
+    ],
+    "onsite_keyword_sharded": [
+        ("id", "INTEGER PRIMARY KEY"), ("keyword", "TEXT"), ("marketplace_name", "TEXT"), ("country_name", "TEXT"),
+        ("keyword_type", "TEXT"), ("status", "TEXT"), ("first_interaction_at", "TEXT"),
+    ],
+    "onsite_keyword": [("id", "INTEGER PRIMARY KEY"), ("keyword", "TEXT")],
+    "onsite_keyword_workspace": [("id", "INTEGER PRIMARY KEY"), ("workspace_id", "INTEGER"), ("keyword_id", "INTEGER")],
+    "onsite_workspace_tag": [("id", "INTEGER PRIMARY KEY"), ("name", "TEXT")],
+    "onsite_keyword_workspace_tag": [("keyword_workspace_id", "INTEGER"), ("workspace_tag_id", "INTEGER")],
+    "onsite_product": [
+        ("id", "INTEGER PRIMARY KEY"), ("storefront_id", "INTEGER"), ("marketplace_name", "TEXT"),
+        ("product_url", "TEXT"), ("historical_sold", "INTEGER"), ("brand_name", "TEXT"), ("product_name", "TEXT"),
+        ("selling_price", "REAL"), ("sold", "INTEGER"), ("discount", "REAL"),
+    ],
+    "kw_discovery_storefront_keyword": [
+        ("storefront_id", "INTEGER"), ("keyword_id", "INTEGER"), ("keyword_type", "TEXT"),
+        ("operational_status", "TEXT"), ("category_name", "TEXT"), ("active_skus", "INTEGER"),
+        ("shop_ads_status", "TEXT"), ("product_ads_status", "TEXT"), ("translation", "TEXT"),
+        ("brand_name", "TEXT"), ("tag_1", "TEXT"), ("tag_2", "TEXT"), ("tag_3", "TEXT"),
+        ("note_1", "TEXT"), ("note_2", "TEXT"), ("storefront_division", "TEXT"),
+        ("peak_day_ads_gmv", "REAL"), ("peak_day_bau_ads_gmv", "REAL"),
+    ],
+    "kw_discovery_storefront_keyword_perf": [
+        ("storefront_id", "INTEGER"), ("keyword_id", "INTEGER"), ("created_datetime", "TEXT"),
+        ("est_daily_search_volume", "REAL"), ("ads_gmv", "REAL"), ("cost", "REAL"), ("click", "REAL"),
+        ("impression", "REAL"), ("ads_item_sold", "REAL"), ("current_avg_bidding_price", "REAL"),
+        ("suggested_bidding_price", "REAL"), ("company_competitor", "TEXT"), ("product_competitor", "TEXT"),
+        ("storefront_competitor", "TEXT"),
+    ],
+    "dashboard_ads": [
+        ("storefront_id", "INTEGER"), ("created_datetime", "TEXT"), ("gmv", "REAL"), ("cost", "REAL"),
+        ("click", "REAL"), ("impression", "REAL"), ("ads_order", "REAL"), ("direct_gmv", "REAL"),
+        ("direct_ads_order", "REAL"), ("direct_item_sold", "REAL"), ("item_sold", "REAL"),
+    ],
+    "ads_ops_ads_campaigns": [
+        ("id", "INTEGER PRIMARY KEY"), ("storefront_id", "INTEGER"), ("general_tag", "TEXT"),
+        ("country_code", "TEXT"), ("marketplace_code", "TEXT"), ("tool_code", "TEXT"), ("name", "TEXT"),
+        ("note", "TEXT"), ("status", "TEXT"), ("target", "TEXT"), ("objective", "TEXT"), ("ads_status", "TEXT"),
+        ("budget_distributed_method", "TEXT"), ("daily_budget", "REAL"), ("assessment", "TEXT"),
+        ("timeline_from", "TEXT"), ("timeline_to", "TEXT"), ("first_search_slot", "INTEGER"),
+        ("max_bidding_price", "REAL"),
+    ],
+    "ads_ops_ads_campaigns_performance": [
+        ("ads_campaign_id", "INTEGER"), ("created_datetime", "TEXT"), ("click", "REAL"),
+        ("impression", "REAL"), ("ads_gmv", "REAL"), ("cost", "REAL"),
+    ],
+    "metric_share_of_search_storefront": [
+        ("created_datetime", "TEXT"), ("keyword_id", "INTEGER"), ("storefront_id", "INTEGER"),
+        ("timing", "TEXT"), ("device_type", "TEXT"), ("display_type", "TEXT"), ("product_position", "TEXT"),
+        ("share_of_search", "REAL"), ("search_volume", "REAL"), ("suggested_bidding_price", "REAL"),
+    ],
+    "metric_share_of_search_product": [
+        ("created_datetime", "TEXT"), ("keyword_id", "INTEGER"), ("product_id", "INTEGER"), ("timing", "TEXT"),
+        ("device_type", "TEXT"), ("display_type", "TEXT"), ("slot", "REAL"),
+    ],
+    "onsite_storefront_keyword_ads_performance": [
+        ("ads_ops_storefront_id", "INTEGER"), ("keyword_id", "INTEGER"), ("tool_id", "INTEGER"),
+        ("created_datetime", "TEXT"), ("timing", "TEXT"), ("ads_order", "REAL"), ("cost", "REAL"),
+        ("direct_order", "REAL"), ("ads_gmv", "REAL"), ("direct_atc", "REAL"), ("direct_gmv", "REAL"),
+        ("direct_item_sold", "REAL"), ("click", "REAL"), ("atc", "REAL"), ("ads_item_sold", "REAL"),
+        ("impression", "REAL"), ("active_skus", "REAL"), ("direct_conversion", "REAL"), ("conversion", "REAL"),
+        ("active_shops", "REAL"),
+    ],
+}
+
+# Indexes on the join and filter keys the queries use
+INDEXES: Dict[str, List[Sequence[str]]] = {
+    "onsite_storefront": [("ads_ops_storefront_id",)],
+    "kw_discovery_storefront_workspace": [("workspace_id", "storefront_id")],
+    "onsite_storefront_workspace": [("workspace_id", "storefront_id")],
+    "onsite_keyword_workspace": [("workspace_id", "keyword_id")],
+    "onsite_keyword_workspace_tag": [("keyword_workspace_id",)],
+    "onsite_product": [("storefront_id",)],
+    "kw_discovery_storefront_keyword": [("storefront_id", "keyword_id")],
+    "kw_discovery_storefront_keyword_perf": [("storefront_id", "keyword_id", "created_datetime")],
+    "dashboard_ads": [("storefront_id", "created_datetime")],
+    "ads_ops_ads_campaigns": [("storefront_id",)],
+    "ads_ops_ads_campaigns_performance": [("ads_campaign_id", "created_datetime")],
+    "metric_share_of_search_storefront": [("keyword_id", "storefront_id", "created_datetime")],
+    "metric_share_of_search_product": [("keyword_id", "product_id", "created_datetime")],
+    "onsite_storefront_keyword_ads_performance": [("ads_ops_storefront_id", "keyword_id", "created_datetime")],
+}
+
+# --- Benchmark request parameters ---
+WORKSPACE_ID = 1  # The largest workspace of the generated data
+NUM_DAYS = 30
+END_DATE = DEFAULT_END_DATE
+START_DATE = END_DATE - timedelta(days=NUM_DAYS - 1)
+
+
+def register_functions(dbapi_connection: sqlite3.Connection):
+    """Register the MySQL functions the queries use and SQLite lacks."""
+    dbapi_connection.create_function("month", 1, lambda value: int(str(value)[5:7]) if value else None, deterministic=True)
+    dbapi_connection.create_function(
+        "concat", -1,
+        lambda *values: None if any(value is None for value in values) else "".join(str(value) for value in values),
+        deterministic=True,
+    )
+
+
+def create_schema(connection: sqlite3.Connection):
+    for table, columns in SCHEMA.items():
+        connection.execute(f"DROP TABLE IF EXISTS {table}")
+        connection.execute(f"CREATE TABLE {table} ({', '.join(f'{name} {kind}' for name, kind in columns)})")
+
+
+def create_indexes(connection: sqlite3.Connection):
+    for table, indexes in INDEXES.items():
+        for columns in indexes:
+            connection.execute(f"CREATE INDEX IF NOT EXISTS ix_{table}_{'_'.join(columns)} ON {table} ({', '.join(columns)})")
+
+
+def insert_chunk(connection: sqlite3.Connection, table: str, chunk: Chunk) -> int:
+    """Insert a column chunk produced by the data generator. Returns the number of rows inserted."""
+    names = [name for name, _ in SCHEMA[table]]
+    if set(chunk) != set(names):
+        raise ValueError(f"Generated columns of {table} do not match the stand-in schema: {sorted(set(chunk) ^ set(names))}")
+    columns = [chunk[name].tolist() if hasattr(chunk[name], "tolist") else list(chunk[name]) for name in names]
+    placeholders = ", ".join("?" for _ in names)
+    connection.executemany(f"INSERT INTO {table} VALUES ({placeholders})", zip(*columns))
+    return len(columns[0]) if columns else 0
+
+
+def benchmark_storefront_ids(connection: sqlite3.Connection, workspace_id: int = WORKSPACE_ID) -> List[int]:
+    """The ads-ops storefront IDs of a workspace, as entered in the Storefront EID field."""
+    rows = connection.execute(
+        "SELECT sf.ads_ops_storefront_id FROM onsite_storefront sf "
+        "JOIN kw_discovery_storefront_workspace sfw ON sfw.storefront_id = sf.id "
+        "WHERE sfw.workspace_id = ? ORDER BY 1",
+        (workspace_id,),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def write_standin_database(path: Path, tables: Iterable[Tuple[str, Chunk]]) -> Dict[str, int]:
+    """Create the stand-in database at `path` from a stream of generated chunks. Returns the row count per table."""
+    path = Path(path)
+    path.unlink(missing_ok=True)
+    connection = sqlite3.connect(path)
+    try:
+        connection.execute("PRAGMA journal_mode = OFF")
+        connection.execute("PRAGMA synchronous = OFF")
+        create_schema(connection)
+        counts = {table: 0 for table in SCHEMA}
+        for table, chunk in tables:
+            counts[table] += insert_chunk(connection, table, chunk)
+        # Indexes are built once at the end, which is much faster than maintaining them per insert
+        create_indexes(connection)
+        connection.commit()
+        connection.execute("ANALYZE")
+        return counts
+    finally:
+        connection.close()
+
+
+def build_standin_database(path: Path, scale: int, seed: int = 0) -> Dict[str, int]:
+    """Create the stand-in database at `path` filled at scale factor `scale`. Returns the row count per table."""
+    config = GeneratorConfig.for_scale(scale, days=NUM_DAYS, end_date=END_DATE, seed=seed)
+    return write_standin_database(path, generate_tables(config))
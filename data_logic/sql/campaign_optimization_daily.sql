@@ -0,0 +1,18 @@
+-- end_date is exclusive here: utils/incremental.py passes the day after the last day of the range
+select 
+    camp.id as group_id,
+    date(pfm.created_datetime) as day,
+    sum(pfm.click) as campaign_clicks,
+    sum(pfm.impression) as campaign_impressions,
+    sum(pfm.ads_gmv) as campaign_gmv,
+    sum(pfm.cost) as campaign_cost
+from kw_discovery_storefront_workspace workspace
+join onsite_storefront ON onsite_storefront.id = workspace.storefront_id
+join ads_ops_storefront storefront on onsite_storefront.ads_ops_storefront_id = storefront.id
+join ads_ops_ads_campaigns camp on camp.storefront_id = storefront.id
+join ads_ops_ads_campaigns_performance pfm on pfm.ads_campaign_id = camp.id
+    and pfm.created_datetime >= :start_date and pfm.created_datetime < :end_date
+join global_company on storefront.global_company_id = global_company.id
+where workspace.workspace_id = :workspace_id
+and storefront.id in :storefront_ids
+group by camp.id, date(pfm.created_datetime)
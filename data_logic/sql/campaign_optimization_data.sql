@@ -18,9 +18,9 @@ select
     camp.max_bidding_price,
     sum(pfm.click) as campaign_clicks,
     sum(pfm.impression) as campaign_impressions,
-    sum(pfm.click / pfm.impression) as campaign_cpc,
-    sum(pfm.ads_gmv / pfm.cost) as campaign_roas,
-    sum(pfm.cost / pfm.click) as cpc,
+    sum(pfm.cost) / nullif(sum(pfm.click), 0) as campaign_cpc,
+    sum(pfm.ads_gmv) / nullif(sum(pfm.cost), 0) as campaign_roas,
+    sum(pfm.cost) / nullif(sum(pfm.click), 0) as cpc,
     sum(pfm.ads_gmv) as campaign_gmv,
     sum(pfm.cost) as campaign_cost
 from kw_discovery_storefront_workspace workspace
@@ -31,5 +31,5 @@ left join ads_ops_ads_campaigns_performance pfm on pfm.ads_campaign_id = camp.id
     and date(pfm.created_datetime) between :start_date and :end_date
 join global_company on storefront.global_company_id = global_company.id
 where workspace.workspace_id = :workspace_id
-and storefront.id in (:storefront_ids)
+and storefront.id in :storefront_ids
 group by camp.id
\ No newline at end of file
@@ -0,0 +1,27 @@
+select 
+    camp.id as group_id,
+    camp.general_tag as campaign_tag,
+    camp.country_code,
+    camp.marketplace_code,
+    storefront.name as storefront_name,
+    camp.tool_code,
+    camp.name as campaign_name,
+    camp.note as campaign_note,
+    camp.status as campaign_status,
+    camp.target as campaign_target,
+    camp.objective as campaign_objective,
+    camp.ads_status as campaign_ads_status,
+    camp.budget_distributed_method as campaign_budget_distributed_method,
+    camp.daily_budget as campaign_daily_budget,
+    camp.assessment as campaign_assessment,
+    concat(date(camp.timeline_from)," - ",date(camp.timeline_to)) as campaign_timeline,
+    camp.first_search_slot,
+    camp.max_bidding_price
+from kw_discovery_storefront_workspace workspace
+join onsite_storefront ON onsite_storefront.id = workspace.storefront_id
+join ads_ops_storefront storefront on onsite_storefront.ads_ops_storefront_id = storefront.id
+join ads_ops_ads_campaigns camp on camp.storefront_id = storefront.id
+join global_company on storefront.global_company_id = global_company.id
+where workspace.workspace_id = :workspace_id
+and storefront.id in :storefront_ids
+group by camp.id
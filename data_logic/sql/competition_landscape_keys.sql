@@ -55,8 +55,7 @@ main_query AS (
     WHERE ws.id = :workspace_id
 )
 
-select count(1)
-from (SELECT 1
+SELECT 1
 FROM main_query
 GROUP BY
     global_company_name,
@@ -67,4 +66,4 @@ GROUP BY
     display_type,
     product_position,
     device_type
-HAVING created_datetime IS NOT NULL)
\ No newline at end of file
+HAVING created_datetime IS NOT NULL
\ No newline at end of file
@@ -1,5 +1,4 @@
-select count(1)
-from(select 1
+select 1
 from kw_discovery_storefront_keyword
         join kw_discovery_storefront_keyword_perf
             on kw_discovery_storefront_keyword.storefront_id = kw_discovery_storefront_keyword_perf.storefront_id and
@@ -14,4 +13,4 @@ and created_datetime between :start_date and :end_date
 and est_daily_search_volume > 0
 and kw_discovery_storefront_keyword.keyword_type != 'irrelevant'
 group by kw_discovery_storefront_keyword.keyword_id, kw_discovery_storefront_keyword.storefront_id,
-        month(created_datetime))
\ No newline at end of file
+        month(created_datetime)
\ No newline at end of file
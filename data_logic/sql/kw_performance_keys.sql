@@ -52,63 +52,21 @@ WITH dim_data AS (
   GROUP BY s.keyword_id, s.storefront_id,month(created_datetime)
   ,s.display_type,s.device_type,s.product_position
 )
-,ads_metrics AS (
-  SELECT
-    p.timing,
-    p.ads_ops_storefront_id,
-    p.keyword_id AS ads_keyword_id,
-    p.tool_id,
-    date(created_datetime) as ads_date,
-    SUM(p.ads_order) AS ads_order,
-    SUM(p.cost) AS cost,
-    SUM(p.direct_order) AS direct_order,
-    SUM(p.ads_gmv) AS ads_gmv,
-    SUM(p.direct_atc) AS direct_atc,
-    SUM(p.direct_gmv) AS direct_gmv,
-    SUM(p.direct_item_sold) AS direct_item_sold,
-    SUM(p.click) AS click,
-    SUM(p.atc) AS atc,
-    SUM(p.ads_item_sold) AS ads_item_sold,
-    SUM(p.impression) AS impression,
-    AVG(p.active_skus) AS active_skus,
-    SUM(p.direct_conversion) AS direct_conversion,
-    SUM(p.conversion) AS conversion,
-    AVG(p.active_shops) AS active_shops
-  FROM ads_ops_storefront aos
-    JOIN onsite_storefront_keyword_ads_performance p ON p.ads_ops_storefront_id = aos.id
-    JOIN (SELECT DISTINCT dim_keyword_id, aos_id FROM dim_data) dim 
-      ON p.keyword_id = dim.dim_keyword_id 
-      AND p.ads_ops_storefront_id = dim.aos_id
-  WHERE p.timing = 'daily'
-    AND created_datetime between :start_date and :end_date
-  GROUP BY p.ads_ops_storefront_id, p.keyword_id,month(created_datetime)
-)
-
 ,main_data AS (
   SELECT
     d.*,
-    s.search_volume,s.share_of_search,s.suggested_cpc,s.sos_date,s.display_type,s.device_type,s.product_position,
-    a.ads_order,a.cost,a.direct_order,
-    a.ads_gmv,a.direct_atc,a.direct_gmv,
-    a.direct_item_sold,a.click,a.atc,
-    a.ads_item_sold,a.impression,
-    a.active_skus,a.direct_conversion,
-    a.conversion,a.active_shops,
-    (a.cost / NULLIF(a.click, 0)) AS cpc
+    s.sos_date,s.display_type,s.device_type,s.product_position
   FROM dim_data d
     JOIN sos_metrics s ON s.sos_keyword_id = d.dim_keyword_id 
       AND s.storefront_id = d.storefront_id
-    LEFT JOIN ads_metrics a ON a.ads_keyword_id = d.dim_keyword_id 
-      AND a.ads_ops_storefront_id = d.aos_id
 )
 
 -- Final result
-select count(1)
-from(select 1
+select 1
 FROM main_data
 GROUP BY
   workspace_id,
   storefront_id,
   keyword_ws_id,
   month(sos_date)
-  ,display_type,device_type,product_position)
\ No newline at end of file
+  ,display_type,device_type,product_position
\ No newline at end of file
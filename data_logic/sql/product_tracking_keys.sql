@@ -44,7 +44,6 @@ WITH main_query AS (
         product_a.display_type,
         keyword.id
 )
-select count(1)
-from (SELECT 1
+SELECT 1
 FROM main_query
-GROUP BY keyword____a_id,product____a_id,product____a_device_type,product____a_display_type)
\ No newline at end of file
+GROUP BY keyword____a_id,product____a_id,product____a_device_type,product____a_display_type
\ No newline at end of file
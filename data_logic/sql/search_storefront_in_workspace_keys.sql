@@ -1,4 +1,4 @@
-SELECT COUNT(1)
+SELECT 1
 FROM onsite_storefront sf
 JOIN kw_discovery_storefront_workspace sfw ON sf.id = sfw.storefront_id
 WHERE sfw.workspace_id = :workspace_id
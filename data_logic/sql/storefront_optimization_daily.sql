@@ -0,0 +1,22 @@
+    -- end_date is exclusive here: utils/incremental.py passes the day after the last day of the range
+    select 
+        onsite_storefront.id as group_id,
+        date(dashboard_ads.created_datetime) as day,
+        sum(gmv) as gmv,
+        sum(cost) as cost,
+        sum(click) as click,
+        sum(impression) as impression,
+        sum(ads_order) as ads_order,
+        sum(direct_gmv) as direct_gmv,
+        sum(direct_ads_order) as direct_ads_order,
+        sum(direct_item_sold) as direct_item_sold,
+        sum(item_sold) as item_sold
+    from kw_discovery_storefront_workspace workspace
+    join onsite_storefront ON onsite_storefront.id = workspace.storefront_id
+    join ads_ops_storefront on onsite_storefront.ads_ops_storefront_id = ads_ops_storefront.id
+    join dashboard_ads on dashboard_ads.storefront_id = ads_ops_storefront.id
+        and dashboard_ads.created_datetime >= :start_date and dashboard_ads.created_datetime < :end_date
+    join global_company on ads_ops_storefront.global_company_id = global_company.id
+    where workspace.workspace_id = :workspace_id
+    and ads_ops_storefront.id in :storefront_ids
+    group by onsite_storefront.id, date(dashboard_ads.created_datetime)
@@ -6,8 +6,8 @@
         ads_ops_storefront.marketplace_code,
         sum(gmv) as gmv,
         sum(cost) as cost,
-        sum(gmv/cost) as roas,
-        sum(cost/click) as cpc,
+        sum(gmv) / nullif(sum(cost), 0) as roas,
+        sum(cost) / nullif(sum(click), 0) as cpc,
         sum(click) as click,
         sum(impression) as impression,
         sum(ads_order) as ads_order,
@@ -0,0 +1,14 @@
+    select 
+        onsite_storefront.id as group_id,
+        global_company.name as company_name,
+        ads_ops_storefront.id as storefront_id,
+        ads_ops_storefront.name as storefront_name,
+        ads_ops_storefront.country_code,
+        ads_ops_storefront.marketplace_code
+    from kw_discovery_storefront_workspace workspace
+    join onsite_storefront ON onsite_storefront.id = workspace.storefront_id
+    join ads_ops_storefront on onsite_storefront.ads_ops_storefront_id = ads_ops_storefront.id
+    join global_company on ads_ops_storefront.global_company_id = global_company.id
+    where workspace.workspace_id = :workspace_id
+    and ads_ops_storefront.id in :storefront_ids
+    group by onsite_storefront.id
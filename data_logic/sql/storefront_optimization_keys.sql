@@ -1,5 +1,4 @@
-    select count(1) 
-    from(select 1
+    select 1
     from kw_discovery_storefront_workspace workspace
     join onsite_storefront ON onsite_storefront.id = workspace.storefront_id
     join ads_ops_storefront on onsite_storefront.ads_ops_storefront_id = ads_ops_storefront.id
@@ -8,4 +7,4 @@
     join global_company on ads_ops_storefront.global_company_id = global_company.id
     where workspace.workspace_id = :workspace_id
     and ads_ops_storefront.id in :storefront_ids
-    group by onsite_storefront.id)
\ No newline at end of file
+    group by onsite_storefront.id
\ No newline at end of file
@@ -95,7 +95,7 @@ st.markdown("""
             <div style='color: #a1a1aa;'>Average Export Time</div>
         </div>
         <div>
-            <div class='stat-number'>50k</div>
+            <div class='stat-number'>500k</div>
             <div style='color: #a1a1aa;'>Max Rows Per Export</div>
         </div>
         <div>
@@ -182,7 +182,7 @@ with col1:
     st.markdown("""
         <div class='feature-card'>
             <h4>🛡️ Built-in Safety</h4>
-            <p>Smart limits prevent server meltdowns and protect you from accidentally downloading the entire internet. The 50k row limit is your friend, not your enemy!</p>
+            <p>Smart limits prevent server meltdowns and protect you from accidentally downloading the entire internet. The 500k row limit is your friend, not your enemy!</p>
         </div>
     """, unsafe_allow_html=True)
 
@@ -367,7 +367,7 @@ with col2:
     st.markdown("""
     ### 🛡️ **Avoid Common Pitfalls**
     - **Check date ranges**: More storefronts = shorter date range allowed
-    - **Watch the row count**: 45k rows? You're playing with fire! 🔥
+    - **Watch the row count**: 450k rows? You're playing with fire! 🔥
     - **Validate inputs**: Red error messages are not suggestions
     - **Read the summary**: It tells you everything you need to know
     """)
@@ -404,7 +404,7 @@ if st.button("🎁 Daily Motivation", help="Need some encouragement?"):
         "You're not just exporting data, you're exporting dreams! 🌟",
         "Every CSV tells a story. What story will yours tell? 📖",
         "Data doesn't export itself, but with this tool, it almost does! 🤖",
-        "You're 50,000 rows away from greatness! (But please stay under that limit) 🎯"
+        "You're 500,000 rows away from greatness! (But please stay under that limit) 🎯"
     ]
     import random
     st.success(random.choice(motivational_quotes))
@@ -126,26 +126,24 @@ st.markdown(
 st.subheader("⏰ Rule #2: The Date Range Commandments")
 st.markdown(
     """
-    <div class='warning-box'>
-    <h4>🚨 ATTENTION: These limits are non-negotiable!</h4>
+    <div class='tip-box'>
+    <h4>🎉 Good news: there is no date range limit anymore!</h4>
     
-    <strong>1-2 storefronts:</strong> Maximum 60 days<br>
-    <strong>3-5 storefronts:</strong> Maximum 30 days<br>
-    <strong>More than 5:</strong> You're pushing it, buddy. Keep it under 30 days or the system will give you the cold shoulder. ❄️
+    Big requests (many storefronts, long periods) are cut into smaller pieces behind the scenes and run side by side, then stitched back together in the right order. You get one file, same as always. 🧵
     <br><br>
-    <strong>Why these limits?</strong> Because every query is a tiny burden on our servers. Too much burden = system goes boom 💥. And nobody wants to explain to the team why the data export tool caught fire on a Friday afternoon.
+    <strong>The fine print:</strong> Bigger requests still take longer, and the 500,000 row law below still applies. If you only need last week, don't ask for last year. Our servers will thank you. 🙏
     </div>
     """, 
     unsafe_allow_html=True
 )
 
-st.subheader("🛡️ Rule #3: The 50,000 Row Law")
+st.subheader("🛡️ Rule #3: The 500,000 Row Law")
 st.markdown(
     """
     <div class='warning-box'>
     <h4>⚖️ This is THE LAW, not a suggestion!</h4>
     
-    If your query tries to export more than <strong>50,000 rows</strong>, the system will block you faster than a bouncer at an exclusive club. 🚫
+    If your query tries to export more than <strong>500,000 rows</strong>, the system will block you faster than a bouncer at an exclusive club. 🚫
     <br><br>
     <strong>What to do if you hit the limit:</strong><br>
     • Reduce your date range (most effective)<br>
@@ -153,7 +151,7 @@ st.markdown(
     • Use optional filters to narrow down results<br>
     • Sacrifice a coffee to the data gods ☕<br>
     <br>
-    <strong>Why 50k?</strong> It's the perfect balance between "useful data" and "not crashing the server." Trust us on this one.
+    <strong>Why 500k?</strong> Full exports are streamed to disk in chunks, so the limit is about keeping files workable, not about crashing the server. Trust us on this one.
     </div>
     """, 
     unsafe_allow_html=True
@@ -246,7 +244,7 @@ with st.expander("❌ \"No data found for the selected criteria\"", expanded=Fal
 
 with st.expander("🚫 \"Data is too large to export (X rows)\"", expanded=False):
     st.markdown("""
-    **What it means:** You hit the 50,000 row limit. The system is protecting itself (and you).
+    **What it means:** You hit the 500,000 row limit. The system is protecting itself (and you).
     
     **Solutions (in order of effectiveness):**
     1. **Reduce date range** - Most effective way to cut down rows
@@ -289,7 +287,7 @@ st.markdown(
     
     <strong>1. Start Small:</strong> Test with 1 storefront and 7 days first, then scale up<br>
     <strong>2. Use Presets:</strong> "Last 30 days" is usually what you want<br>
-    <strong>3. Check the Summary:</strong> If it says 45k rows, you're cutting it close!<br>
+    <strong>3. Check the Summary:</strong> If it says 450k rows, you're cutting it close!<br>
     <strong>4. Name Your Downloads:</strong> The CSV comes with a date, but rename it something meaningful<br>
     <strong>5. Preview is Free:</strong> Use it liberally - it doesn't count against any limits<br>
     </div>
@@ -0,0 +1,79 @@
+import streamlit as st
+from datetime import datetime
+from pathlib import Path
+from utils.helpers import initialize_session_state, display_user_message
+from utils.input_config import DATA_SOURCE_CONFIGS
+from utils.exporters import EXPORT_FORMATS
+from utils.jobs import EXPORT_JOB, SUCCEEDED, FAILED, CANCELLED, get_job_manager
+
+initialize_session_state()
+display_user_message()
+
+st.set_page_config(page_title="Export Jobs", layout="wide")
+st.title("Export Jobs")
+st.caption("Exports run in the background. Queue as many as you need and download them here when they are done.")
+
+STATUS_ICONS = {"queued": "⏳", "running": "🔄", SUCCEEDED: "✅", FAILED: "❌", CANCELLED: "✖️"}
+
+
+def _read_file(path: str) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _describe(job) -> str:
+    source_name = DATA_SOURCE_CONFIGS.get(job.data_source, {}).get("name", job.data_source)
+    what = f"{EXPORT_FORMATS[job.export_format]['label']} export" if job.kind == EXPORT_JOB else "Query"
+    params = job.sql_params
+    dates = f" · {params['start_date']} to {params['end_date']}" if params.get('start_date') else ""
+    return f"{STATUS_ICONS.get(job.status, '')} **{source_name}** · {what}{dates}"
+
+
+@st.fragment(run_every=2.0)
+def display_jobs(show_all: bool):
+    manager = get_job_manager()
+    jobs = manager.list_jobs(owner=None if show_all else st.session_state.owner_id)
+    if not jobs:
+        st.info("No export jobs yet. Start one with \"Get Data\" on any report page.")
+        return
+
+    for job in jobs:
+        # Jobs of other sessions are listed read-only: only their owner may cancel or download them
+        is_own = job.owner == st.session_state.owner_id
+        with st.container(border=True):
+            cols = st.columns([4, 2, 2])
+            cols[0].markdown(_describe(job))
+            submitted = f"Submitted {datetime.fromtimestamp(job.created_at):%Y-%m-%d %H:%M:%S}"
+            cols[0].caption(submitted if is_own else f"{submitted} · another session")
+
+            if job.status == SUCCEEDED:
+                duration = f"{job.duration:.1f} s" if job.duration is not None else ""
+                cols[1].write(f"{job.total_rows or 0:,} rows · {duration}")
+            elif job.status == FAILED:
+                cols[1].error(job.error or "Failed", icon="🚨")
+            elif job.status == CANCELLED:
+                cols[1].write("Cancelled")
+            else:
+                cols[1].progress(job.progress, text=f"{job.rows_done:,} rows")
+                if is_own:
+                    # Watching a job here keeps it from being cancelled as abandoned
+                    manager.heartbeat(job.job_id)
+                    if cols[2].button("✖️ Cancel", key=f"cancel_{job.job_id}", use_container_width=True):
+                        manager.cancel(job.job_id)
+
+            if is_own and job.kind == EXPORT_JOB and job.status == SUCCEEDED and job.file_path and Path(job.file_path).exists():
+                with cols[2]:
+                    st.download_button(
+                        "📥 Download",
+                        # Read only when clicked, so listing many jobs does not load every file
+                        data=lambda path=job.file_path: _read_file(path),
+                        file_name=job.file_name,
+                        mime=EXPORT_FORMATS[job.export_format]['mime'],
+                        key=f"download_{job.job_id}",
+                        on_click="ignore",
+                        use_container_width=True,
+                    )
+
+
+show_all = st.toggle("Show jobs from all sessions", value=False)
+display_jobs(show_all)
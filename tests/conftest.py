@@ -0,0 +1,50 @@
+"""
+Shared test setup: every test runs against the SQLite stand-in from benchmarks/standin.py.
+
+The environment is set before any `utils` module is imported, because utils.config and
+utils.database read it at import time.
+"""
+
+import os
+import sqlite3
+import tempfile
+from pathlib import Path
+
+import pytest
+
+_WORKDIR = Path(tempfile.mkdtemp(prefix="data_export_tool_tests_"))
+_DB_PATH = _WORKDIR / "standin.db"
+
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{_DB_PATH}",
+    EXPORT_DIR=str(_WORKDIR / "export"),
+    DB_POOL_WARMUP="0",
+    QUERY_PROFILING="off",
+    SPAN_LOG_PATH="",
+    RESULT_CACHE_TTL_SECONDS="0",
+    PARTIAL_CACHE_TTL_SECONDS="0",
+)
+
+
+@pytest.fixture(scope="session")
+def standin_db() -> Path:
+    """Build the stand-in database at scale 1 and register its SQL functions on the engine."""
+    from sqlalchemy import event
+
+    from benchmarks.standin import build_standin_database, register_functions
+    from utils import database
+
+    build_standin_database(_DB_PATH, 1)
+    event.listen(database.engine, "connect", lambda dbapi_connection, record: register_functions(dbapi_connection))
+    return _DB_PATH
+
+
+@pytest.fixture(scope="session")
+def standin_params(standin_db):
+    """Query parameters of a data source over the stand-in's benchmark storefronts."""
+    from benchmarks.run_benchmarks import _benchmark_params
+    from benchmarks.standin import benchmark_storefront_ids
+
+    with sqlite3.connect(standin_db) as connection:
+        storefront_ids = benchmark_storefront_ids(connection)
+    return lambda data_source: _benchmark_params(data_source, storefront_ids)
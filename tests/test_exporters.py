@@ -0,0 +1,84 @@
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+import pytest
+
+from utils.exporters import write_export
+
+READERS = {"parquet": pq.read_table, "feather": feather.read_table}
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "feather"])
+def test_int_column_widens_to_float_in_a_later_chunk(tmp_path, export_format):
+    path = tmp_path / f"out.{export_format}"
+    chunks = [pd.DataFrame({"b": [1, 2]}), pd.DataFrame({"b": [1.5, None]})]
+
+    assert write_export(iter(chunks), path, export_format) == 4
+
+    table = READERS[export_format](path)
+    assert table.schema.field("b").type == pa.float64()
+    assert table.column("b").to_pylist() == [1.0, 2.0, 1.5, None]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [path.name]
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "feather"])
+def test_all_null_first_chunk_takes_the_type_of_later_values(tmp_path, export_format):
+    path = tmp_path / f"out.{export_format}"
+    chunks = [
+        pd.DataFrame({"a": [None, None], "s": ["x", "y"]}),
+        pd.DataFrame({"a": [3, 4], "s": ["z", None]}),
+    ]
+
+    assert write_export(iter(chunks), path, export_format) == 4
+
+    table = READERS[export_format](path)
+    assert table.schema.field("a").type == pa.int64()
+    assert table.column("a").to_pylist() == [None, None, 3, 4]
+    assert table.column("s").to_pylist() == ["x", "y", "z", None]
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "feather"])
+def test_mixed_types_fall_back_to_string(tmp_path, export_format):
+    path = tmp_path / f"out.{export_format}"
+    chunks = [pd.DataFrame({"a": [1]}), pd.DataFrame({"a": ["q"]})]
+
+    write_export(iter(chunks), path, export_format)
+
+    assert READERS[export_format](path).column("a").to_pylist() == ["1", "q"]
+
+
+@pytest.mark.parametrize("export_format", ["parquet", "feather"])
+def test_failed_stream_leaves_no_files(tmp_path, export_format):
+    path = tmp_path / f"out.{export_format}"
+
+    def chunks():
+        yield pd.DataFrame({"b": [1]})
+        yield pd.DataFrame({"b": [0.5]})
+        raise RuntimeError("connection lost")
+
+    with pytest.raises(RuntimeError):
+        write_export(chunks(), path, export_format)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_unknown_format_raises(tmp_path):
+    with pytest.raises(ValueError):
+        write_export(iter([]), tmp_path / "out.bin", "bin")
+
+
+def test_csv_header_is_written_once_after_leading_empty_chunks(tmp_path):
+    path = tmp_path / "out.csv"
+    chunks = [pd.DataFrame({"a": [], "b": []}), pd.DataFrame({"a": [], "b": []}), pd.DataFrame({"a": [1], "b": ["x"]})]
+
+    assert write_export(iter(chunks), path, "csv") == 1
+
+    assert path.read_text(encoding="utf-8-sig").splitlines() == ["a,b", "1,x"]
+
+
+def test_csv_of_only_empty_chunks_still_has_a_header(tmp_path):
+    path = tmp_path / "out.csv"
+
+    assert write_export(iter([pd.DataFrame({"a": [], "b": []})]), path, "csv") == 0
+
+    assert path.read_text(encoding="utf-8-sig").splitlines() == ["a,b"]
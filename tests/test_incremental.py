@@ -0,0 +1,85 @@
+from datetime import date
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import incremental
+from utils.incremental import get_incremental_data, get_incremental_spec
+from utils.logic import get_data
+from utils.result_cache import ResultCache
+
+# Every stand-in day is settled
+TODAY = date(2027, 1, 1)
+
+
+@pytest.fixture
+def fetched_ranges(monkeypatch, tmp_path):
+    """A fresh partial cache, and the day ranges the daily query ran for."""
+    monkeypatch.setattr(incremental, "get_partial_cache", lambda: ResultCache(tmp_path, 1 << 30))
+    ranges = []
+    fetch = incremental._fetch_daily
+
+    def _recording_fetch(data_source, spec, sql_params, start, end):
+        ranges.append((start.isoformat(), end.isoformat()))
+        return fetch(data_source, spec, sql_params, start, end)
+
+    monkeypatch.setattr(incremental, "_fetch_daily", _recording_fetch)
+    return ranges
+
+
+def _sorted(df, data_source):
+    columns = get_incremental_spec(data_source)["columns"]
+    return df[columns].astype({"storefront_name": "str"}).sort_values(columns, ignore_index=True)
+
+
+@pytest.mark.parametrize("data_source", ["storefront_optimization", "campaign_optimization"])
+def test_per_day_assembly_matches_the_data_query(standin_params, fetched_ranges, data_source):
+    params = standin_params(data_source)
+
+    assembled = get_incremental_data(data_source, params, today=TODAY)
+    expected = get_data('data', data_source, **params)
+
+    assert len(assembled) == len(expected) > 0
+    pd.testing.assert_frame_equal(_sorted(assembled, data_source), _sorted(expected, data_source),
+                                  check_dtype=False, check_categorical=False)
+
+
+def test_overlapping_ranges_only_query_new_days(standin_params, fetched_ranges):
+    params = dict(standin_params("storefront_optimization"), start_date="2026-01-05", end_date="2026-01-10")
+
+    get_incremental_data("storefront_optimization", params, today=TODAY)
+    get_incremental_data("storefront_optimization", dict(params, start_date="2026-01-01", end_date="2026-01-12"),
+                         today=TODAY)
+    get_incremental_data("storefront_optimization", dict(params, start_date="2026-01-03", end_date="2026-01-11"),
+                         today=TODAY)
+
+    assert fetched_ranges == [("2026-01-05", "2026-01-10"), ("2026-01-01", "2026-01-04"), ("2026-01-11", "2026-01-12")]
+
+
+def test_unsettled_days_are_always_queried(standin_params, fetched_ranges):
+    params = dict(standin_params("storefront_optimization"), start_date="2026-01-20", end_date="2026-01-22")
+
+    for _ in range(2):
+        get_incremental_data("storefront_optimization", params, today=date(2026, 1, 24))
+
+    # Days within INCREMENTAL_SETTLE_DAYS (3) of today are not settled: only 2026-01-20 is
+    assert fetched_ranges == [("2026-01-20", "2026-01-22"), ("2026-01-21", "2026-01-22")]
+
+
+def test_ratios_are_recomputed_from_the_summed_totals(standin_params, fetched_ranges):
+    df = get_incremental_data("campaign_optimization", standin_params("campaign_optimization"), today=TODAY)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cost, clicks = df["campaign_cost"].astype("float64"), df["campaign_clicks"].astype("float64")
+        expected_cpc = (cost / clicks.where(clicks != 0)).to_numpy()
+    np.testing.assert_allclose(df["campaign_cpc"].astype("float64"), expected_cpc)
+    np.testing.assert_allclose(df["campaign_roas"].astype("float64"),
+                               (df["campaign_gmv"].astype("float64") / cost.where(cost != 0)).to_numpy())
+
+
+def test_safe_divide_gives_null_for_a_zero_denominator():
+    result = incremental._safe_divide(pd.Series([4.0, 1.0, None]), pd.Series([2, 0, 3]))
+
+    assert result.iloc[0] == 2.0
+    assert result.iloc[1:].isna().all()
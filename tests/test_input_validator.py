@@ -0,0 +1,36 @@
+from datetime import date, datetime
+
+from utils.input_config import get_sql_param_names, resolve_date_preset
+from utils.input_validator import build_request_key, canonicalize_sql_params
+
+
+def test_equivalent_requests_have_equal_parameters_and_keys():
+    a = {"workspace_id": "1", "storefront_ids": "7, 3,3", "start_date": date(2026, 1, 1), "end_date": "2026-01-31",
+         "current_page": 4, "num_row": 1200}
+    b = {"workspace_id": 1, "storefront_ids": [3, 7], "start_date": "2026-01-01", "end_date": datetime(2026, 1, 31, 12)}
+
+    canonical = canonicalize_sql_params("keyword_lab", a)
+
+    assert canonical == canonicalize_sql_params("keyword_lab", b)
+    assert build_request_key("keyword_lab", a) == build_request_key("keyword_lab", b)
+    assert canonical["workspace_id"] == 1
+    assert canonical["storefront_ids"] == [3, 7]
+    assert (canonical["start_date"], canonical["end_date"]) == ("2026-01-01", "2026-01-31")
+
+
+def test_only_sql_parameters_are_kept_and_missing_ones_are_none():
+    canonical = canonicalize_sql_params("keyword_performance", {"workspace_id": 1, "device_type": "None", "extra": "x"})
+
+    assert list(canonical) == get_sql_param_names("keyword_performance")
+    assert canonical["device_type"] is None
+    assert canonical["storefront_ids"] is None
+
+
+def test_a_date_preset_is_resolved_to_dates():
+    start, end = resolve_date_preset("Last month")
+
+    canonical = canonicalize_sql_params("keyword_lab", {"workspace_id": 1, "date_preset": "Last month"})
+
+    assert (canonical["start_date"], canonical["end_date"]) == (start.isoformat(), end.isoformat())
+    assert build_request_key("keyword_lab", {"workspace_id": 1, "date_preset": "Last month"}) == \
+        build_request_key("keyword_lab", {"workspace_id": 1, "start_date": start, "end_date": end})
@@ -0,0 +1,172 @@
+import json
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from utils import jobs
+from utils.jobs import CANCELLED, EXPORT_JOB, FAILED, PREPARE_JOB, RUNNING, SUCCEEDED, ExportJob, JobManager
+from utils.query_control import get_cancel_token
+
+
+def _wait(manager: JobManager, job: ExportJob, timeout: float = 30.0) -> ExportJob:
+    """Wait until the job is finished and its final record is saved."""
+    deadline = time.time() + timeout
+    while job.job_id in manager._tokens:
+        assert time.time() < deadline, f"job still {job.status}"
+        time.sleep(0.02)
+    return job
+
+
+def _record(directory: Path, job_id: str) -> dict:
+    with open(directory / f"{job_id}.json", encoding='utf-8') as f:
+        return json.load(f)
+
+
+@pytest.fixture
+def blocking_work(monkeypatch):
+    """Replace the work of both job kinds with a loop that only ends on cancellation."""
+    started = threading.Event()
+
+    def _block(*args):
+        started.set()
+        while True:
+            get_cancel_token().raise_if_cancelled()
+            time.sleep(0.01)
+
+    monkeypatch.setattr(jobs, "_run_prepare", _block)
+    monkeypatch.setattr(jobs, "_run_export", _block)
+    return started
+
+
+def test_prepare_and_export_jobs(tmp_path, standin_params):
+    manager = JobManager(tmp_path, max_workers=2, retention_seconds=3600)
+    params = standin_params("keyword_lab")
+
+    prepare = _wait(manager, manager.submit_prepare("keyword_lab", params, owner="a"))
+
+    assert prepare.status == SUCCEEDED, prepare.error
+    result = prepare.to_result()
+    assert result.is_available and result.num_rows == len(pd.read_parquet(result.path))
+    assert prepare.summary is not None
+
+    export = _wait(manager, manager.submit_export("keyword_lab", params, "csv", owner="a", result=result))
+
+    assert export.status == SUCCEEDED, export.error
+    assert export.rows_done == result.num_rows
+    assert len(pd.read_csv(export.file_path)) == result.num_rows
+    assert [job.job_id for job in manager.list_jobs(owner="a")] == [export.job_id, prepare.job_id]
+    assert manager.list_jobs(owner="b") == []
+
+
+def test_a_running_job_is_cancelled_through_its_token(tmp_path, blocking_work):
+    manager = JobManager(tmp_path, max_workers=1, retention_seconds=3600)
+    running = manager.submit_prepare("keyword_lab", {})
+    assert blocking_work.wait(10)
+    queued = manager.submit_prepare("keyword_lab", {})
+
+    manager.cancel(queued.job_id)
+    manager.cancel(running.job_id)
+
+    assert _wait(manager, running).status == CANCELLED
+    assert _wait(manager, queued).status == CANCELLED
+    # Cancelled while still queued: its work never ran
+    assert queued.started_at is None
+    assert _record(tmp_path, running.job_id)["status"] == CANCELLED
+
+
+def test_finished_jobs_are_reloaded(tmp_path, blocking_work):
+    manager = JobManager(tmp_path, max_workers=1, retention_seconds=3600)
+    job = manager.submit_export("keyword_lab", {"workspace_id": 1}, "parquet", owner="a")
+    assert blocking_work.wait(10)
+    manager.cancel(job.job_id)
+    _wait(manager, job)
+
+    reloaded = JobManager(tmp_path, max_workers=1, retention_seconds=3600).get(job.job_id)
+
+    assert reloaded == job
+    assert reloaded.kind == EXPORT_JOB and reloaded.sql_params == {"workspace_id": 1}
+
+
+def _write_unfinished(directory: Path, pid, process_id="other") -> str:
+    job = ExportJob(job_id=f"job-{pid}", kind=PREPARE_JOB, data_source="keyword_lab", sql_params={},
+                    status=RUNNING, pid=pid, process_id=process_id)
+    with open(directory / f"{job.job_id}.json", 'w', encoding='utf-8') as f:
+        json.dump(asdict(job), f)
+    return job.job_id
+
+
+def test_unfinished_jobs_of_a_stopped_process_are_failed(tmp_path):
+    stopped = subprocess.Popen([sys.executable, "-c", "pass"])
+    stopped.wait()
+    stopped_job = _write_unfinished(tmp_path, stopped.pid)
+    legacy_job = _write_unfinished(tmp_path, None, None)
+
+    manager = JobManager(tmp_path, max_workers=1, retention_seconds=3600)
+
+    for job_id in (stopped_job, legacy_job):
+        assert manager.get(job_id).status == FAILED
+        assert "server restart" in manager.get(job_id).error
+        assert _record(tmp_path, job_id)["status"] == FAILED
+
+
+def test_unfinished_jobs_of_a_live_process_are_kept(tmp_path):
+    other = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)"])
+    try:
+        job_id = _write_unfinished(tmp_path, other.pid)
+        manager = JobManager(tmp_path, max_workers=1, retention_seconds=3600)
+
+        assert manager.get(job_id).status == RUNNING
+        assert _record(tmp_path, job_id)["status"] == RUNNING
+
+        # The other process finishes the job
+        record = _record(tmp_path, job_id)
+        record.update(status=SUCCEEDED, finished_at=time.time())
+        with open(tmp_path / f"{job_id}.json", 'w', encoding='utf-8') as f:
+            json.dump(record, f)
+        assert [job.status for job in manager.list_jobs()] == [SUCCEEDED]
+
+        # A second job of that process is left unfinished when it stops
+        second_id = _write_unfinished(tmp_path, other.pid)
+        manager = JobManager(tmp_path, max_workers=1, retention_seconds=3600)
+        other.kill()
+        other.wait()
+        assert manager.get(second_id).status == RUNNING
+        assert {job.job_id: job.status for job in manager.list_jobs()}[second_id] == FAILED
+    finally:
+        other.kill()
+        other.wait()
+
+
+def test_the_reaper_cancels_abandoned_prepare_jobs_only(tmp_path, monkeypatch, blocking_work):
+    monkeypatch.setattr(jobs, "_REAPER_INTERVAL", 0.05)
+    monkeypatch.setattr(jobs, "JOB_ABANDON_SECONDS", 0)
+    manager = JobManager(tmp_path, max_workers=2, retention_seconds=3600)
+
+    export = manager.submit_export("keyword_lab", {}, "csv")
+    prepare = manager.submit_prepare("keyword_lab", {})
+
+    assert _wait(manager, prepare, timeout=10).status == CANCELLED
+    time.sleep(0.2)
+    assert export.status == RUNNING
+    manager.cancel(export.job_id)
+    _wait(manager, export)
+
+
+def test_expired_jobs_are_purged_with_their_files(tmp_path, blocking_work):
+    manager = JobManager(tmp_path, max_workers=1, retention_seconds=0)
+    job = manager.submit_export("keyword_lab", {}, "csv")
+    assert blocking_work.wait(10)
+    Path(job.file_path).parent.mkdir(parents=True, exist_ok=True)
+    Path(job.file_path).write_text("storefront_id\n1001\n")
+    manager.cancel(job.job_id)
+    _wait(manager, job)
+
+    assert manager.list_jobs() == []
+    assert not Path(job.file_path).exists()
+    assert not (tmp_path / f"{job.job_id}.json").exists()
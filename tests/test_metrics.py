@@ -0,0 +1,95 @@
+import threading
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from utils import metrics
+from utils.metrics import CONTENT_TYPE, MetricsRegistry, _Metric
+
+
+@pytest.fixture
+def registry() -> MetricsRegistry:
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("data_source",))
+    requests.inc(data_source="keyword_lab")
+    requests.inc(2, data_source="keyword_lab")
+    requests.inc(data_source='say "hi"\n')
+    in_flight = registry.gauge("in_flight", "Queries\nrunning")
+    in_flight.inc(3)
+    in_flight.dec()
+    latency = registry.histogram("latency_seconds", "Latency", ("query_type",), buckets=(1, 0.1))
+    for value in (0.05, 0.1, 0.5, 7):
+        latency.observe(value, query_type="data")
+    return registry
+
+
+def test_the_text_exposition(registry):
+    assert registry.render() == (
+        '# HELP requests_total Requests\n'
+        '# TYPE requests_total counter\n'
+        'requests_total{data_source="keyword_lab"} 3\n'
+        'requests_total{data_source="say \\"hi\\"\\n"} 1\n'
+        '# HELP in_flight Queries\\nrunning\n'
+        '# TYPE in_flight gauge\n'
+        'in_flight 2\n'
+        '# HELP latency_seconds Latency\n'
+        '# TYPE latency_seconds histogram\n'
+        'latency_seconds_bucket{query_type="data",le="0.1"} 2\n'
+        'latency_seconds_bucket{query_type="data",le="1"} 3\n'
+        'latency_seconds_bucket{query_type="data",le="+Inf"} 4\n'
+        'latency_seconds_sum{query_type="data"} 7.65\n'
+        'latency_seconds_count{query_type="data"} 4\n'
+    )
+
+
+def test_collectors_are_read_at_scrape_time_and_may_fail(registry):
+    values = []
+    registry.register_collector(lambda: [("cache_entries", "gauge", "Entries", [({"cache": "result"}, len(values))])])
+    registry.register_collector(lambda: 1 / 0)
+    values.append(1)
+
+    assert registry.render().endswith('# TYPE cache_entries gauge\ncache_entries{cache="result"} 1\n')
+
+
+def test_labels_must_match(registry):
+    counter = registry.counter("other_total", "Other", ("data_source",))
+
+    with pytest.raises(ValueError):
+        counter.inc(format="csv")
+    with pytest.raises(ValueError):
+        registry.counter("other_total", "Other")
+
+
+def test_histograms_time_blocks_that_raise(registry):
+    histogram = registry.histogram("block_seconds", "Block", buckets=(60,))
+
+    with pytest.raises(RuntimeError):
+        with histogram.time():
+            raise RuntimeError("query failed")
+
+    assert 'block_seconds_bucket{le="60"} 1' in registry.render()
+
+
+def test_metrics_must_render():
+    class Summary(_Metric):
+        type_name = "summary"
+
+    with pytest.raises(TypeError):
+        Summary("summary", "Not implemented")
+
+
+def test_the_endpoint_serves_the_registry():
+    metrics.EXPORT_REQUESTS.inc(data_source="keyword_lab", stage="prepare")
+    server = ThreadingHTTPServer(("127.0.0.1", 0), metrics._MetricsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        with urllib.request.urlopen(f"http://127.0.0.1:{server.server_port}/metrics") as response:
+            assert response.headers["Content-Type"] == CONTENT_TYPE
+            body = response.read().decode("utf-8")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert "# TYPE export_requests_total counter" in body
+    assert 'export_requests_total{data_source="keyword_lab",stage="prepare"}' in body
@@ -0,0 +1,90 @@
+from datetime import date
+
+import pandas as pd
+import pytest
+
+from utils import partitioned
+from utils.exporters import write_export
+from utils.logic import TOTAL_ROWS_COLUMN, stream_data
+from utils.partitioned import PartitionedRun, _date_windows, plan_partitions
+
+PARAMS = {"workspace_id": 1, "storefront_ids": [1, 2, 3, 4, 5], "start_date": "2026-01-15", "end_date": "2026-04-10"}
+
+
+def test_unsplittable_sources_run_as_one_partition():
+    assert plan_partitions("storefront_in_workspace", {"workspace_id": 1}) == [{"workspace_id": 1}]
+
+
+def test_partitions_split_date_windows_then_storefronts():
+    partitions = plan_partitions("keyword_lab", PARAMS, max_storefronts=2, window_days=60)
+
+    assert [(p["start_date"], p["end_date"], p["storefront_ids"]) for p in partitions] == [
+        ("2026-01-15", "2026-02-28", [1, 2]), ("2026-01-15", "2026-02-28", [3, 4]), ("2026-01-15", "2026-02-28", [5]),
+        ("2026-03-01", "2026-04-10", [1, 2]), ("2026-03-01", "2026-04-10", [3, 4]), ("2026-03-01", "2026-04-10", [5]),
+    ]
+    assert all(p["workspace_id"] == 1 for p in partitions)
+
+
+def test_small_requests_are_not_split_by_storefront():
+    partitions = plan_partitions("product_tracking", PARAMS, max_storefronts=10)
+
+    assert partitions == [PARAMS]
+
+
+def test_month_windows_are_not_split_across_a_year():
+    # MONTH() without the year would merge January of both years
+    assert _date_windows(date(2025, 1, 10), date(2026, 1, 5), "month", 30) == [(date(2025, 1, 10), date(2026, 1, 5))]
+
+
+def test_day_windows_cover_the_range():
+    assert _date_windows(date(2026, 1, 1), date(2026, 1, 5), "day", 2) == [
+        (date(2026, 1, 1), date(2026, 1, 2)), (date(2026, 1, 3), date(2026, 1, 4)), (date(2026, 1, 5), date(2026, 1, 5)),
+    ]
+
+
+def test_merged_chunks_follow_the_order_by_across_partitions(monkeypatch):
+    monkeypatch.setattr(partitioned, "EXPORT_CHUNK_SIZE", 2)
+    files = [
+        pd.DataFrame({"search_volume": [9.0, 5.0, 5.0, None], "keyword": ["a", "b", "c", "d"]}),
+        pd.DataFrame({"search_volume": [7.0, 5.0, 1.0], "keyword": ["e", "f", "g"]}),
+        pd.DataFrame({"search_volume": [8.0], "keyword": ["h"]}),
+    ]
+    run = PartitionedRun("keyword_performance", [{}] * len(files), max_rows=100)
+    try:
+        for index, df in enumerate(files):
+            run._rows[index] = write_export(iter([df]), run._paths[index], "parquet")
+
+        merged = pd.concat(list(run.chunks()), ignore_index=True)
+    finally:
+        run.__exit__(None, None, None)
+
+    # Descending with NULLs last; equal keys keep the partition order
+    assert merged["keyword"].tolist() == ["a", "h", "e", "b", "c", "f", "g", "d"]
+
+
+def test_partitioned_run_returns_the_rows_of_the_whole_query(standin_params):
+    params = standin_params("keyword_performance")
+    partitions = plan_partitions("keyword_performance", params, max_storefronts=2)
+    assert len(partitions) > 1
+
+    whole = pd.concat(list(stream_data("keyword_performance", **params)), ignore_index=True)
+    with PartitionedRun("keyword_performance", partitions, max_rows=len(whole) + 1) as run:
+        assert run.wait() == len(whole)
+        merged = pd.concat(list(run.chunks()), ignore_index=True)
+
+    assert TOTAL_ROWS_COLUMN not in merged.columns
+    assert merged["search_volume"].is_monotonic_decreasing
+    columns = list(whole.columns)
+    pd.testing.assert_frame_equal(
+        merged[columns].sort_values(columns, ignore_index=True), whole.sort_values(columns, ignore_index=True),
+        check_dtype=False, check_categorical=False,
+    )
+
+
+def test_partitioned_run_stops_once_the_limit_is_exceeded(standin_params):
+    params = standin_params("keyword_performance")
+    partitions = plan_partitions("keyword_performance", params, max_storefronts=1)
+
+    with PartitionedRun("keyword_performance", partitions, max_rows=1) as run:
+        assert run.wait() > 1
+        assert run.exceeded
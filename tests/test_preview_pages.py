@@ -0,0 +1,139 @@
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from utils import preview_pages
+from utils.exporters import write_export
+from utils.materialize import ROW_ID_COLUMN, MaterializedResult, read_result_page, read_result_rows, with_row_ids
+from utils.preview_pages import PreviewPageCache
+
+ROWS = 250
+CHUNK_ROWS = 25
+
+
+@pytest.fixture
+def result(tmp_path) -> MaterializedResult:
+    """A materialized result of ROWS rows in row groups of CHUNK_ROWS rows, stored in reverse value order."""
+    chunks = (
+        pd.DataFrame({"keyword": [f"k{i}" for i in range(start, start + CHUNK_ROWS)],
+                      "gmv": [float(ROWS - i) for i in range(start, start + CHUNK_ROWS)]})
+        for start in range(0, ROWS, CHUNK_ROWS)
+    )
+    path = tmp_path / "result.parquet"
+    write_export(with_row_ids(chunks), path, "parquet")
+    assert pq.ParquetFile(path).num_row_groups > 1
+    return MaterializedResult(data_source="keyword_lab", key="result", num_rows=ROWS, path=str(path))
+
+
+def _all_rows(result: MaterializedResult) -> pd.DataFrame:
+    return pd.read_parquet(result.path).set_index(ROW_ID_COLUMN).rename_axis(None)
+
+
+def test_the_first_page(result):
+    page = read_result_page(result, limit=40)
+
+    assert list(page.index) == list(range(40))
+    assert list(page.columns) == ["keyword", "gmv"]
+    assert page["keyword"].iloc[0] == "k0"
+
+
+def test_paging_by_keyset_walks_the_result_in_row_id_order(result):
+    pages, after_row_id = [], -1
+    while True:
+        page = read_result_page(result, after_row_id, 40)
+        if page.empty:
+            break
+        pages.append(page)
+        after_row_id = page.index[-1]
+
+    assert [len(page) for page in pages] == [40] * 6 + [10]
+    pd.testing.assert_frame_equal(pd.concat(pages), _all_rows(result))
+
+
+def test_a_page_across_row_groups(result):
+    page = read_result_page(result, 60, 40)
+
+    pd.testing.assert_frame_equal(page, _all_rows(result).loc[61:100])
+
+
+def test_the_last_page_is_short(result):
+    page = read_result_page(result, ROWS - 11, 40)
+
+    assert list(page.index) == list(range(ROWS - 10, ROWS))
+
+
+@pytest.mark.parametrize("after_row_id", [ROWS - 1, ROWS + 100])
+def test_a_page_past_the_end_is_empty(result, after_row_id):
+    page = read_result_page(result, after_row_id, 40)
+
+    assert page.empty
+    assert list(page.columns) == ["keyword", "gmv"]
+
+
+def test_rows_by_offset(result):
+    pd.testing.assert_frame_equal(read_result_rows(result, 100, 5), _all_rows(result).iloc[100:105])
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Count the page reads that reach the file."""
+    calls = []
+
+    def _read(result, after_row_id, limit):
+        calls.append(after_row_id)
+        return read_result_page(result, after_row_id, limit)
+
+    monkeypatch.setattr(preview_pages, "read_result_page", _read)
+    return calls
+
+
+def test_a_prefetched_page_is_not_read_again(result, reads):
+    cache = PreviewPageCache(max_pages=4)
+    cache.prefetch(result, 39, 40)
+    # Prefetching a page already pending or cached does nothing
+    cache.prefetch(result, 39, 40)
+
+    page = cache.get_page(result, 39, 40)
+
+    assert list(page.index) == list(range(40, 80))
+    assert reads == [39]
+    cache.prefetch(result, 39, 40)
+    cache.get_page(result, 39, 40)
+    assert reads == [39]
+
+
+def test_the_least_recently_used_page_is_evicted(result, reads):
+    cache = PreviewPageCache(max_pages=2)
+    cache.get_page(result, -1, 40)
+    cache.get_page(result, 39, 40)
+    # Touch the first page, so the second one is the least recently used
+    cache.get_page(result, -1, 40)
+    cache.get_page(result, 79, 40)
+
+    cache.get_page(result, -1, 40)
+    cache.get_page(result, 39, 40)
+
+    assert reads == [-1, 39, 79, 39]
+
+
+def test_pages_of_different_results_and_sizes_are_kept_apart(result, reads):
+    other = MaterializedResult(data_source="keyword_lab", key="other", num_rows=ROWS, path=result.path)
+    cache = PreviewPageCache(max_pages=4)
+
+    cache.get_page(result, -1, 40)
+    cache.get_page(other, -1, 40)
+    assert len(cache.get_page(result, -1, 10)) == 10
+
+    assert reads == [-1, -1, -1]
+
+
+def test_a_failed_read_is_not_cached(tmp_path, reads):
+    missing = MaterializedResult(data_source="keyword_lab", key="missing", num_rows=1, path=str(tmp_path / "missing.parquet"))
+    cache = PreviewPageCache(max_pages=2)
+
+    for _ in range(2):
+        with pytest.raises(OSError):
+            cache.get_page(missing, -1, 40)
+
+    assert reads == [-1, -1]
+    assert cache._pending == {}
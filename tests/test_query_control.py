@@ -0,0 +1,87 @@
+from sqlalchemy import create_engine, event
+from sqlalchemy.pool import QueuePool
+
+from utils import query_control
+from utils.input_config import DATA_SOURCE_CONFIGS
+from utils.query_control import _connection_id
+
+
+def test_connection_id_is_queried_once_per_dbapi_connection():
+    engine = create_engine("sqlite://", poolclass=QueuePool, pool_size=1)
+    lookups = []
+
+    @event.listens_for(engine, "connect")
+    def _register(dbapi_connection, record):
+        dbapi_connection.create_function("CONNECTION_ID", 0, lambda: lookups.append(1) or 42)
+
+    for _ in range(3):
+        with engine.connect() as connection:
+            assert _connection_id(connection) == 42
+    assert len(lookups) == 1
+
+    # A replaced DBAPI connection has a new server id
+    with engine.connect() as connection:
+        connection.invalidate()
+    with engine.connect() as connection:
+        assert _connection_id(connection) == 42
+    assert len(lookups) == 2
+
+
+class _RecordingConnection:
+    """Stands in for a connection of a server dialect: records statements instead of running them."""
+
+    def __init__(self, dialect: str, fail: bool = False):
+        self.dialect = type("Dialect", (), {"name": dialect})()
+        self.info = {}
+        self.statements = []
+        self._fail = fail
+
+    def exec_driver_sql(self, statement):
+        self.statements.append(statement)
+        if self._fail:
+            raise RuntimeError("Resource pool does not exist")
+
+
+def test_server_limit_is_set_once_per_connection_and_value():
+    connection = _RecordingConnection("singlestoredb")
+
+    for timeout in (60, 60, 300, None):
+        query_control._apply_server_limit(connection, timeout)
+
+    assert connection.statements == [
+        "SET resource_pool = export_timeout_70s", "SET resource_pool = export_timeout_310s",
+        "SET resource_pool = default_pool",
+    ]
+
+
+def test_mysql_uses_max_execution_time():
+    connection = _RecordingConnection("mysql")
+
+    query_control._apply_server_limit(connection, 59.5)
+
+    assert connection.statements == ["SET SESSION max_execution_time = 70000"]
+
+
+def test_a_missing_resource_pool_leaves_the_watchdog_in_charge():
+    connection = _RecordingConnection("singlestoredb", fail=True)
+
+    for _ in range(2):
+        query_control._apply_server_limit(connection, 60)
+
+    assert connection.statements == ["SET resource_pool = export_timeout_70s"]
+
+
+def test_resource_pools_cover_every_data_source_timeout():
+    statements = query_control.resource_pool_statements()
+
+    for data_source in DATA_SOURCE_CONFIGS:
+        limit = query_control.server_limit(query_control.get_query_timeout(data_source))
+        assert f"CREATE RESOURCE POOL IF NOT EXISTS export_timeout_{limit}s WITH QUERY_TIMEOUT = {limit}" in statements
+
+
+def test_sqlite_gets_no_server_limit():
+    connection = _RecordingConnection("sqlite")
+
+    query_control._apply_server_limit(connection, 60)
+
+    assert connection.statements == []
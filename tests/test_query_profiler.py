@@ -0,0 +1,108 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from utils import query_profiler
+from utils.query_control import QueryTimeout
+from utils.query_profiler import CLOSED, ERROR, OK, TIMEOUT, get_slow_queries, profile_query
+
+QUERY = text("SELECT 1 AS one")
+
+
+@pytest.fixture
+def profiling(monkeypatch):
+    monkeypatch.setattr(query_profiler, "QUERY_PROFILING", "explain")
+    monkeypatch.setattr(query_profiler, "SLOW_QUERY_SECONDS", 0.0)
+    query_profiler.clear_slow_queries()
+    with create_engine("sqlite://").connect() as connection:
+        yield connection
+    query_profiler.clear_slow_queries()
+
+
+def _wait_for_plan(record, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while record.capturing:
+        assert time.time() < deadline, "plan capture did not finish"
+        time.sleep(0.01)
+
+
+def test_a_finished_query_is_recorded_with_its_plan(profiling):
+    with profile_query(profiling, "any", "data", QUERY, {}):
+        profiling.execute(QUERY).fetchall()
+
+    [record] = get_slow_queries()
+    _wait_for_plan(record)
+    assert (record.outcome, record.end_to_end) == (OK, None)
+    assert record.explain
+
+
+@pytest.mark.parametrize("error, outcome", [(QueryTimeout("too slow"), TIMEOUT), (RuntimeError("broken"), ERROR)])
+def test_a_failed_query_is_recorded_with_its_outcome(profiling, error, outcome):
+    with pytest.raises(type(error)):
+        with profile_query(profiling, "any", "data", QUERY, {}):
+            raise error
+
+    assert [record.outcome for record in get_slow_queries()] == [outcome]
+
+
+def test_a_streamed_query_is_timed_up_to_its_first_rows(profiling):
+    def stream():
+        with profile_query(profiling, "any", "data", QUERY, {}) as timing:
+            for value in range(3):
+                timing.mark_first_rows()
+                yield value
+
+    chunks = stream()
+    next(chunks)
+    time.sleep(0.2)  # The consumer encoding the first chunk
+    chunks.close()
+
+    [record] = get_slow_queries()
+    assert record.outcome == CLOSED
+    assert record.duration < 0.1
+    assert record.end_to_end >= 0.2
+
+
+@pytest.fixture
+def blocked_capture(monkeypatch):
+    """Replace the plan capture with one that waits for the returned event, recording its thread."""
+    release, threads = threading.Event(), []
+
+    def _capture(engine, record, query, params):
+        threads.append(threading.current_thread().name)
+        release.wait(10)
+        record.explain = "plan"
+
+    monkeypatch.setattr(query_profiler, "_capture_plan", _capture)
+    yield release, threads
+    release.set()
+
+
+def test_the_plan_is_captured_without_holding_up_the_query(profiling, blocked_capture):
+    release, threads = blocked_capture
+
+    with profile_query(profiling, "any", "data", QUERY, {}):
+        pass
+
+    [record] = get_slow_queries()
+    assert record.capturing and record.explain is None
+    release.set()
+    _wait_for_plan(record)
+    assert record.explain == "plan"
+    assert threads[0].startswith("plan-capture")
+
+
+def test_queries_beyond_the_capture_backlog_get_no_plan(profiling, blocked_capture, monkeypatch):
+    monkeypatch.setattr(query_profiler, "_capture_slots", threading.BoundedSemaphore(1))
+
+    for _ in range(2):
+        with profile_query(profiling, "any", "data", QUERY, {}):
+            pass
+
+    skipped, captured = get_slow_queries()
+    assert not skipped.capturing and "already waiting" in skipped.error
+    blocked_capture[0].set()
+    _wait_for_plan(captured)
+    assert captured.explain == "plan" and captured.error is None
@@ -0,0 +1,73 @@
+import os
+
+import pytest
+from sqlalchemy import text
+
+from utils.input_config import DATA_SOURCE_CONFIGS
+from utils.query_registry import QueryRegistry, get_query
+from utils.result_cache import make_cache_key
+
+
+def _write(path, sql: str, mtime_ns: int):
+    path.write_text(sql, encoding="utf-8")
+    # Set explicitly: two writes within the file system's timestamp resolution share an mtime
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_a_query_is_compiled_once(tmp_path):
+    _write(tmp_path / "q.sql", "select * from t where a = :a", 1_000_000_000)
+    registry = QueryRegistry(tmp_path)
+
+    assert registry.get("q") is registry.get("q")
+
+
+def test_an_edited_file_is_compiled_again(tmp_path):
+    path = tmp_path / "q.sql"
+    _write(path, "select * from t where a = :a", 1_000_000_000)
+    registry = QueryRegistry(tmp_path)
+    before = registry.get("q")
+    limited = before.variant("limit", lambda sql: text(f"{sql} limit 10"))
+    assert before.variant("limit", lambda sql: pytest.fail("compiled twice")) is limited
+
+    _write(path, "select * from t where a = :a and b = :b", 2_000_000_000)
+    after = registry.get("q")
+
+    assert after is not before
+    assert after.content_hash != before.content_hash
+    assert after.bind_names == ("a", "b")
+    assert after.variant("limit", lambda sql: text(f"{sql} limit 10")).text.endswith("b = :b limit 10")
+    assert make_cache_key("request", after.content_hash) != make_cache_key("request", before.content_hash)
+
+
+def test_the_content_hash_depends_on_the_text_only(tmp_path):
+    _write(tmp_path / "a.sql", "select 1", 1_000_000_000)
+    _write(tmp_path / "b.sql", "select 1", 2_000_000_000)
+    registry = QueryRegistry(tmp_path)
+
+    assert registry.get("a").content_hash == registry.get("b").content_hash
+
+
+def test_bind_names_skip_casts_and_escapes(tmp_path):
+    _write(tmp_path / "q.sql", "select x::date, '\\:literal' from t where a = :a and b in :ids and c = :a", 1_000_000_000)
+
+    query = QueryRegistry(tmp_path).get("q")
+
+    assert query.bind_names == ("a", "ids")
+    assert query.references("ids") and not query.references("date")
+
+
+def test_an_unknown_query_name_raises(tmp_path):
+    with pytest.raises(FileNotFoundError, match="missing.sql"):
+        QueryRegistry(tmp_path).get("missing")
+
+
+@pytest.mark.parametrize("data_source, query_type", [("no_such_source", "data"), ("keyword_lab", "no_such_query")])
+def test_an_unknown_data_source_or_query_type_raises(data_source, query_type):
+    with pytest.raises(ValueError):
+        get_query(data_source, query_type)
+
+
+def test_every_configured_query_exists():
+    for data_source, config in DATA_SOURCE_CONFIGS.items():
+        for query_type in config.get("queries", {}):
+            assert get_query(data_source, query_type).sql.strip()
@@ -0,0 +1,145 @@
+import pandas as pd
+import pytest
+
+from utils.result_cache import ResultCache, make_cache_key
+
+ENTRY_BYTES = 100
+
+
+def _put(cache: ResultCache, key: str):
+    source = cache.new_temp_path()
+    source.write_bytes(b"x" * ENTRY_BYTES)
+    cache.put_file(key, source)
+
+
+def _cached_keys(cache: ResultCache):
+    return sorted(path.stem for path in cache.directory.glob("*.parquet"))
+
+
+def test_lru_evicts_the_least_recently_used_entry(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=2 * ENTRY_BYTES, policy="lru")
+    _put(cache, "a")
+    _put(cache, "b")
+    assert cache.get_path("a") is not None
+
+    _put(cache, "c")
+
+    assert _cached_keys(cache) == ["a", "c"]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lfu_evicts_the_least_frequently_used_entry(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=2 * ENTRY_BYTES, policy="lfu")
+    _put(cache, "a")
+    _put(cache, "b")
+    for _ in range(3):
+        cache.get_path("a")
+    # Most recently used, but hit least often
+    cache.get_path("b")
+
+    _put(cache, "c")
+
+    assert _cached_keys(cache) == ["a", "c"]
+
+
+def test_the_byte_budget_is_enforced(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=3 * ENTRY_BYTES + ENTRY_BYTES // 2)
+    for key in "abcdef":
+        _put(cache, key)
+
+    stats = cache.stats()
+    assert stats["entries"] == 3
+    assert stats["bytes"] <= cache.max_bytes
+    assert _cached_keys(cache) == ["d", "e", "f"]
+
+
+def test_an_entry_larger_than_the_budget_is_kept_alone(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=ENTRY_BYTES // 2)
+    _put(cache, "a")
+    _put(cache, "b")
+
+    assert _cached_keys(cache) == ["b"]
+
+
+def test_expired_entries_are_misses(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1 << 20, ttl_seconds=60)
+    _put(cache, "a")
+    assert cache.get_path("a") is not None
+
+    cache._entries["a"].created -= 120
+
+    assert cache.get_path("a") is None
+    assert _cached_keys(cache) == []
+    assert cache.stats()["expirations"] == 1
+
+
+def test_frames_round_trip(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1 << 20)
+    df = pd.DataFrame({"storefront_id": [1001, 1006], "gmv": [1.5, 2.0]})
+    cache.put_frame("a", df)
+
+    pd.testing.assert_frame_equal(cache.get_frame("a"), df)
+    assert cache.get_frame("b") is None
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_the_index_is_rebuilt_from_disk(tmp_path):
+    _put(ResultCache(tmp_path, max_bytes=1 << 20), "a")
+
+    cache = ResultCache(tmp_path, max_bytes=1 << 20)
+
+    assert cache.get_path("a") is not None
+    assert list(tmp_path.glob(".*.tmp")) == []
+
+
+def test_the_key_changes_with_the_sql():
+    key = make_cache_key("keyword_lab:{}", "hash-1", query_type="data")
+
+    assert make_cache_key("keyword_lab:{}", "hash-1", query_type="data") == key
+    assert make_cache_key("keyword_lab:{}", "hash-2", query_type="data") != key
+    assert make_cache_key("keyword_lab:{}", "hash-1", query_type="count") != key
+    assert make_cache_key("product_tracking:{}", "hash-1", query_type="data") != key
+
+
+def test_a_held_entry_is_not_evicted(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=2 * ENTRY_BYTES)
+    _put(cache, "a")
+    with cache.hold("a"):
+        _put(cache, "b")
+        _put(cache, "c")
+        _put(cache, "d")
+        # The least recently used entry is still being read
+        assert _cached_keys(cache) == ["a", "d"]
+
+    _put(cache, "e")
+    assert _cached_keys(cache) == ["d", "e"]
+
+
+def test_the_budget_is_restored_after_the_last_reader_is_done(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=ENTRY_BYTES)
+    _put(cache, "a")
+    with cache.hold("a"):
+        with cache.hold("a"):
+            _put(cache, "b")
+        _put(cache, "c")
+        assert _cached_keys(cache) == ["a", "c"]
+
+    _put(cache, "d")
+    assert _cached_keys(cache) == ["d"]
+
+
+def test_a_held_entry_does_not_expire(tmp_path):
+    cache = ResultCache(tmp_path, max_bytes=1 << 20, ttl_seconds=60)
+    _put(cache, "a")
+    cache._entries["a"].created -= 120
+
+    with cache.hold("a"):
+        # A new lookup misses, but the file being read stays
+        assert cache.get_path("a") is None
+        assert _cached_keys(cache) == ["a"]
+
+
+@pytest.mark.parametrize("policy", ["fifo", ""])
+def test_unknown_policies_are_rejected(tmp_path, policy):
+    with pytest.raises(ValueError):
+        ResultCache(tmp_path, max_bytes=1, policy=policy)
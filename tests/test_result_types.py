@@ -0,0 +1,38 @@
+import logging
+
+import pandas as pd
+import pytest
+
+from utils import result_types
+from utils.result_types import apply_column_types
+
+
+@pytest.fixture(autouse=True)
+def no_widened_columns(monkeypatch):
+    monkeypatch.setattr(result_types, "_widened", {})
+
+
+def test_declared_integers_are_converted_losslessly():
+    df = apply_column_types("keyword_lab", pd.DataFrame({"click": [1.0, None, 3.0]}))
+
+    assert df["click"].dtype == pd.Int32Dtype()
+    assert df["click"].tolist() == [1, pd.NA, 3]
+
+
+def test_out_of_range_integers_widen_to_int64(caplog):
+    with caplog.at_level(logging.WARNING, logger="utils.result_types"):
+        df = apply_column_types("keyword_lab", pd.DataFrame({"click": [1.0, 2.0 ** 40]}))
+
+    assert df["click"].dtype == pd.Int64Dtype()
+    assert df["click"].tolist() == [1, 2 ** 40]
+    assert "click" in caplog.text
+
+
+def test_a_widened_type_applies_to_every_later_chunk():
+    chunks = [pd.DataFrame({"click": [1.0]}), pd.DataFrame({"click": [2.5]}), pd.DataFrame({"click": [3.0]})]
+
+    dtypes = [apply_column_types("keyword_lab", chunk)["click"].dtype for chunk in chunks]
+
+    assert dtypes == [pd.Int32Dtype(), "float64", "float64"]
+    # A wider type is never narrowed again
+    assert apply_column_types("keyword_lab", pd.DataFrame({"click": [2.0 ** 40]}))["click"].dtype == "float64"
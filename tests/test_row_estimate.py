@@ -0,0 +1,71 @@
+import pytest
+
+from utils.input_config import DATA_SOURCE_CONFIGS
+from utils.logic import get_data
+from utils.row_estimate import (
+    AT_MOST, ESTIMATED, EXACT, ROW_COUNT_STRATEGY_FUNCTIONS, RowEstimate, RowHistory, _exact_count, _probe_count,
+    _request_scale, check_admission,
+)
+
+
+@pytest.mark.parametrize("data_source", sorted(DATA_SOURCE_CONFIGS))
+def test_exact_count_matches_the_rows_of_the_data_query(standin_params, data_source):
+    params = standin_params(data_source)
+
+    estimate = _exact_count(data_source, params, max_rows=0)
+
+    assert estimate.kind == EXACT
+    assert estimate.rows == len(get_data('data', data_source, **params))
+
+
+def test_probe_is_exact_up_to_the_limit(standin_params):
+    params = standin_params("keyword_performance")
+    rows = _exact_count("keyword_performance", params, max_rows=0).rows
+    assert rows > 2
+
+    within = _probe_count("keyword_performance", params, max_rows=rows)
+    assert (within.kind, within.rows, within.is_exact) == (AT_MOST, rows, True)
+
+    beyond = _probe_count("keyword_performance", params, max_rows=2)
+    assert (beyond.rows, beyond.is_exact) == (3, False)
+
+
+def test_history_rate_is_smoothed_and_scaled_to_the_request(tmp_path):
+    history = RowHistory(tmp_path / "history.json")
+    params = {"workspace_id": 1, "storefront_ids": [1, 2], "start_date": "2026-01-01", "end_date": "2026-01-10"}
+    assert _request_scale(params) == 20
+    assert history.rate("keyword_lab", params) is None
+
+    history.record("keyword_lab", params, 200)
+    history.record("keyword_lab", params, 400)
+
+    assert history.rate("keyword_lab", params) == pytest.approx(0.7 * 10 + 0.3 * 20)
+    assert history.rate("keyword_lab", dict(params, workspace_id=2)) is None
+    # A new instance reads the rates back from the file
+    assert RowHistory(tmp_path / "history.json").rate("keyword_lab", params) == pytest.approx(13)
+
+
+def _strategies(monkeypatch, **estimates):
+    monkeypatch.setattr("utils.row_estimate.ROW_COUNT_STRATEGIES", list(estimates))
+    for name, estimate in estimates.items():
+        monkeypatch.setitem(ROW_COUNT_STRATEGY_FUNCTIONS, name, lambda *args, estimate=estimate: estimate)
+
+
+def test_admission_skips_estimates_close_to_the_limit(monkeypatch):
+    probe = RowEstimate(rows=101, kind=AT_MOST, strategy="probe", limit=100)
+    _strategies(monkeypatch, history=RowEstimate(rows=95, kind=ESTIMATED, strategy="history"), probe=probe)
+
+    assert check_admission("keyword_lab", {}, max_rows=100) is probe
+
+
+def test_admission_accepts_estimates_well_below_the_limit(monkeypatch):
+    history = RowEstimate(rows=10, kind=ESTIMATED, strategy="history")
+    _strategies(monkeypatch, plan=None, history=history)
+
+    assert check_admission("keyword_lab", {}, max_rows=100) is history
+
+
+def test_admission_is_undecided_without_an_answer(monkeypatch):
+    _strategies(monkeypatch, plan=None)
+
+    assert check_admission("keyword_lab", {}, max_rows=100) is None
@@ -0,0 +1,130 @@
+import os
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.session_store import SessionStore, sweep_idle_sessions
+
+
+def _frame(rows: int, first_row_id: int = 0) -> pd.DataFrame:
+    """A preview-like frame: indexed by row id, with the column types results are converted to."""
+    return pd.DataFrame(
+        {
+            "storefront_id": pd.array(np.arange(rows) % 7 + 1001, dtype="Int64"),
+            "keyword": pd.Categorical([f"k{i % 5}" for i in range(rows)]),
+            "gmv": np.linspace(0, 100, rows),
+            "created_date": pd.date_range("2026-01-01", periods=rows, freq="h"),
+            "note": [None if i % 3 else f"n{i}" for i in range(rows)],
+        },
+        index=pd.Index(np.arange(first_row_id, first_row_id + rows, dtype="int64")),
+    )
+
+
+def _size(df: pd.DataFrame) -> int:
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def _spill_files(store: SessionStore):
+    return sorted(path.name for path in store.directory.glob("*.parquet"))
+
+
+def test_small_frames_stay_in_memory(tmp_path):
+    store = SessionStore("s", tmp_path)
+    df = _frame(10)
+    store.put_frame("preview", df)
+
+    assert store.get_frame("preview") is df
+    assert store.stats()["spilled_entries"] == 0
+    assert _spill_files(store) == []
+
+
+def test_a_large_frame_is_spilled_and_read_back_unchanged(tmp_path):
+    df = _frame(500, first_row_id=1500)
+    store = SessionStore("s", tmp_path, spill_bytes=_size(df) - 1)
+    store.put_frame("preview", df)
+
+    assert _spill_files(store) == ["preview.parquet"]
+    assert store.stats() == {"entries": 1, "memory_bytes": 0, "spilled_entries": 1, "memory_budget": store.memory_budget}
+    pd.testing.assert_frame_equal(store.get_frame("preview"), df, check_index_type=True)
+
+
+def test_the_largest_frames_are_spilled_to_fit_the_budget(tmp_path):
+    small, large, new = _frame(50), _frame(400), _frame(100)
+    store = SessionStore("s", tmp_path, memory_budget=_size(small) + _size(large))
+    store.put_frame("small", small)
+    store.put_frame("large", large)
+    store.put_frame("new", new)
+
+    assert _spill_files(store) == ["large.parquet"]
+    assert store.stats()["memory_bytes"] <= store.memory_budget
+    pd.testing.assert_frame_equal(store.get_frame("large"), large)
+    assert store.get_frame("small") is small and store.get_frame("new") is new
+
+
+def test_replacing_or_discarding_an_entry_removes_its_spill_file(tmp_path):
+    store = SessionStore("s", tmp_path, spill_bytes=0)
+    store.put_frame("preview", _frame(10))
+    store.put_frame("preview", _frame(20))
+    assert len(store.get_frame("preview")) == 20
+
+    store.discard("preview")
+
+    assert store.get_frame("preview") is None
+    assert _spill_files(store) == []
+
+
+def test_idle_entries_expire_with_their_spill_files(tmp_path):
+    store = SessionStore("s", tmp_path, spill_bytes=0, idle_seconds=60)
+    store.put_frame("preview", _frame(10))
+    store.put_frame("kept", _frame(10))
+    store._entries["preview"].last_access -= 120
+
+    assert store.get_frame("preview") is None
+    assert store.get_frame("kept") is not None
+    assert _spill_files(store) == ["kept.parquet"]
+
+
+def test_clearing_the_session_removes_its_directory(tmp_path):
+    store = SessionStore("s", tmp_path, spill_bytes=0)
+    store.put_frame("preview", _frame(10))
+
+    store.clear()
+
+    assert not store.directory.exists()
+    assert store.stats()["entries"] == 0
+
+
+def test_a_lost_spill_file_reads_as_missing(tmp_path):
+    store = SessionStore("s", tmp_path, spill_bytes=0)
+    store.put_frame("preview", _frame(10))
+    (store.directory / "preview.parquet").unlink()
+
+    assert store.get_frame("preview") is None
+    assert store.stats()["entries"] == 0
+
+
+@pytest.mark.parametrize("idle", [True, False])
+def test_spill_directories_of_ended_sessions_are_swept(tmp_path, idle):
+    store = SessionStore("ended", tmp_path, spill_bytes=0)
+    store.put_frame("preview", _frame(10))
+    if idle:
+        old = time.time() - 120
+        os.utime(store.directory / "preview.parquet", (old, old))
+
+    sweep_idle_sessions(tmp_path, idle_seconds=60)
+
+    assert store.directory.exists() is not idle
+
+
+def test_reading_a_spilled_frame_keeps_its_session_from_being_swept(tmp_path):
+    store = SessionStore("active", tmp_path, spill_bytes=0)
+    store.put_frame("preview", _frame(10))
+    old = time.time() - 120
+    os.utime(store.directory / "preview.parquet", (old, old))
+
+    store.get_frame("preview")
+    sweep_idle_sessions(tmp_path, idle_seconds=60)
+
+    assert _spill_files(store) == ["preview.parquet"]
@@ -0,0 +1,150 @@
+import json
+import logging
+import re
+import threading
+
+import pytest
+
+from utils import spans
+from utils.spans import current_traceparent, span, traced, traced_chunks
+
+
+@pytest.fixture
+def written(tmp_path, monkeypatch):
+    """Write spans to a temporary file; returns a function reading back the OTLP spans in order."""
+    path = tmp_path / "spans.jsonl"
+    logger = logging.getLogger(f"export_spans.{tmp_path.name}")
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    handler = logging.FileHandler(path, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    monkeypatch.setattr(spans, "_logger", logger)
+
+    def _read():
+        handler.flush()
+        lines = path.read_text(encoding="utf-8").splitlines()
+        return [json.loads(line)["resourceSpans"][0]["scopeSpans"][0]["spans"][0] for line in lines]
+
+    yield _read
+    logger.removeHandler(handler)
+    handler.close()
+
+
+def _attributes(otlp_span) -> dict:
+    return {attribute["key"]: attribute["value"] for attribute in otlp_span["attributes"]}
+
+
+def test_nested_spans_share_the_trace(written):
+    @traced("build_params")
+    def build_params():
+        return {}
+
+    with span("export", data_source="keyword_lab"):
+        with span("db.execute"):
+            build_params()
+
+    inner, execute, export = written()
+    assert [s["name"] for s in (inner, execute, export)] == ["build_params", "db.execute", "export"]
+    assert inner["traceId"] == execute["traceId"] == export["traceId"]
+    assert inner["parentSpanId"] == execute["spanId"]
+    assert execute["parentSpanId"] == export["spanId"]
+    assert "parentSpanId" not in export
+
+
+def test_separate_blocks_start_separate_traces(written):
+    with span("first"):
+        pass
+    with span("second"):
+        pass
+
+    first, second = written()
+    assert first["traceId"] != second["traceId"]
+
+
+def test_traceparent_carries_the_trace_to_another_thread(written):
+    seen = {}
+
+    def job(traceparent):
+        with span("job", parent=traceparent):
+            with span("job.step"):
+                pass
+        # Without the traceparent the thread has no current span
+        seen["outside"] = current_traceparent()
+
+    with span("submit") as submit:
+        traceparent = current_traceparent()
+        assert traceparent == f"00-{submit.trace_id}-{submit.span_id}-01"
+        thread = threading.Thread(target=job, args=(traceparent,))
+        thread.start()
+        thread.join()
+
+    step, job_span, submit_span = written()
+    assert {step["traceId"], job_span["traceId"]} == {submit_span["traceId"]}
+    assert job_span["parentSpanId"] == submit_span["spanId"]
+    assert step["parentSpanId"] == job_span["spanId"]
+    assert seen["outside"] is None
+
+
+def test_an_invalid_traceparent_starts_a_new_trace(written):
+    with span("job", parent="00-not-a-trace"):
+        pass
+
+    (job,) = written()
+    assert re.fullmatch("[0-9a-f]{32}", job["traceId"])
+    assert "parentSpanId" not in job
+
+
+def test_a_failing_span_has_status_code_2(written):
+    with span("export"):
+        with pytest.raises(ValueError):
+            with span("db.execute"):
+                raise ValueError("Unknown column 'gmv'")
+
+    failed, export = written()
+    assert failed["status"] == {"code": 2, "message": "ValueError: Unknown column 'gmv'"}
+    assert export["status"] == {"code": 1}
+
+
+def test_each_line_is_an_otlp_json_trace_request(written, tmp_path):
+    with span("export.write", data_source="keyword_lab", rows=1200, seconds=0.5, cached=False, error=None):
+        pass
+
+    (line,) = (tmp_path / "spans.jsonl").read_text(encoding="utf-8").splitlines()
+    request = json.loads(line)
+    (resource_spans,) = request["resourceSpans"]
+    resource = {attribute["key"]: attribute["value"] for attribute in resource_spans["resource"]["attributes"]}
+    assert resource["service.name"] == {"stringValue": spans.SERVICE_NAME}
+    (scope_spans,) = resource_spans["scopeSpans"]
+    assert scope_spans["scope"] == {"name": "utils.spans"}
+    (otlp_span,) = scope_spans["spans"]
+
+    assert re.fullmatch("[0-9a-f]{32}", otlp_span["traceId"])
+    assert re.fullmatch("[0-9a-f]{16}", otlp_span["spanId"])
+    assert otlp_span["kind"] == 1
+    # OTLP/JSON encodes 64-bit integers, including timestamps, as strings
+    assert 0 < int(otlp_span["startTimeUnixNano"]) <= int(otlp_span["endTimeUnixNano"])
+    assert _attributes(otlp_span) == {
+        "data_source": {"stringValue": "keyword_lab"},
+        "rows": {"intValue": "1200"},
+        "seconds": {"doubleValue": 0.5},
+        "cached": {"boolValue": False},
+    }
+
+
+def test_each_chunk_is_a_span(written):
+    with span("export.write"):
+        assert list(traced_chunks("db.fetch", iter([[1, 2], [3]]))) == [[1, 2], [3]]
+
+    *fetches, write = written()
+    assert [_attributes(s)["rows"] for s in fetches] == [{"intValue": "2"}, {"intValue": "1"}, {"intValue": "0"}]
+    assert all(s["parentSpanId"] == write["spanId"] for s in fetches)
+
+
+def test_traced_calls_outside_a_trace_are_not_recorded(written):
+    @traced("validate")
+    def validate():
+        return True
+
+    assert validate()
+    assert written() == []
@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from utils.sql_binding import bind_text, in_list_bucket, pad_in_list, references_param
+
+SQL = "select storefront_id, gmv from storefront where workspace_id = :workspace_id and storefront_id in :storefront_ids order by 1"
+
+
+@pytest.fixture(scope="module")
+def connection():
+    engine = create_engine("sqlite://")
+    with engine.connect() as connection:
+        connection.execute(text("create table storefront (storefront_id integer, workspace_id integer, gmv real)"))
+        connection.execute(
+            text("insert into storefront values (:storefront_id, :workspace_id, :gmv)"),
+            [{"storefront_id": i, "workspace_id": 1 if i <= 20 else 2, "gmv": i * 1.5} for i in range(1, 31)],
+        )
+        yield connection
+
+
+@pytest.mark.parametrize("size, bucket", [(0, 1), (1, 1), (2, 2), (3, 4), (4, 4), (5, 8), (9, 16), (16, 16), (17, 32), (1000, 1024)])
+def test_buckets_are_powers_of_two(size, bucket):
+    assert in_list_bucket(size) == bucket
+
+
+def test_lists_are_padded_with_their_last_value():
+    assert pad_in_list([1001, 1006, 1007]) == [1001, 1006, 1007, 1007]
+    assert pad_in_list((1001,)) == [1001]
+    assert pad_in_list([]) == []
+
+
+def test_lists_of_one_bucket_bind_the_same_number_of_values():
+    lengths = {len(bind_text(SQL, {"workspace_id": 1, "storefront_ids": list(range(size))})[1]["storefront_ids"])
+               for size in (5, 6, 7, 8)}
+
+    assert lengths == {8}
+
+
+@pytest.mark.parametrize("storefront_ids", [[3], [3, 7, 11], [1, 2, 3, 4, 5], [5, 21, 2, 19, 17, 8, 30, 9, 11]])
+def test_padding_does_not_change_the_result(connection, storefront_ids):
+    statement, params = bind_text(SQL, {"workspace_id": 1, "storefront_ids": storefront_ids})
+    assert len(params["storefront_ids"]) == in_list_bucket(len(storefront_ids))
+
+    rows = connection.execute(statement, params).fetchall()
+
+    unpadded = connection.execute(text(SQL.replace(":storefront_ids", f"({', '.join(map(str, storefront_ids))})")),
+                                  {"workspace_id": 1}).fetchall()
+    assert rows == unpadded
+    assert [row.storefront_id for row in rows] == sorted(i for i in storefront_ids if i <= 20)
+
+
+def test_an_empty_list_matches_nothing(connection):
+    statement, params = bind_text(SQL, {"workspace_id": 1, "storefront_ids": []})
+
+    assert params["storefront_ids"] == []
+    assert connection.execute(statement, params).fetchall() == []
+
+
+def test_only_referenced_lists_are_expanded():
+    statement, params = bind_text("select 1 where 1 in :ids", {"ids": [1, 2, 3], "other_ids": [1, 2, 3]})
+
+    assert params == {"ids": [1, 2, 3, 3], "other_ids": [1, 2, 3]}
+    assert set(statement._bindparams) == {"ids"}
+
+
+def test_parameter_references():
+    assert references_param(SQL, "storefront_ids")
+    assert not references_param(SQL, "storefront")
+    assert not references_param("select '2026-01-01 00:00:00'", "00")
+    assert not references_param("select x::storefront_ids", "storefront_ids")
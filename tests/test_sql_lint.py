@@ -0,0 +1,55 @@
+import pytest
+
+from utils.sql_lint import SQL_DIR, lint_directory, lint_file, load_baseline, new_findings
+
+
+def _rules(tmp_path, sql, name="query_data.sql"):
+    path = tmp_path / name
+    path.write_text(sql, encoding="utf-8")
+    return [finding.rule for finding in lint_file(path, tmp_path)]
+
+
+def test_sql_files_have_no_findings_beyond_the_baseline():
+    new = new_findings(lint_directory(SQL_DIR), load_baseline())
+
+    assert [f"{finding.file}:{finding.line} [{finding.rule}]" for finding in new] == []
+
+
+@pytest.mark.parametrize("sql, rules", [
+    # non-sargable
+    ("SELECT * FROM t WHERE date(t.created_datetime) BETWEEN :start_date AND :end_date", ["non-sargable"]),
+    ("SELECT date(t.created_datetime) AS day FROM t WHERE t.created_datetime >= :start_date", []),
+    # catch-all
+    ("SELECT * FROM t WHERE (:device_type IS NULL OR t.device_type = :device_type)", ["catch-all"]),
+    ("SELECT * FROM t WHERE t.device_type = :device_type", []),
+    # cross-join
+    ("SELECT * FROM a JOIN b ON (true)", ["cross-join"]),
+    ("SELECT * FROM a CROSS JOIN b", ["cross-join"]),
+    ("SELECT * FROM a, b WHERE a.id = b.id", ["cross-join"]),
+    ("SELECT * FROM a JOIN b ON a.id = b.a_id", []),
+    # in-list
+    ("SELECT * FROM t WHERE t.id IN (:storefront_ids)", ["in-list"]),
+    ("SELECT * FROM t WHERE t.id IN :storefront_ids", []),
+])
+def test_rules(tmp_path, sql, rules):
+    assert _rules(tmp_path, sql) == rules
+
+
+def test_duplicate_cte(tmp_path):
+    data = "WITH dims AS (SELECT id FROM t WHERE t.workspace_id = :workspace_id) SELECT * FROM dims"
+    _rules(tmp_path, data, "report_data.sql")
+
+    assert _rules(tmp_path, data.replace("SELECT *", "SELECT 1"), "report_keys.sql") == ["duplicate-cte"]
+    assert _rules(tmp_path, "WITH dims AS (SELECT id FROM t) SELECT 1 FROM dims", "report_keys.sql") == []
+
+
+def test_baseline_entries_cover_one_occurrence_each(tmp_path):
+    path = tmp_path / "query_data.sql"
+    path.write_text("SELECT * FROM a JOIN b ON (true) JOIN c ON (true)", encoding="utf-8")
+    findings = lint_file(path, tmp_path)
+    assert len(findings) == 2
+
+    baseline = load_baseline(tmp_path / "missing.json")
+    baseline[findings[0].fingerprint()] += 1
+
+    assert new_findings(findings, baseline) == findings[1:]
@@ -0,0 +1,88 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from utils import logic
+from utils.logic import get_summary, materialize_result
+from utils.summary import get_summary_spec, read_summary, summarize_frame, summary_sql
+
+# Ad metrics of one keyword, storefront and month repeated on every display type row
+KEYWORD_PERFORMANCE_ROWS = pd.DataFrame({
+    "keyword": ["shoes", "shoes", "bags", "bags", "hats"],
+    "aos_id": [1, 1, 1, 2, 2],
+    "created_datetime": ["2026-01", "2026-01", "2026-01", "2026-01", "2026-02"],
+    "display_type": ["search", "discovery", "search", "search", "search"],
+    "ads_gmv": [100.0, 100.0, 50.0, 30.0, None],
+    "direct_gmv": [80.0, 80.0, 40.0, 20.0, None],
+    "cost": [20.0, 20.0, 10.0, 10.0, None],
+    "click": [10, 10, 5, 5, 0],
+    "impression": [1000, 1000, 500, 500, 100],
+    "ads_order": [4, 4, 1, 1, 0],
+})
+
+
+def _sql_summary(spec, df):
+    with sqlite3.connect(":memory:") as connection:
+        df.to_sql("result", connection, index=False)
+        return read_summary(spec, pd.read_sql(summary_sql(spec, "SELECT * FROM result"), connection))
+
+
+def test_keyword_performance_counts_each_grain_once():
+    spec = get_summary_spec("keyword_performance")
+
+    summary = summarize_frame(spec, KEYWORD_PERFORMANCE_ROWS)
+
+    assert summary["Ads GMV"] == 180.0
+    assert summary["Cost"] == 40.0
+    assert summary["Clicks"] == 20.0
+    assert summary["Keywords"] == 3.0
+    assert summary["Storefronts"] == 2.0
+    assert summary["Months"] == 2.0
+    assert summary["ROAS"] == pytest.approx(180 / 40)
+    assert summary["CR"] == pytest.approx(6 / 20)
+
+
+def test_sql_and_frame_summaries_agree():
+    for data_source in ("keyword_performance", "keyword_lab"):
+        spec = get_summary_spec(data_source)
+        df = KEYWORD_PERFORMANCE_ROWS.assign(storefront_id=KEYWORD_PERFORMANCE_ROWS["aos_id"],
+                                             ads_item_sold=KEYWORD_PERFORMANCE_ROWS["ads_order"])
+
+        assert _sql_summary(spec, df) == pytest.approx(summarize_frame(spec, df))
+
+
+def test_read_summary_of_an_empty_result_has_no_values():
+    spec = {"sums": {"cost": "Cost"}, "distinct": {"keyword": "Keywords"}, "ratios": {"CPC": ["cost", "click"]}}
+
+    assert read_summary(spec, pd.DataFrame()) == {"Cost": None, "Keywords": None, "CPC": None}
+
+
+def test_ratios_without_a_denominator_are_none():
+    spec = {"ratios": {"CPC": ["cost", "click"]}}
+
+    assert summarize_frame(spec, pd.DataFrame({"cost": [5.0], "click": [0]})) == {"CPC": None}
+    assert _sql_summary(spec, pd.DataFrame({"cost": [5.0], "click": [0]})) == {"CPC": None}
+
+
+@pytest.mark.parametrize("spec", [
+    {"sums": {"cost; DROP TABLE x": "Cost"}},
+    {"grain": ["keyword"], "sums": {"cost": "Cost"}, "distinct": {"storefront_id": "Storefronts"}},
+])
+def test_summary_sql_rejects_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        summary_sql(spec, "SELECT 1")
+
+
+def test_a_materialized_result_is_summarized_without_querying_again(standin_params, monkeypatch):
+    params = standin_params("keyword_lab")
+    spec = get_summary_spec("keyword_lab")
+    expected = read_summary(spec, logic.get_data('summary', "keyword_lab", **params))
+    result = materialize_result("keyword_lab", params)
+    assert result.is_available
+
+    def _no_query(*args, **kwargs):
+        raise AssertionError("The summary query ran again")
+
+    monkeypatch.setattr(logic, "get_data", _no_query)
+    assert get_summary("keyword_lab", params, result) == pytest.approx(expected)
@@ -0,0 +1,52 @@
+import contextvars
+import threading
+
+import pytest
+
+from utils import tracing
+from utils.jobs import PREPARE_JOB, ExportJob, JobManager
+from utils.tracing import get_traces, session_scope, trace_function_call
+
+
+@trace_function_call
+def _traced(value):
+    return value * 2
+
+
+@pytest.fixture
+def trace_everything():
+    previous = tracing.get_sample_rate()
+    tracing.set_sample_rate(1.0)
+    tracing.clear_traces()
+    yield
+    tracing.set_sample_rate(previous)
+    tracing.clear_traces()
+
+
+def test_calls_outside_a_script_run_use_the_session_scope(trace_everything):
+    _traced(1)
+    with session_scope("session-a"):
+        _traced(2)
+
+    assert [record.args for record in get_traces("session-a")] == [("2",)]
+    assert [record.session_id for record in get_traces()] == [None, "session-a"]
+
+
+def test_job_calls_are_recorded_for_the_submitting_session(trace_everything, tmp_path):
+    manager = JobManager(tmp_path, max_workers=1, retention_seconds=60)
+    done = threading.Event()
+
+    def work():
+        # Like a partition, run on another thread in a copy of the job's context
+        partition = threading.Thread(target=contextvars.copy_context().run, args=(_traced, 3))
+        partition.start()
+        partition.join()
+        done.set()
+
+    job = ExportJob(job_id="job-1", kind=PREPARE_JOB, data_source="keyword_lab", sql_params={})
+    with session_scope("session-b"):
+        manager._submit(job, work)
+    assert done.wait(10)
+
+    assert job.session_id == "session-b"
+    assert [record.args for record in get_traces("session-b")] == [("3",)]
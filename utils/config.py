@@ -1,4 +1,138 @@
+import os
+import tempfile
 from pathlib import Path
 
 # Define the project root directory
 PROJECT_ROOT = Path(__file__).parent.parent
+
+# --- Export settings ---
+# Number of rows shown in the preview
+PREVIEW_ROW_LIMIT = 500
+
+# Preview pages held in memory for all sessions, including pages prefetched in the background
+PREVIEW_PAGE_CACHE_PAGES = int(os.getenv("PREVIEW_PAGE_CACHE_PAGES", "32"))
+
+# Number of rows fetched from the server-side cursor per round trip during a full export
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "10000"))
+
+# Hard upper bound on the number of rows a single export may contain. Exports stream in chunks, so
+# memory no longer limits it; it bounds the load one export puts on the database and the file size
+MAX_EXPORT_ROWS = int(os.getenv("MAX_EXPORT_ROWS", "500000"))
+
+# Directory where export files are written before being served for download
+EXPORT_DIR = Path(os.getenv("EXPORT_DIR", Path(tempfile.gettempdir()) / "data_export_tool"))
+
+# Query timeout for data sources without their own "timeout_seconds" (0 disables it). A watchdog thread
+# sends KILL QUERY when it passes, and the server enforces it too (see utils/query_control.py)
+DEFAULT_QUERY_TIMEOUT_SECONDS = int(os.getenv("DEFAULT_QUERY_TIMEOUT_SECONDS", "300"))
+
+# The server-side limit is the query timeout plus this margin, so the watchdog normally stops a query first
+SERVER_TIMEOUT_GRACE_SECONDS = int(os.getenv("SERVER_TIMEOUT_GRACE_SECONDS", "10"))
+
+# SingleStore enforces the server-side limit through resource pools named <prefix><seconds>s, each with
+# that QUERY_TIMEOUT (see query_control.resource_pool_statements); empty disables it
+QUERY_TIMEOUT_RESOURCE_POOL_PREFIX = os.getenv("QUERY_TIMEOUT_RESOURCE_POOL_PREFIX", "export_timeout_")
+
+# --- Slow query profiling (opt-in) ---
+# "explain" captures the EXPLAIN plan of slow queries, "profile" also runs them once more under PROFILE
+QUERY_PROFILING = {"1": "explain", "true": "explain", "on": "explain", "explain": "explain", "profile": "profile"}.get(
+    os.getenv("QUERY_PROFILING", "off").strip().lower()
+)
+
+# Queries running longer than this are profiled, unless their data source sets "slow_query_seconds"
+SLOW_QUERY_SECONDS = float(os.getenv("SLOW_QUERY_SECONDS", "10"))
+
+# Plans are captured one at a time in the background; slow queries beyond this many waiting captures get none
+PLAN_CAPTURE_BACKLOG = int(os.getenv("PLAN_CAPTURE_BACKLOG", "4"))
+
+# Number of slow queries kept for the debug panel
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", "50"))
+
+# --- Call tracing (off by default) ---
+# Fraction of calls of traced functions recorded for the debug panel: 0 disables tracing, 1 records every call
+TRACE_SAMPLE_RATE = min(max(float(os.getenv("TRACE_SAMPLE_RATE", "0")), 0.0), 1.0)
+
+# Number of traced calls kept, across all sessions; the oldest are dropped first
+TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "1000"))
+
+# --- Export pipeline spans ---
+# JSONL file receiving a span per export stage in OTLP/JSON form; set to an empty value to disable
+_span_log_path = os.getenv("SPAN_LOG_PATH", str(EXPORT_DIR / "spans" / "spans.jsonl"))
+SPAN_LOG_PATH = Path(_span_log_path) if _span_log_path else None
+
+# The file is rotated at this size, keeping this many rotated files
+SPAN_LOG_MAX_BYTES = int(os.getenv("SPAN_LOG_MAX_BYTES", str(64 * 1024 ** 2)))
+SPAN_LOG_BACKUP_COUNT = int(os.getenv("SPAN_LOG_BACKUP_COUNT", "5"))
+
+# --- Metrics endpoint ---
+# Prometheus metrics are served on http://METRICS_HOST:METRICS_PORT/metrics; port 0 disables the endpoint
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9464"))
+
+# --- Session data store ---
+# Spill files of the DataFrames sessions keep between reruns (see utils/session_store.py)
+SESSION_STORE_DIR = Path(os.getenv("SESSION_STORE_DIR", EXPORT_DIR / "sessions"))
+
+# Memory a single session may hold in DataFrames; larger entries are spilled to disk
+SESSION_MEMORY_BUDGET_BYTES = int(os.getenv("SESSION_MEMORY_BUDGET_BYTES", str(64 * 1024 ** 2)))
+
+# A single frame larger than this goes straight to disk
+SESSION_SPILL_BYTES = int(os.getenv("SESSION_SPILL_BYTES", str(16 * 1024 ** 2)))
+
+# Entries not accessed for this long are freed, as are the spill files of ended sessions
+SESSION_IDLE_SECONDS = int(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+
+# --- Result cache settings ---
+# Shared on-disk cache of query results (including materialized full results)
+RESULT_CACHE_DIR = Path(os.getenv("RESULT_CACHE_DIR", EXPORT_DIR / "result_cache"))
+
+# Total size budget of the cache; least valuable entries are evicted beyond it
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+# Entries older than this are refetched from the database
+RESULT_CACHE_TTL_SECONDS = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+
+# Eviction policy: "lru" (least recently used) or "lfu" (least frequently used)
+RESULT_CACHE_POLICY = os.getenv("RESULT_CACHE_POLICY", "lru")
+
+# --- Incremental aggregate settings ---
+# Per-day partial aggregates are settled history, so they get their own, longer-lived cache
+PARTIAL_CACHE_DIR = Path(os.getenv("PARTIAL_CACHE_DIR", EXPORT_DIR / "partial_cache"))
+PARTIAL_CACHE_MAX_BYTES = int(os.getenv("PARTIAL_CACHE_MAX_BYTES", str(512 * 1024 ** 2)))
+PARTIAL_CACHE_TTL_SECONDS = int(os.getenv("PARTIAL_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# The most recent days can still receive late data, so they are always queried, never cached
+INCREMENTAL_SETTLE_DAYS = int(os.getenv("INCREMENTAL_SETTLE_DAYS", "3"))
+
+# --- Background export job settings ---
+# Size of the worker pool shared by every session; further jobs wait in the queue
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "4"))
+
+# Job records are persisted here, one JSON file per job, so they survive reruns and restarts
+JOBS_DIR = Path(os.getenv("JOBS_DIR", EXPORT_DIR / "jobs"))
+
+# Finished jobs and their export files are deleted after this long
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(24 * 3600)))
+
+# A query job that no page has polled for this long was abandoned (e.g. the tab was closed) and is cancelled
+JOB_ABANDON_SECONDS = int(os.getenv("JOB_ABANDON_SECONDS", "120"))
+
+# --- Row count admission check ---
+# Strategies asked, in order, whether a result fits under MAX_EXPORT_ROWS before the data query
+# runs (see utils/row_estimate.py): "history", "plan", "probe" and "exact"
+ROW_COUNT_STRATEGIES = [name.strip() for name in os.getenv("ROW_COUNT_STRATEGIES", "history,plan,probe").split(",") if name.strip()]
+
+# An estimate admits a request without a probe only if it is below this fraction of the limit
+ROW_ESTIMATE_ADMIT_RATIO = float(os.getenv("ROW_ESTIMATE_ADMIT_RATIO", "0.5"))
+
+# Observed row counts per data source and workspace, the basis of the "history" estimate
+ROW_HISTORY_PATH = Path(os.getenv("ROW_HISTORY_PATH", EXPORT_DIR / "row_history.json"))
+
+# --- Partitioned execution ---
+# Data queries of sources with a "partitions" rule are split into partitions of at most this
+# many storefronts and this many days each (see utils/partitioned.py)
+PARTITION_STOREFRONTS = int(os.getenv("PARTITION_STOREFRONTS", "2"))
+PARTITION_WINDOW_DAYS = int(os.getenv("PARTITION_WINDOW_DAYS", "31"))
+
+# Partitions running at once, across every request; each holds a pooled connection while it runs
+PARTITION_WORKERS = int(os.getenv("PARTITION_WORKERS", "4"))
@@ -1,10 +1,15 @@
 import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
 import streamlit as st
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.pool import Pool, QueuePool
 from contextlib import contextmanager
 from dotenv import load_dotenv
+from utils.metrics import registry
 
 # Load environment variables from the .env file
 load_dotenv()
@@ -16,27 +21,190 @@ DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT")
 DB_NAME = os.getenv("DB_NAME")
 
+# A full SQLAlchemy URL overrides the DB_* variables, e.g. to point the benchmarks at a local stand-in database
+DATABASE_URL = os.getenv("DATABASE_URL")
+
 # Check if all variables exist
-if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME]):
+if not DATABASE_URL and not all([DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME]):
     st.error("Database configuration error: One or more environment variables are missing. Please check your .env file.")
     st.stop()
 
 # Build the database connection URL
-SQLALCHEMY_DATABASE_URL = (
+SQLALCHEMY_DATABASE_URL = DATABASE_URL or (
     f"singlestoredb://{DB_USER}:{DB_PASSWORD}@"
     f"{DB_HOST}:{DB_PORT}/{DB_NAME}"
 )
 
+# --- Connection pool settings ---
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+# Connections opened in the background at startup, so the first user does not pay for connection setup
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", "4"))
+
+# Only the most recent checkout waits are kept for the percentiles
+_WAIT_SAMPLES = 1000
+
+
+class PoolMetrics:
+    """Counters and checkout wait times of the connection pool, shared by every session."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waits = deque(maxlen=_WAIT_SAMPLES)
+        self.counters = {
+            "checkouts": 0,
+            "connects": 0,  # New physical connections
+            "overflow_checkouts": 0,  # Checkouts served beyond pool_size
+            "timeouts": 0,  # Checkouts that gave up after pool_timeout
+            "invalidations": 0,  # Connections found dead (e.g. by pre-ping) and replaced
+        }
+
+    def increment(self, counter: str):
+        with self._lock:
+            self.counters[counter] += 1
+
+    def record_wait(self, seconds: float):
+        with self._lock:
+            self._waits.append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            waits = sorted(self._waits)
+            counters = dict(self.counters)
+
+        def _percentile(fraction: float) -> Optional[float]:
+            if not waits:
+                return None
+            return round(waits[min(int(len(waits) * fraction), len(waits) - 1)] * 1000, 2)
+
+        return {
+            **counters,
+            "wait_ms_p50": _percentile(0.5),
+            "wait_ms_p95": _percentile(0.95),
+            "wait_ms_max": round(waits[-1] * 1000, 2) if waits else None,
+        }
+
+
+pool_metrics = PoolMetrics()
+
+POOL_CHECKOUT_WAIT = registry.histogram(
+    "db_pool_checkout_wait_seconds", "Time a checkout waited for a pooled connection",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30))
+
+
+class InstrumentedQueuePool(QueuePool):
+    """A QueuePool that records how long checkouts wait, overflow use and checkout timeouts."""
+
+    def _do_get(self):
+        overflow_before = self._overflow
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            pool_metrics.increment("timeouts")
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            pool_metrics.record_wait(waited)
+            POOL_CHECKOUT_WAIT.observe(waited)
+        if self._overflow > max(overflow_before, 0):
+            pool_metrics.increment("overflow_checkouts")
+        return connection
+
+
 # Create the SQLAlchemy engine
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
-    poolclass=QueuePool,
-    pool_size=10,
-    max_overflow=5,
-    pool_timeout=30,
-    pool_recycle=1800
+    poolclass=InstrumentedQueuePool,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_recycle=DB_POOL_RECYCLE,
+    # Validate connections on checkout, so stale ones are replaced instead of surfacing as OperationalError
+    pool_pre_ping=True,
 )
 
+
+@event.listens_for(Pool, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    pool_metrics.increment("connects")
+
+
+@event.listens_for(Pool, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    pool_metrics.increment("checkouts")
+
+
+@event.listens_for(Pool, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    pool_metrics.increment("invalidations")
+
+
+def warm_up_pool(count: int = DB_POOL_WARMUP):
+    """Open `count` connections and return them to the pool idle, ready for the first queries."""
+    connections = []
+    try:
+        for _ in range(min(count, DB_POOL_SIZE)):
+            connection = engine.connect()
+            connections.append(connection)
+            connection.exec_driver_sql("SELECT 1")
+    finally:
+        for connection in connections:
+            connection.close()
+
+
+def _warm_up_in_background():
+    try:
+        warm_up_pool()
+    except Exception:
+        # The database may be unreachable at startup; queries will connect on demand
+        pass
+
+
+def get_pool_stats() -> Dict[str, Any]:
+    """In-use and idle connection counts of the pool plus the recorded checkout metrics."""
+    pool = engine.pool
+    stats = {"pool_size": DB_POOL_SIZE, "max_overflow": DB_MAX_OVERFLOW}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            "pool_size": pool.size(),
+            "in_use": pool.checkedout(),
+            "idle": pool.checkedin(),
+            "overflow_in_use": max(pool.overflow(), 0),
+        })
+    stats.update(pool_metrics.snapshot())
+    return stats
+
+
+def _collect_pool_metrics():
+    """Connection pool state and counters, for the metrics endpoint."""
+    stats = get_pool_stats()
+    metrics = [
+        ("db_pool_size", "gauge", "Configured number of pooled connections", [({}, stats["pool_size"])]),
+        ("db_pool_max_overflow", "gauge", "Connections allowed beyond the pool size", [({}, stats["max_overflow"])]),
+    ]
+    if "in_use" in stats:
+        metrics.append(("db_pool_connections", "gauge", "Connections by state", [
+            ({"state": "in_use"}, stats["in_use"]),
+            ({"state": "idle"}, stats["idle"]),
+            ({"state": "overflow_in_use"}, stats["overflow_in_use"]),
+        ]))
+    for counter, documentation in (
+        ("checkouts", "Connections checked out of the pool"),
+        ("connects", "New physical connections opened"),
+        ("overflow_checkouts", "Checkouts served beyond the pool size"),
+        ("timeouts", "Checkouts that gave up after the pool timeout"),
+        ("invalidations", "Connections found dead and replaced"),
+    ):
+        metrics.append((f"db_pool_{counter}_total", "counter", documentation, [({}, stats[counter])]))
+    return metrics
+
+
+registry.register_collector(_collect_pool_metrics)
+
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 @contextmanager
@@ -45,4 +213,8 @@ def get_connection():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+if DB_POOL_WARMUP > 0:
+    threading.Thread(target=_warm_up_in_background, name="db-pool-warmup", daemon=True).start()
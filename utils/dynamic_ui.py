@@ -8,13 +8,23 @@ replacing the hardcoded form generation in ui_components.py.
 import streamlit as st
 from typing import List, Dict, Any, Tuple
 from datetime import date
-import time
 from datetime import datetime, timedelta
-from utils.helpers import trace_function_call
+from pathlib import Path
+from utils.spans import span
+from utils.tracing import clear_session_traces, trace_function_call
 from typing import Dict, Any, Tuple, Optional, List
-from utils.input_config import get_input_config, get_data_source_config, INPUT_FIELDS
+from utils.input_config import get_input_config, get_data_source_config, resolve_date_preset, INPUT_FIELDS
 from utils.input_validator import validate_data_source_inputs, build_sql_params
-from utils.logic import load_data, convert_df_to_csv
+from utils.logic import PREVIEW_KEY, apply_export_job, apply_prepare_job, describe_row_count, get_row_count, submit_full_export
+from utils.materialize import read_result_rows
+from utils.preview_pages import get_preview_pages
+from utils.session_store import get_session_store
+from utils.config import JOB_ABANDON_SECONDS, MAX_EXPORT_ROWS, PREVIEW_ROW_LIMIT
+from utils.exporters import EXPORT_FORMATS, DEFAULT_EXPORT_FORMAT
+from utils.jobs import PREPARE_JOB, get_job_manager
+
+# How often a waiting page polls the state of its background job, in seconds
+JOB_POLL_INTERVAL = 1.0
 
 def create_dynamic_input_form(data_source: str) -> Tuple[Dict[str, Any], List[str]]:
     """
@@ -191,11 +201,10 @@ def _render_date_range_field(field_name: str, data_source: str) -> Tuple[Optiona
                 key=f"end_date_{data_source}"
             )
     else:
-        # Use preset dates
-        preset_dates = presets[selected_preset]
+        # Use preset dates, resolved against today's date
+        preset_dates = resolve_date_preset(selected_preset)
         if preset_dates:
-            start_date = preset_dates["start"]
-            end_date = preset_dates["end"]
+            start_date, end_date = preset_dates
     
     return start_date, end_date
 
@@ -223,55 +232,76 @@ def create_action_buttons(data_source: str, input_values: Dict[str, Any], valida
         help="Click to start data export process" if not button_disabled else "Please fix validation errors first"
     ):
         # Reset the trace for the new action
-        if 'call_trace' in st.session_state:
-            st.session_state.call_trace = []
+        clear_session_traces()
+
+        # The export trace starts here and is continued by the background job (see utils/spans.py)
+        with span("export.request", data_source=data_source):
+            # Validated again inside the trace, so the validation stage is part of it
+            validation_errors = validate_data_source_inputs(data_source, input_values)
+            if not validation_errors:
+                # Build SQL parameters
+                sql_params = build_sql_params(data_source, input_values)
+
+                # Store current page and data source info for tab state management
+                current_page = st.session_state.get('current_page')
 
+                # Store in session state for processing
+                st.session_state.params = {
+                    "data_source": data_source,
+                    "current_page": current_page,  # Save page info for tab state
+                    **sql_params
+                }
+
+                # Import and call the refactored logic
+                from utils.logic import handle_export_process
+
+                handle_export_process(data_source=data_source)
         if not validation_errors:
-            # Build SQL parameters
-            sql_params = build_sql_params(data_source, input_values)
-            
-            # Store current page and data source info for tab state management
-            current_page = st.session_state.get('current_page')
-            
-            # Store in session state for processing
-            st.session_state.params = {
-                "data_source": data_source,
-                "current_page": current_page,  # Save page info for tab state
-                **sql_params
-            }
-            
-            # Import and call the refactored logic
-            from utils.logic import handle_export_process
-            
-            handle_export_process(data_source=data_source)
             st.rerun()
 
 
 # --- Helper functions for display_data_exporter ---
-def _handle_loading_preview():
-    """Stage 1: Load a preview of the data (first 500 rows)."""
-    start_time = time.time()
-    with st.spinner("Loading preview (500 rows)..."):
-        df_preview = load_data(st.session_state.params.get('data_source'), limit=500)
-        if df_preview is not None and not df_preview.empty:
-            st.session_state.df_preview = df_preview
-            st.session_state.stage = 'loaded'
-        else:
-            st.warning("No data found for the selected criteria.")
-            st.session_state.stage = 'initial'
-    st.session_state.query_duration = time.time() - start_time
+def _display_preparing():
+    """Stage 0: Wait for the background job that runs the query and materializes the result."""
+    _poll_job(st.session_state.get('job_id'), "Running query and checking data size...")
+
+@st.fragment(run_every=JOB_POLL_INTERVAL)
+def _poll_job(job_id: Optional[str], text: str):
+    """Show the progress of a background job, and move the session on once it has finished."""
+    manager = get_job_manager()
+    job = manager.get(job_id) if job_id else None
+    if job is None:
+        st.session_state.stage = 'initial'
+        st.rerun()
+
+    if not job.is_finished:
+        # Queries no page waits for any more are cancelled, see JOB_ABANDON_SECONDS
+        manager.heartbeat(job_id)
+        if job.total_rows:
+            text = f"{text} {job.rows_done:,} of {job.total_rows:,} rows."
+        st.progress(job.progress, text=text)
+        st.caption(f"This runs in the background. Keep this page or the Export Jobs page open: a query no page "
+                   f"has checked on for {JOB_ABANDON_SECONDS:,} seconds is cancelled.")
+        if st.button("✖️ Cancel", key=f"cancel_{job_id}"):
+            manager.cancel(job_id)
+        return
+
+    if job.kind == PREPARE_JOB:
+        apply_prepare_job(job)
+    else:
+        apply_export_job(job)
     st.rerun()
 
 def _display_results():
-    """Stage 2: Display the data preview and summary metrics."""
-    df_preview = st.session_state.get('df_preview')
+    """Stage 1: Display the data preview and summary metrics."""
+    df_preview = _get_preview()
     if df_preview is None:
         st.session_state.stage = 'initial'
         st.rerun()
 
     st.success("✅ Preview loaded successfully!")
     
-    with st.expander("**Summary (from Preview)**", expanded=True):
+    with st.expander("**Summary**", expanded=True):
         params = st.session_state.get('params', {})
         total_rows_estimated = params.get('num_row', 0)
         num_storefronts = len(params.get('storefront_ids') or [])
@@ -288,83 +318,214 @@ def _display_results():
         query_duration = st.session_state.get('query_duration', 0)
 
         cols = st.columns(5)
-        cols[0].metric("Total Rows (Estimated)", f"{total_rows_estimated:,}")
+        cols[0].metric("Total Rows", f"{total_rows_estimated:,}")
         cols[1].metric("Total Columns", len(df_preview.columns))
         cols[2].metric("Date Range", date_range_display)
         cols[3].metric("Storefronts", num_storefronts)
         cols[4].metric("Preview Query Time", f"{query_duration:.2f} s")
+        _display_summary_metrics(st.session_state.get('summary'))
         
     st.markdown("---")
     cols_action = st.columns(2)
     with cols_action[0]:
-        # Check if export is allowed (under 50k rows)
+        # Check if export is allowed (under the row limit)
         total_rows = st.session_state.get('params', {}).get('num_row', 0)
-        export_disabled = bool(total_rows > 50000)
+        export_disabled = bool(total_rows > MAX_EXPORT_ROWS)
         
         if st.button(
             "🚀 Export Full Data", 
             use_container_width=True, 
             type="primary",
             disabled=export_disabled,
-            help="Export the full dataset" if not export_disabled else f"Export disabled: Too many rows ({total_rows:,}). Maximum allowed: 50,000 rows."
+            help="Export the full dataset" if not export_disabled else f"Export disabled: Too many rows ({total_rows:,}). Maximum allowed: {MAX_EXPORT_ROWS:,} rows."
         ):
-            if 'call_trace' in st.session_state:
-                st.session_state.call_trace = []
-            st.session_state.stage = 'exporting_full'
+            clear_session_traces()
+            submit_full_export(st.session_state.params.get('data_source'), st.session_state.get('export_format', DEFAULT_EXPORT_FORMAT))
             st.rerun()
             
     with cols_action[1]:
         if st.button("🔄 Start New Export", use_container_width=True):
+            _cancel_active_job()
+            _discard_materialized_result()
             st.session_state.stage = 'initial'
-            st.session_state.df_preview = None
             st.session_state.params = {}
             st.rerun()
 
-    st.subheader("Preview data (first 500 rows)")
-    st.data_editor(df_preview, use_container_width=True, height=300)
+    st.subheader("Browse data")
+    _display_preview_browser(df_preview)
+
+@st.fragment
+def _display_preview_browser(first_page):
+    """
+    Read-only grid paging through the whole materialized result, PREVIEW_ROW_LIMIT rows at a time.
+    Pages are read by row id from the result file and the next page is prefetched; the session
+    only keeps its position. Paging reruns this fragment, not the page.
+    """
+    result = st.session_state.get('result')
+    if result is None or not result.is_available:
+        st.dataframe(first_page, use_container_width=True, height=300)
+        return
+    if st.session_state.get('preview_result_key') != result.key:
+        st.session_state.preview_result_key = result.key
+        st.session_state.preview_after_row_id = -1
+
+    after_row_id = st.session_state.preview_after_row_id
+    pages = get_preview_pages()
+    try:
+        page = first_page if after_row_id < 0 else pages.get_page(result, after_row_id, PREVIEW_ROW_LIMIT)
+    except OSError:
+        # The result was evicted from the cache between the check above and the read
+        st.warning("This result is no longer available for browsing. Please get the data again.")
+        return
+    last_row_id = int(page.index[-1]) if len(page) else after_row_id
+    has_next = last_row_id + 1 < result.num_rows
+    if has_next:
+        pages.prefetch(result, last_row_id, PREVIEW_ROW_LIMIT)
+
+    cols = st.columns([1, 1, 2, 3])
+    # Row ids are the positions of the rows, so the previous page follows the row id one page back
+    cols[0].button("◀ Previous", disabled=after_row_id < 0, use_container_width=True,
+                   on_click=_move_preview, args=(max(after_row_id - PREVIEW_ROW_LIMIT, -1),))
+    cols[1].button("Next ▶", disabled=not has_next, use_container_width=True,
+                   on_click=_move_preview, args=(last_row_id,))
+    cols[2].number_input("Go to row", min_value=1, max_value=max(result.num_rows, 1), value=None, step=1,
+                         key='preview_goto_row', on_change=_go_to_preview_row,
+                         placeholder="Go to row", label_visibility="collapsed")
+    cols[3].caption(f"Rows {after_row_id + 2:,}–{last_row_id + 1:,} of {result.num_rows:,}")
+    st.dataframe(page.set_axis(range(after_row_id + 2, after_row_id + 2 + len(page))),
+                 use_container_width=True, height=300)
+
+def _display_summary_metrics(summary: Optional[Dict[str, Optional[float]]]):
+    """Totals of the full result, five per row."""
+    if not summary:
+        return
+    st.caption("Totals of the full result")
+    labels = list(summary)
+    for start in range(0, len(labels), 5):
+        cols = st.columns(5)
+        for col, label in zip(cols, labels[start:start + 5]):
+            col.metric(label, _format_summary_value(summary[label]))
+
+def _format_summary_value(value: Optional[float]) -> str:
+    if value is None:
+        return "–"
+    if float(value).is_integer():
+        return f"{value:,.0f}"
+    if abs(value) < 1:
+        return f"{value:.4f}"
+    return f"{value:,.2f}"
+
+def _move_preview(after_row_id: int):
+    st.session_state.preview_after_row_id = after_row_id
+
+def _go_to_preview_row():
+    row = st.session_state.preview_goto_row
+    if row:
+        _move_preview(int(row) - 2)
+    st.session_state.preview_goto_row = None
 
 def _handle_exporting_full():
-    """Stage 3: Load the full dataset and prepare it for download."""
+    """Stage 2: Wait for the background job that writes the full dataset to a file on disk."""
     # Double-check row limit before proceeding
-    total_rows = st.session_state.get('params', {}).get('num_row', 0)
-    if int(total_rows) > 50000:
-        st.error(f"❌ Export blocked: Dataset too large ({total_rows:,} rows). Maximum allowed: 50,000 rows.")
+    total_rows = int(st.session_state.get('params', {}).get('num_row', 0))
+    if total_rows > MAX_EXPORT_ROWS:
+        st.error(f"❌ Export blocked: Dataset too large ({total_rows:,} rows). Maximum allowed: {MAX_EXPORT_ROWS:,} rows.")
         st.session_state.stage = 'blocked'
         st.rerun()
         return
-    
-    with st.spinner("Exporting full data, this may take a while..."):
-        full_df = load_data(st.session_state.params.get('data_source'))
-        if full_df is not None:
-            csv_data = convert_df_to_csv(full_df)
-            file_name = f"{st.session_state.params.get('data_source')}_data_{datetime.now().strftime('%Y%m%d')}.csv"
-            st.session_state.download_info = {"data": csv_data, "file_name": file_name}
-            st.session_state.stage = 'download_ready'
-            st.rerun()
+
+    _poll_job(st.session_state.get('job_id'), "Exporting full data, this may take a while...")
 
 def _display_download_ready():
-    """Stage 4: Display the download button for the exported CSV."""
-    st.success("✅ Your full data export is ready to download!")
+    """Stage 3: Display the file format choice and the download button for the exported file."""
     info = st.session_state.download_info
+    if not info.get('path') or not Path(info['path']).exists():
+        st.session_state.user_message = {"type": "warning", "text": "The export file has expired. Please export the data again."}
+        st.session_state.download_info = {}
+        st.session_state.stage = 'loaded'
+        st.rerun()
+
+    st.success("✅ Your full data export is ready to download!")
+    current_format = info.get('format', DEFAULT_EXPORT_FORMAT)
+
+    format_keys = list(EXPORT_FORMATS.keys())
+    selected_format = st.radio(
+        "File format:",
+        format_keys,
+        index=format_keys.index(current_format),
+        format_func=lambda key: EXPORT_FORMATS[key]['label'],
+        horizontal=True,
+        help="Parquet and Arrow IPC are columnar formats: much smaller files that load directly into pandas or Spark."
+    )
+    if selected_format != current_format:
+        # Re-encode the export in the newly selected format
+        _discard_download_file()
+        st.session_state.export_format = selected_format
+        submit_full_export(st.session_state.params.get('data_source'), selected_format)
+        st.rerun()
+
+    # The preview is not shown at this stage; it is read again from the result if the user goes back
+    get_session_store().discard(PREVIEW_KEY)
     st.download_button(
-       label="📥 Download CSV Now",
-       data=info['data'],
+       label=f"📥 Download {EXPORT_FORMATS[current_format]['label']} Now",
+       # Read only when clicked, so the file is not held in memory on every rerun of this stage
+       data=lambda path=info['path']: Path(path).read_bytes(),
        file_name=info['file_name'],
-       mime='text/csv',
+       mime=EXPORT_FORMATS[current_format]['mime'],
+       on_click="ignore",
        use_container_width=True,
        type="primary",
     )
     if st.button("🔄 Start New Export", use_container_width=True):
+        _cancel_active_job()
+        _discard_download_file()
+        _discard_materialized_result()
         st.session_state.stage = 'initial'
         st.rerun()
 
+def _discard_download_file():
+    """Drop the session's current download; the file belongs to its export job and stays on the Export Jobs page."""
+    st.session_state.download_info = {}
+
+def _cancel_active_job():
+    """Cancel the background job the session is waiting for, if any, so its query stops on the database."""
+    job_id = st.session_state.get('job_id')
+    if job_id:
+        get_job_manager().cancel(job_id)
+    st.session_state.job_id = None
+
+def _discard_materialized_result():
+    """Drop the session's reference to its materialized result and free its preview; the file belongs to the shared result cache."""
+    st.session_state.result = None
+    get_session_store().clear()
+
+def _get_preview():
+    """The preview rows of the session's result, read again from the materialized result if they were freed."""
+    store = get_session_store()
+    df_preview = store.get_frame(PREVIEW_KEY)
+    result = st.session_state.get('result')
+    if df_preview is None and result is not None and result.is_available:
+        df_preview = read_result_rows(result, 0, PREVIEW_ROW_LIMIT)
+        store.put_frame(PREVIEW_KEY, df_preview)
+    return df_preview
+
 def _display_blocked_state():
     """Stage: Display blocked state when data is too large."""
     params = st.session_state.get('params', {})
     total_rows = int(params.get('num_row', 0))
-    
-    st.error(f"🚫 Export blocked: Dataset contains {total_rows:,} rows")
-    st.warning("**Maximum allowed: 50,000 rows**")
+    exact = params.get('num_row_exact', True)
+    
+    st.error(f"🚫 Export blocked: Dataset contains {describe_row_count(total_rows, exact)} rows")
+    st.warning(f"**Maximum allowed: {MAX_EXPORT_ROWS:,} rows**")
+    if not exact and st.button("🔢 Count rows exactly", use_container_width=True):
+        # The admission check stops counting at the limit; the exact count is only run on request
+        with st.spinner("Counting rows..."):
+            num_row = get_row_count(params.get('data_source'), **{k: v for k, v in params.items() if k != 'data_source'})
+        if num_row is not None:
+            st.session_state.params['num_row'] = num_row
+            st.session_state.params['num_row_exact'] = True
+            st.rerun()
+    _display_summary_metrics(st.session_state.get('summary'))
     
     st.markdown("### 💡 Suggestions to reduce data size:")
     st.markdown("""
@@ -374,8 +535,9 @@ def _display_blocked_state():
     """)
     
     if st.button("🔄 Modify Selection", use_container_width=True, type="primary"):
+        _cancel_active_job()
+        _discard_materialized_result()
         st.session_state.stage = 'initial'
-        st.session_state.df_preview = None
         st.session_state.params = {}
         st.rerun()
 
@@ -384,7 +546,7 @@ def _display_blocked_state():
 def display_data_exporter():
     """Display the entire data processing flow from preview to download."""    
     stage_map = {
-        'loading_preview': _handle_loading_preview,
+        'preparing': _display_preparing,
         'loaded': _display_results,
         'exporting_full': _handle_exporting_full,
         'download_ready': _display_download_ready,
@@ -0,0 +1,325 @@
+"""
+Export File Writers
+
+This module encodes streamed DataFrame chunks into the file formats offered at the
+download stage. Every writer consumes an iterator of chunks and writes each chunk as it
+arrives, so only one chunk is held in memory at a time whatever the size of the export.
+"""
+
+import os
+from decimal import Decimal
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+# --- Supported Formats ---
+EXPORT_FORMATS = {
+    "csv": {
+        "label": "CSV",
+        "extension": "csv",
+        "mime": "text/csv",
+    },
+    "parquet": {
+        "label": "Parquet",
+        "extension": "parquet",
+        "mime": "application/vnd.apache.parquet",
+    },
+    "feather": {
+        "label": "Arrow IPC (Feather)",
+        "extension": "feather",
+        "mime": "application/vnd.apache.arrow.file",
+    },
+}
+
+DEFAULT_EXPORT_FORMAT = "csv"
+
+# Compression codec used by the columnar formats
+COLUMNAR_COMPRESSION = "zstd"
+
+
+def write_csv_export(chunks: Iterator[pd.DataFrame], file_path: Path, progress_callback: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Encode DataFrame chunks to a CSV file as they arrive.
+    The header is written once, before the first chunk even if it is empty, and `progress_callback`
+    receives the running row count after each chunk.
+    """
+    rows_written = 0
+    header_written = False
+    # 'utf-8-sig' writes the BOM once at the start of the file so Excel detects the encoding
+    with open(file_path, 'w', encoding='utf-8-sig', newline='') as f:
+        for chunk in chunks:
+            chunk.to_csv(f, index=False, header=not header_written)
+            header_written = True
+            rows_written += len(chunk)
+            if progress_callback:
+                progress_callback(rows_written)
+    return rows_written
+
+
+def write_parquet_export(chunks: Iterator[pd.DataFrame], file_path: Path, progress_callback: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Encode DataFrame chunks to a Parquet file, one row group per chunk.
+    String columns are dictionary-encoded, which suits repeated values like storefront_name.
+    Categorical columns are written as dictionary columns, so reading the file back yields
+    categoricals again. When a later chunk needs a wider schema (see `_widen_schema`), the
+    row groups written so far are copied into a new file with the widened schema.
+    """
+    rows_written = 0
+    writer = None
+    path = file_path
+    try:
+        for chunk in chunks:
+            arrays = _chunk_arrays(chunk)
+            if writer is None:
+                schema = _infer_export_schema(chunk.columns, arrays, keep_dictionaries=True)
+                writer = _open_parquet_writer(path, schema)
+            else:
+                widened = _widen_schema(schema, arrays, keep_dictionaries=True)
+                if widened != schema:
+                    writer.close()
+                    previous, path = path, _widened_path(file_path, path)
+                    schema, writer = widened, _open_parquet_writer(path, widened)
+                    for batch in pq.ParquetFile(previous).iter_batches():
+                        writer.write_table(_arrays_to_table(batch.columns, schema))
+                    previous.unlink()
+            writer.write_table(_arrays_to_table(arrays, schema))
+            rows_written += len(chunk)
+            if progress_callback:
+                progress_callback(rows_written)
+    except BaseException:
+        if path != file_path:
+            path.unlink(missing_ok=True)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        # No rows at all: still produce a valid (empty) file
+        pq.write_table(pa.table({}), file_path)
+    elif path != file_path:
+        os.replace(path, file_path)
+    return rows_written
+
+
+def write_feather_export(chunks: Iterator[pd.DataFrame], file_path: Path, progress_callback: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Encode DataFrame chunks to an Arrow IPC (Feather v2) file, one record batch per chunk.
+
+    String columns are written as dictionary arrays. The IPC file format only allows one
+    dictionary per field, so each column's dictionary grows across chunks and later batches
+    are emitted as dictionary deltas. A delta cannot follow an empty dictionary, so columns
+    that are entirely null in the first chunk are written as plain values. When a later chunk
+    needs a wider schema, the batches written so far are copied into a new file.
+    """
+    rows_written = 0
+    writer = None
+    path = file_path
+    try:
+        for chunk in chunks:
+            arrays = _chunk_arrays(chunk)
+            if writer is None:
+                value_schema = _infer_export_schema(chunk.columns, arrays)
+                encoded = {field.name for field, array in zip(value_schema, arrays)
+                           if pa.types.is_string(field.type) and array.null_count < len(array)}
+                writer, dictionaries, schema = _open_feather_writer(path, value_schema, encoded)
+            else:
+                widened = _widen_schema(value_schema, arrays)
+                if widened != value_schema:
+                    writer.close()
+                    previous, path = path, _widened_path(file_path, path)
+                    value_schema = widened
+                    writer, dictionaries, schema = _open_feather_writer(path, value_schema, encoded)
+                    with pa.memory_map(str(previous)) as source:
+                        reader = pa.ipc.open_file(source)
+                        for index in range(reader.num_record_batches):
+                            table = _arrays_to_table(reader.get_batch(index).columns, value_schema)
+                            writer.write_table(_encode_dictionaries(table, dictionaries, schema))
+                    previous.unlink()
+            table = _arrays_to_table(arrays, value_schema)
+            writer.write_table(_encode_dictionaries(table, dictionaries, schema))
+            rows_written += len(chunk)
+            if progress_callback:
+                progress_callback(rows_written)
+    except BaseException:
+        if path != file_path:
+            path.unlink(missing_ok=True)
+        raise
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        pa.ipc.new_file(str(file_path), pa.schema([])).close()
+    elif path != file_path:
+        os.replace(path, file_path)
+    return rows_written
+
+
+_EXPORT_WRITERS = {
+    "csv": write_csv_export,
+    "parquet": write_parquet_export,
+    "feather": write_feather_export,
+}
+
+
+def write_export(chunks: Iterator[pd.DataFrame], file_path: Path, export_format: str = DEFAULT_EXPORT_FORMAT, progress_callback: Optional[Callable[[int], None]] = None) -> int:
+    """
+    Write streamed chunks to `file_path` in the requested export format.
+    A partially written file is removed if encoding fails.
+    """
+    writer = _EXPORT_WRITERS.get(export_format)
+    if writer is None:
+        raise ValueError(f"Unknown export format: {export_format}")
+
+    file_path = Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        return writer(chunks, file_path, progress_callback)
+    except Exception:
+        file_path.unlink(missing_ok=True)
+        raise
+
+
+def export_file_name(data_source: str, export_format: str, date_str: str) -> str:
+    """Build the user-facing download file name for an export."""
+    return f"{data_source}_data_{date_str}.{EXPORT_FORMATS[export_format]['extension']}"
+
+
+# --- Arrow Conversion Helpers ---
+class _GrowingDictionary:
+    """A string dictionary that only ever appends values, so every batch extends the previous one."""
+
+    def __init__(self):
+        self._positions: Dict[str, int] = {}
+        self._values: List[str] = []
+
+    def encode(self, column: pa.ChunkedArray) -> pa.ChunkedArray:
+        for value in pc.unique(column).to_pylist():
+            if value is not None and value not in self._positions:
+                self._positions[value] = len(self._values)
+                self._values.append(value)
+
+        dictionary = pa.array(self._values, type=pa.string())
+        indices = pc.index_in(column, value_set=dictionary).cast(pa.int32())
+        return pa.chunked_array(
+            [pa.DictionaryArray.from_arrays(chunk, dictionary) for chunk in indices.chunks],
+            type=pa.dictionary(pa.int32(), pa.string()),
+        )
+
+
+def _open_parquet_writer(path: Path, schema: pa.Schema) -> pq.ParquetWriter:
+    dictionary_columns = [field.name for field in schema
+                          if pa.types.is_string(field.type) or pa.types.is_dictionary(field.type)]
+    return pq.ParquetWriter(path, schema, compression=COLUMNAR_COMPRESSION, use_dictionary=dictionary_columns)
+
+
+def _open_feather_writer(path: Path, value_schema: pa.Schema, encoded: Set[str]):
+    """Open an IPC file writer whose `encoded` string columns are dictionary arrays; returns (writer, dictionaries, schema)."""
+    dictionaries = {name: _GrowingDictionary() for name in encoded}
+    schema = pa.schema([
+        pa.field(field.name, pa.dictionary(pa.int32(), pa.string())) if field.name in dictionaries else field
+        for field in value_schema
+    ])
+    options = pa.ipc.IpcWriteOptions(compression=COLUMNAR_COMPRESSION, emit_dictionary_deltas=True)
+    return pa.ipc.new_file(str(path), schema, options=options), dictionaries, schema
+
+
+def _encode_dictionaries(table: pa.Table, dictionaries: Dict[str, "_GrowingDictionary"], schema: pa.Schema) -> pa.Table:
+    columns = [
+        dictionaries[name].encode(table.column(name)) if name in dictionaries else table.column(name)
+        for name in table.column_names
+    ]
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def _widened_path(file_path: Path, current: Path) -> Path:
+    """A new path next to `file_path` for the copy with a widened schema, other than `current`."""
+    suffix = ".widened-b.tmp" if current.name.endswith(".widened-a.tmp") else ".widened-a.tmp"
+    return file_path.with_name(f".{file_path.name}{suffix}")
+
+
+def _chunk_arrays(chunk: pd.DataFrame) -> List[pa.Array]:
+    return [pa.array(_column_values(chunk[name]), from_pandas=True) for name in chunk.columns]
+
+
+def _infer_export_schema(names: Iterable, arrays: List[pa.Array], keep_dictionaries: bool = False) -> pa.Schema:
+    """
+    Derive the file schema from the first chunk.
+
+    Decimals become float64 and large strings strings. Categoricals are written as their plain
+    value type, or with `keep_dictionaries` as string dictionaries with int32 indices, wide
+    enough for the categories of every later chunk. All-null columns keep the null type until
+    a later chunk has values (see `_widen_schema`).
+    """
+    return pa.schema([pa.field(str(name), _export_type(array.type, keep_dictionaries)) for name, array in zip(names, arrays)])
+
+
+def _export_type(arrow_type: pa.DataType, keep_dictionaries: bool) -> pa.DataType:
+    if pa.types.is_dictionary(arrow_type):
+        value_type = arrow_type.value_type
+        if keep_dictionaries and (pa.types.is_null(value_type) or pa.types.is_string(value_type)
+                                  or pa.types.is_large_string(value_type)):
+            return pa.dictionary(pa.int32(), pa.string())
+        arrow_type = value_type
+    if pa.types.is_large_string(arrow_type):
+        return pa.string()
+    if pa.types.is_decimal(arrow_type):
+        return pa.float64()
+    return arrow_type
+
+
+def _widen_schema(schema: pa.Schema, arrays: List[pa.Array], keep_dictionaries: bool = False) -> pa.Schema:
+    """
+    The schema of the file so far, widened to also hold a later chunk whose column types differ:
+    null columns take the type of the first values, integers widen to the larger integer or to
+    float64 when fractions arrive, and columns of otherwise incompatible types become strings.
+    """
+    fields = []
+    for field, array in zip(schema, arrays):
+        incoming = _export_type(array.type, keep_dictionaries)
+        fields.append(field.with_type(_widened_type(field.type, incoming)))
+    return pa.schema(fields)
+
+
+def _widened_type(current: pa.DataType, incoming: pa.DataType) -> pa.DataType:
+    if current == incoming or pa.types.is_null(incoming) or pa.types.is_dictionary(current):
+        return current
+    if pa.types.is_null(current):
+        return incoming
+    if pa.types.is_dictionary(incoming):
+        incoming = incoming.value_type
+        if current == incoming:
+            return current
+    if pa.types.is_integer(current) and pa.types.is_integer(incoming):
+        return incoming if incoming.bit_width > current.bit_width else current
+    if (pa.types.is_integer(current) or pa.types.is_floating(current)) and pa.types.is_floating(incoming):
+        return pa.float64()
+    if pa.types.is_floating(current) and pa.types.is_integer(incoming):
+        return current
+    if pa.types.is_string(current):
+        return current
+    return pa.string()
+
+
+def _arrays_to_table(arrays: List[pa.Array], schema: pa.Schema) -> pa.Table:
+    """Convert the arrays of a chunk to an Arrow table with exactly `schema`."""
+    converted = []
+    for field, array in zip(schema, arrays):
+        if pa.types.is_dictionary(array.type) and not pa.types.is_dictionary(field.type):
+            array = array.dictionary_decode()
+        converted.append(array.cast(field.type))
+    return pa.Table.from_arrays(converted, schema=schema)
+
+
+def _column_values(series: pd.Series):
+    """Return values pyarrow can convert, mapping driver Decimal objects to floats."""
+    if series.dtype == object:
+        first_valid = series.first_valid_index()
+        if first_valid is not None and isinstance(series[first_valid], Decimal):
+            return pd.to_numeric(series, errors='coerce')
+    return series
@@ -1,6 +1,10 @@
 import streamlit as st
-import functools
+import pandas as pd
+import uuid
 from datetime import datetime
+from utils.metrics import start_metrics_server
+from utils.result_cache import get_result_cache
+from utils.tracing import get_sample_rate, get_session_traces
 
 def initialize_session_state():
     """
@@ -8,16 +12,27 @@ def initialize_session_state():
     if they don't already exist.
     """
     # Existing state variables
+    # Serves /metrics for this Streamlit process; a no-op after the first call
+    start_metrics_server()
+
     if 'stage' not in st.session_state:
         st.session_state.stage = 'initial'
     if 'params' not in st.session_state:
         st.session_state.params = {}
-    if 'df_preview' not in st.session_state:
-        st.session_state.df_preview = None
     if 'query_duration' not in st.session_state:
         st.session_state.query_duration = 0
     if 'download_info' not in st.session_state:
         st.session_state.download_info = {}
+    if 'result' not in st.session_state:
+        st.session_state.result = None
+    # Totals of the full result, computed by the prepare job (see utils/summary.py)
+    if 'summary' not in st.session_state:
+        st.session_state.summary = None
+    # Background job of the current stage, and the id that marks this session's jobs
+    if 'job_id' not in st.session_state:
+        st.session_state.job_id = None
+    if 'owner_id' not in st.session_state:
+        st.session_state.owner_id = uuid.uuid4().hex
 
     # --- USER NOTIFICATIONS ---
     if 'user_message' not in st.session_state:
@@ -44,46 +59,85 @@ def display_user_message():
         st.session_state.user_message = None
 
 
-def trace_function_call(func):
-    """A decorator to trace function calls and log them to the session state."""
-    @functools.wraps(func)
-    def wrapper(*args, **kwargs):
-        if 'call_trace' not in st.session_state:
-            st.session_state.call_trace = []
-
-        call_log = {
-            "function": func.__name__,
-            "module": func.__module__,
-            "timestamp": datetime.now().isoformat(),
-            "status": "start",
-            "args": str(args),
-            "kwargs": str(kwargs)
-        }
-        st.session_state.call_trace.append(call_log)
-
-        try:
-            result = func(*args, **kwargs)
-            st.session_state.call_trace.append({
-                "function": func.__name__,
-                "status": "finish",
-                "timestamp": datetime.now().isoformat(),
-                "return_value": str(result)[:200]  # Truncate long return values
-            })
-            return result
-        except Exception as e:
-            st.session_state.call_trace.append({
-                "function": func.__name__,
-                "status": "error",
-                "timestamp": datetime.now().isoformat(),
-                "error": str(e)
-            })
-            raise e
-    return wrapper
-
 def display_call_trace():
-    """Displays the call trace in a Streamlit expander."""
+    """Displays the call trace, cache and connection pool metrics, and captured slow queries in a Streamlit expander."""
     with st.expander("Show Debug Trace"):
-        if st.session_state.get('call_trace'):
-            st.json(st.session_state.call_trace)
+        st.markdown("**Call trace**")
+        if get_sample_rate() <= 0:
+            st.caption("Tracing is off. Set TRACE_SAMPLE_RATE (e.g. =1 for every call, =0.1 for one in ten) to record calls.")
+        elif traces := get_session_traces():
+            st.dataframe(
+                pd.DataFrame([{
+                    "time": datetime.fromtimestamp(record.started_at).strftime('%H:%M:%S.%f')[:-3],
+                    "function": f"{record.module}.{record.function}",
+                    "ms": record.duration_ms,
+                    "status": record.status,
+                    "args": ", ".join([*record.args, *(f"{key}={value}" for key, value in record.kwargs.items())]),
+                    "result": record.error or record.result,
+                } for record in traces]),
+                hide_index=True,
+                use_container_width=True,
+            )
         else:
-            st.write("No calls have been traced yet.")
\ No newline at end of file
+            st.write("No calls have been traced yet.")
+
+        st.markdown("**Result cache**")
+        cache_stats = get_result_cache().stats()
+        cols = st.columns(5)
+        cols[0].metric("Hits", cache_stats["hits"])
+        cols[1].metric("Misses", cache_stats["misses"])
+        cols[2].metric("Evictions", cache_stats["evictions"])
+        cols[3].metric("Entries", cache_stats["entries"])
+        cols[4].metric("Size", f"{cache_stats['bytes'] / 1024 ** 2:,.1f} / {cache_stats['max_bytes'] / 1024 ** 2:,.0f} MB")
+        st.json(cache_stats, expanded=False)
+
+        # Imported here: connecting to the database is only needed once the panel is shown
+        from utils.database import get_pool_stats
+
+        st.markdown("**Connection pool**")
+        pool_stats = get_pool_stats()
+        cols = st.columns(5)
+        cols[0].metric("In use", f"{pool_stats.get('in_use', 0)} / {pool_stats['pool_size']}")
+        cols[1].metric("Idle", pool_stats.get('idle', 0))
+        cols[2].metric("Overflow checkouts", pool_stats["overflow_checkouts"])
+        cols[3].metric("Checkout wait p95", f"{pool_stats['wait_ms_p95'] or 0:,.1f} ms")
+        cols[4].metric("Timeouts", pool_stats["timeouts"])
+        st.json(pool_stats, expanded=False)
+
+        _display_slow_queries()
+
+
+def _display_slow_queries():
+    """Shows the plans captured for slow queries when QUERY_PROFILING is enabled."""
+    from utils.config import QUERY_PROFILING
+    from utils.query_profiler import OK, get_slow_queries
+
+    st.markdown("**Slow queries**")
+    if not QUERY_PROFILING:
+        st.caption("Profiling is off. Set QUERY_PROFILING=explain (or =profile) to capture plans of slow queries.")
+        return
+
+    records = get_slow_queries()
+    if not records:
+        st.caption("No query has exceeded its slow-query threshold yet.")
+        return
+    for record in records:
+        captured = datetime.fromtimestamp(record.captured_at).strftime('%H:%M:%S')
+        with st.container(border=True):
+            duration = f"**{record.duration:.2f} s**"
+            if record.end_to_end is not None:
+                duration = f"first rows after {duration}, {record.end_to_end:.2f} s end-to-end"
+            outcome = "" if record.outcome == OK else f" · {record.outcome}"
+            st.markdown(f"`{record.data_source}` · {record.query_type} · {duration} (threshold {record.threshold:g} s){outcome} · {captured}")
+            st.json(record.params, expanded=False)
+            st.code(record.sql, language="sql")
+            if record.explain:
+                st.markdown("EXPLAIN")
+                st.code(record.explain, language="text")
+            if record.profile:
+                st.markdown("PROFILE")
+                st.code(record.profile, language="text")
+            if record.capturing:
+                st.caption("Capturing the plan…")
+            if record.error:
+                st.warning(f"Plan not captured: {record.error}")
\ No newline at end of file
@@ -0,0 +1,174 @@
+"""
+Incremental Aggregates
+
+Sources whose data query is a sum over a date range (see the "incremental" entry of their
+DATA_SOURCE_CONFIGS) are assembled from per-day partial sums instead of being aggregated
+over the whole range by the database. Each settled day is cached on its own, so a range that
+overlaps earlier requests only queries the days that have not been seen yet, and shifting a
+"Last 30 days" window by one day costs one day of scanning instead of thirty.
+
+Days newer than INCREMENTAL_SETTLE_DAYS may still receive late data and are always queried.
+"""
+
+import hashlib
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+
+from utils.config import INCREMENTAL_SETTLE_DAYS
+from utils.database import get_connection
+from utils.tracing import trace_function_call
+from utils.input_config import DATA_SOURCE_CONFIGS
+from utils.input_validator import build_request_key, canonicalize_sql_params
+from utils.metrics import QUERY_ROWS, observe_query
+from utils.query_control import controlled_query
+from utils.query_profiler import profile_query
+from utils.query_registry import get_query
+from utils.result_cache import get_partial_cache, make_cache_key
+from utils.spans import span
+
+# Column carrying the day of a partial aggregate in the daily queries
+DAY_COLUMN = "day"
+
+
+def get_incremental_spec(data_source: str) -> Optional[Dict[str, Any]]:
+    """Return the incremental aggregation spec of a data source, or None if it has none."""
+    return DATA_SOURCE_CONFIGS.get(data_source, {}).get("incremental")
+
+
+def get_incremental_hash(data_source: str) -> str:
+    """Content hash of the SQL files the incremental result is built from, used to version cache keys."""
+    spec = get_incremental_spec(data_source)
+    daily, dims = get_query(data_source, spec["daily_query"]), get_query(data_source, spec["dims_query"])
+    return hashlib.sha256(f"{daily.content_hash}:{dims.content_hash}".encode('utf-8')).hexdigest()
+
+
+@trace_function_call
+def get_incremental_data(data_source: str, sql_params: Dict[str, Any], today: Optional[date] = None) -> pd.DataFrame:
+    """
+    Build the result of a data query from cached per-day partial sums plus the dimension query.
+
+    Days missing from the partial cache are fetched in contiguous ranges, one query per range.
+    Partial sums are added up per group, joined to the dimension columns and the ratio columns
+    are recomputed from the summed totals.
+    """
+    spec = get_incremental_spec(data_source)
+    if spec is None:
+        raise ValueError(f"Data source has no incremental spec: {data_source}")
+
+    sql_params = canonicalize_sql_params(data_source, sql_params)
+    today = today or date.today()
+    settled_before = today - timedelta(days=INCREMENTAL_SETTLE_DAYS)
+    days = _date_range(_parse_day(sql_params["start_date"]), _parse_day(sql_params["end_date"]))
+
+    partials = _load_daily_partials(data_source, spec, sql_params, days, settled_before)
+    group_key = spec["group_key"]
+    sum_columns = spec["sum_columns"]
+    if partials:
+        # min_count=1 keeps a sum over no rows NULL, as in SQL
+        totals = pd.concat(partials, ignore_index=True).groupby(group_key)[sum_columns].sum(min_count=1).reset_index()
+    else:
+        totals = pd.DataFrame({column: pd.Series(dtype="float64") for column in [group_key] + sum_columns})
+
+    dims = _load_dims(data_source, spec, sql_params)
+    df = dims.merge(totals, on=group_key, how=spec.get("join", "inner"))
+    for column, (numerator, denominator) in spec.get("ratio_columns", {}).items():
+        df[column] = _safe_divide(df[numerator], df[denominator])
+    return df[spec["columns"]].reset_index(drop=True)
+
+
+def _load_daily_partials(data_source: str, spec: Dict[str, Any], sql_params: Dict[str, Any],
+                         days: List[date], settled_before: date) -> List[pd.DataFrame]:
+    """Return one partial-sum frame per day, serving settled days from the cache where possible."""
+    cache = get_partial_cache()
+    daily_hash = get_query(data_source, spec["daily_query"]).content_hash
+    # Partials do not depend on the requested range, only on the day they cover
+    request_key = build_request_key(data_source, {**sql_params, "start_date": None, "end_date": None})
+
+    def _day_key(day: date) -> str:
+        return make_cache_key(request_key, daily_hash, query_type=spec["daily_query"], day=day.isoformat())
+
+    frames: Dict[date, pd.DataFrame] = {}
+    missing: List[date] = []
+    for day in days:
+        cached = cache.get_frame(_day_key(day)) if day < settled_before else None
+        if cached is None:
+            missing.append(day)
+        else:
+            frames[day] = cached
+
+    for range_start, range_end in _contiguous_ranges(missing):
+        fetched = _fetch_daily(data_source, spec, sql_params, range_start, range_end)
+        by_day = dict(tuple(fetched.groupby(DAY_COLUMN))) if not fetched.empty else {}
+        for day in _date_range(range_start, range_end):
+            frame = by_day.get(day.isoformat(), fetched.iloc[0:0]).drop(columns=[DAY_COLUMN])
+            if day < settled_before:
+                # Empty days are cached too, so they are not queried again
+                cache.put_frame(_day_key(day), frame)
+            frames[day] = frame
+
+    return [frames[day] for day in days if not frames[day].empty]
+
+
+def _fetch_daily(data_source: str, spec: Dict[str, Any], sql_params: Dict[str, Any],
+                 start: date, end: date) -> pd.DataFrame:
+    """
+    Run the daily partial-sum query for one contiguous range of days. Its date filter is the
+    half-open range start_date <= created_datetime < end_date on the bare column, so `end_date`
+    is the day after `end`.
+    """
+    from utils.logic import _build_query
+
+    range_params = {**sql_params, "start_date": start.isoformat(), "end_date": (end + timedelta(days=1)).isoformat()}
+    query, params_to_bind, _ = _build_query(spec["daily_query"], data_source, **range_params)
+    with span("db.query", data_source=data_source, query_type=spec["daily_query"], days=(end - start).days + 1) as query_span:
+        with get_connection() as db:
+            connection = db.connection()
+            with profile_query(connection, data_source, spec["daily_query"], query, params_to_bind), controlled_query(connection, data_source), \
+                    observe_query(data_source, spec["daily_query"]):
+                df = pd.read_sql(query, connection, params=params_to_bind)
+        QUERY_ROWS.inc(len(df), data_source=data_source, query_type=spec["daily_query"])
+        query_span.set(rows=len(df), bytes=int(df.memory_usage(index=False).sum()))
+    # The driver may return dates, datetimes or strings; partials are keyed on ISO strings
+    df[DAY_COLUMN] = pd.to_datetime(df[DAY_COLUMN]).dt.strftime('%Y-%m-%d')
+    for column in spec["sum_columns"]:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df
+
+
+def _load_dims(data_source: str, spec: Dict[str, Any], sql_params: Dict[str, Any]) -> pd.DataFrame:
+    """Fetch the per-group dimension columns, which do not depend on the date range."""
+    from utils.logic import get_data
+
+    dims_params = {**sql_params, "start_date": None, "end_date": None}
+    return get_data(spec["dims_query"], data_source, **dims_params)
+
+
+def _safe_divide(numerator: pd.Series, denominator: pd.Series) -> pd.Series:
+    """Divide two columns, giving NaN (NULL) where the denominator is zero, like the database does."""
+    numerator = pd.to_numeric(numerator, errors='coerce').astype("float64")
+    denominator = pd.to_numeric(denominator, errors='coerce').astype("float64")
+    return numerator / denominator.where(denominator != 0)
+
+
+def _parse_day(value: str) -> date:
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def _date_range(start: date, end: date) -> List[date]:
+    return [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+
+
+def _contiguous_ranges(days: List[date]) -> Iterator[Tuple[date, date]]:
+    """Group sorted days into (first, last) runs of consecutive days."""
+    run_start = previous = None
+    for day in days:
+        if previous is not None and day - previous == timedelta(days=1):
+            previous = day
+            continue
+        if run_start is not None:
+            yield run_start, previous
+        run_start = previous = day
+    if run_start is not None:
+        yield run_start, previous
@@ -5,12 +5,8 @@ This module defines all possible input fields and their properties,
 enabling dynamic form generation and validation based on configuration.
 """
 
-from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional
-
-# --- Constants ---
-TODAY = datetime.now().date()
-YESTERDAY = TODAY - timedelta(days=1)
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Any, Optional, Tuple
 
 # --- Input Field Definitions ---
 INPUT_FIELDS = {
@@ -38,7 +34,7 @@ INPUT_FIELDS = {
             "separator": ","
         },
         "help_text": "Enter one or more storefront EIDs separated by commas. Leave empty for all storefronts.",
-        "performance_tip": "For faster performance with multiple storefronts, select a smaller date range."
+        "performance_tip": "Many storefronts and long date ranges are queried in parallel parts, so large requests take longer but are not limited."
     },
     
     "date_range": {
@@ -50,19 +46,16 @@ INPUT_FIELDS = {
             "start_before_end": True,
             "max_date": "yesterday"
         },
+        # Presets map today's date to a (start, end) pair; they are resolved on every use
+        # so a long-running server never serves ranges computed on the day it started
         "presets": {
-            "Last 30 days": {"start": TODAY - timedelta(days=30), "end": YESTERDAY},
-            "This month": {"start": TODAY.replace(day=1), "end": YESTERDAY},
-            "Last month": {
-                "start": (TODAY.replace(day=1) - timedelta(days=1)).replace(day=1),
-                "end": TODAY.replace(day=1) - timedelta(days=1)
-            },
+            "Last 30 days": lambda today: (today - timedelta(days=30), today - timedelta(days=1)),
+            "This month": lambda today: (today.replace(day=1), today - timedelta(days=1)),
+            "Last month": lambda today: (
+                (today.replace(day=1) - timedelta(days=1)).replace(day=1),
+                today.replace(day=1) - timedelta(days=1)
+            ),
             "Custom time range": None
-        },
-        "date_range_limits": {
-            "single_storefront": 60,
-            "multiple_storefronts_2": 60,
-            "multiple_storefronts_3plus": 30
         }
     },
     
@@ -98,54 +91,189 @@ INPUT_FIELDS = {
 }
 
 # --- Data Source Configurations ---
+# "queries" maps each query type to a SQL file in data_logic/sql/ (without the .sql suffix)
+# "column_types" types the fetched columns: categoricals for repeated strings, nullable
+# integers for counts (see utils/result_types.py)
+# "summary" declares the totals of the full result shown with the preview (see utils/summary.py)
+# "partitions" declares along which dimensions the data query can be split into partitions
+# that run concurrently (see utils/partitioned.py)
 DATA_SOURCE_CONFIGS = {
     "storefront_in_workspace": {
         "name": "Storefront in Workspace",
-        "data_logic_module": "storefront_data",
+        "queries": {"data": "search_storefront_in_workspace", "keys": "search_storefront_in_workspace_keys"},
         "inputs": ["workspace_id"],
-        "description": "Export a list of all storefronts within a specified workspace."
+        "description": "Export a list of all storefronts within a specified workspace.",
+        "timeout_seconds": 60,
+        "column_types": {"country_code": "category", "marketplace_code": "category"},
+        "summary": {"distinct": {"marketplace_code": "Marketplaces", "country_code": "Countries"}}
     },
     
     "keyword_lab": {
         "name": "Keyword Lab",
-        "data_logic_module": "keyword_lab_data",
+        "queries": {"data": "keyword_lab_data", "keys": "keyword_lab_keys"},
         "inputs": ["workspace_id", "storefront_ids", "date_range"],
-        "description": "Export keyword lab data with date filtering"
+        "description": "Export keyword lab data with date filtering",
+        "timeout_seconds": 300,
+        "column_types": {
+            "marketplace_code": "category", "country_code": "category", "storefront_name": "category",
+            "operational_status": "category", "category_name": "category", "shop_ads_status": "category",
+            "product_ads_status": "category", "brand_name": "category", "tag_1": "category", "tag_2": "category",
+            "tag_3": "category", "keyword_type": "category", "storefront_division": "category",
+            "active_skus": "int32", "click": "int32", "ads_item_sold": "int32"
+        },
+        "summary": {
+            "sums": {"ads_gmv": "Ads GMV", "cost": "Cost", "click": "Clicks", "impression": "Impressions",
+                     "ads_item_sold": "Items Sold"},
+            "distinct": {"keyword": "Keywords", "storefront_id": "Storefronts"},
+            "ratios": {"ROAS": ["ads_gmv", "cost"], "CTR": ["click", "impression"], "CPC": ["cost", "click"],
+                       "CR": ["ads_item_sold", "click"]}
+        },
+        # Rows are per keyword, storefront and month
+        "partitions": {"storefronts": True, "date_grain": "month"}
     },
     
     "keyword_performance": {
         "name": "Keyword Performance",
-        "data_logic_module": "keyword_performance_data",
+        "queries": {"data": "kw_performance_data", "keys": "kw_performance_keys"},
         "inputs": ["workspace_id", "storefront_ids", "date_range", "device_type", "display_type", "product_position"],
-        "description": "Export keyword performance data with advanced filtering options"
+        "description": "Export keyword performance data with advanced filtering options",
+        "timeout_seconds": 300,
+        "column_types": {
+            "storefront_name": "category", "marketplace_code": "category", "display_type": "category",
+            "device_type": "category", "product_position": "category",
+            "atc": "int32", "click": "int32", "ads_order": "int32", "direct_atc": "int32", "direct_order": "int32",
+            "ads_item_sold": "int32", "direct_item_sold": "int32"
+        },
+        # Ad metrics are per keyword, storefront and month, repeated on every display type row
+        "summary": {
+            "grain": ["keyword", "aos_id", "created_datetime"],
+            "sums": {"ads_gmv": "Ads GMV", "direct_gmv": "Direct GMV", "cost": "Cost", "click": "Clicks",
+                     "impression": "Impressions", "ads_order": "Ads Orders"},
+            "distinct": {"keyword": "Keywords", "aos_id": "Storefronts", "created_datetime": "Months"},
+            "ratios": {"ROAS": ["ads_gmv", "cost"], "CTR": ["click", "impression"], "CPC": ["cost", "click"],
+                       "CR": ["ads_order", "click"]}
+        },
+        # Rows are per storefront; not split by date, as the ad metrics of every month of the
+        # range are joined to each month row
+        "partitions": {"storefronts": True, "order_by": [["search_volume", "desc"]]}
     },
     
     "product_tracking": {
         "name": "Product Tracking",
-        "data_logic_module": "product_tracking_data",
+        "queries": {"data": "product_tracking_data", "keys": "product_tracking_keys"},
         "inputs": ["workspace_id", "storefront_ids", "date_range"],
-        "description": "Export product tracking data"
+        "description": "Export product tracking data",
+        "timeout_seconds": 300,
+        "slow_query_seconds": 20,
+        "column_types": {
+            "global_company": "category", "storefront_name": "category", "device_type": "category",
+            "display_type": "category", "item_sold_LT": "int32", "item_sold_l30d": "int32", "product_slot": "int16"
+        },
+        "summary": {
+            "distinct": {"keyword": "Keywords", "product_name": "Products", "storefront_name": "Storefronts",
+                         "global_company": "Companies"}
+        },
+        # Rows are per product, which belongs to one storefront; not split by date, as product
+        # slots are averaged over the whole range
+        "partitions": {"storefronts": True}
     },
     
     "competition_landscape": {
         "name": "Competition Landscape",
-        "data_logic_module": "competition_landscape_data",
+        "queries": {"data": "competition_landscape_data", "keys": "competition_landscape_keys"},
         "inputs": ["workspace_id", "date_range", "device_type", "display_type", "product_position"],
-        "description": "Export competition landscape data with advanced filtering options"
+        "description": "Export competition landscape data with advanced filtering options",
+        "timeout_seconds": 180,
+        "slow_query_seconds": 20,
+        "column_types": {
+            "global_company_name": "category", "storefront_name": "category", "marketplace_name": "category",
+            "display_type": "category", "product_position": "category", "device_type": "category"
+        },
+        "summary": {
+            "distinct": {"keyword": "Keywords", "storefront_name": "Storefronts",
+                         "global_company_name": "Companies", "created_datetime": "Days"}
+        },
+        # Rows are per day
+        "partitions": {"date_grain": "day", "order_by": [["created_datetime", "asc"], ["keyword", "asc"]]}
     },
     
     "storefront_optimization": {
         "name": "Storefront Optimization",
-        "data_logic_module": "storefront_optimization_data",
+        "queries": {
+            "data": "storefront_optimization_data", "keys": "storefront_optimization_keys",
+            "daily": "storefront_optimization_daily", "dims": "storefront_optimization_dims"
+        },
         "inputs": ["workspace_id", "storefront_ids", "date_range"],
-        "description": "Export storefront optimization data"
+        "description": "Export storefront optimization data",
+        "timeout_seconds": 120,
+        "column_types": {
+            "company_name": "category", "country_code": "category", "marketplace_code": "category",
+            "click": "int32", "ads_order": "int32", "direct_ads_order": "int32", "direct_item_sold": "int32",
+            "item_sold": "int32"
+        },
+        "summary": {
+            "sums": {"gmv": "GMV", "direct_gmv": "Direct GMV", "cost": "Cost", "click": "Clicks",
+                     "impression": "Impressions", "ads_order": "Ads Orders", "item_sold": "Items Sold"},
+            "distinct": {"storefront_id": "Storefronts"},
+            "ratios": {"ROAS": ["gmv", "cost"], "CTR": ["click", "impression"], "CPC": ["cost", "click"],
+                       "CR": ["ads_order", "click"]}
+        },
+        # Built from cached per-day partial sums (see utils/incremental.py)
+        "incremental": {
+            "daily_query": "daily",
+            "dims_query": "dims",
+            "group_key": "group_id",
+            "join": "inner",
+            "sum_columns": ["gmv", "cost", "click", "impression", "ads_order", "direct_gmv",
+                            "direct_ads_order", "direct_item_sold", "item_sold"],
+            "ratio_columns": {"roas": ("gmv", "cost"), "cpc": ("cost", "click")},
+            "columns": ["company_name", "storefront_id", "storefront_name", "country_code", "marketplace_code",
+                        "gmv", "cost", "roas", "cpc", "click", "impression", "ads_order", "direct_gmv",
+                        "direct_ads_order", "direct_item_sold", "item_sold"]
+        }
     },
 
     "campaign_optimization": {
         "name": "Campaign Optimization",
-        "data_logic_module": "campaign_optimization_data",
+        "queries": {
+            "data": "campaign_optimization_data", "keys": "campaign_optimization_keys",
+            "daily": "campaign_optimization_daily", "dims": "campaign_optimization_dims"
+        },
         "inputs": ["workspace_id", "storefront_ids", "date_range"],
-        "description": "Export campaign optimization data"
+        "description": "Export campaign optimization data",
+        "timeout_seconds": 180,
+        "column_types": {
+            "campaign_tag": "category", "country_code": "category", "marketplace_code": "category",
+            "storefront_name": "category", "tool_code": "category", "campaign_status": "category",
+            "campaign_target": "category", "campaign_objective": "category", "campaign_ads_status": "category",
+            "campaign_budget_distributed_method": "category", "first_search_slot": "int8", "campaign_clicks": "int32"
+        },
+        "summary": {
+            "sums": {"campaign_gmv": "GMV", "campaign_cost": "Cost", "campaign_clicks": "Clicks",
+                     "campaign_impressions": "Impressions", "campaign_daily_budget": "Daily Budget"},
+            "distinct": {"campaign_name": "Campaigns", "storefront_name": "Storefronts"},
+            "ratios": {"ROAS": ["campaign_gmv", "campaign_cost"], "CTR": ["campaign_clicks", "campaign_impressions"],
+                       "CPC": ["campaign_cost", "campaign_clicks"]}
+        },
+        # Built from cached per-day partial sums (see utils/incremental.py)
+        "incremental": {
+            "daily_query": "daily",
+            "dims_query": "dims",
+            "group_key": "group_id",
+            "join": "left",  # Campaigns without performance rows are still listed
+            "sum_columns": ["campaign_clicks", "campaign_impressions", "campaign_gmv", "campaign_cost"],
+            "ratio_columns": {
+                "campaign_cpc": ("campaign_cost", "campaign_clicks"),
+                "campaign_roas": ("campaign_gmv", "campaign_cost"),
+                "cpc": ("campaign_cost", "campaign_clicks")
+            },
+            "columns": ["campaign_tag", "country_code", "marketplace_code", "storefront_name", "tool_code",
+                        "campaign_name", "campaign_note", "campaign_status", "campaign_target", "campaign_objective",
+                        "campaign_ads_status", "campaign_budget_distributed_method", "campaign_daily_budget",
+                        "campaign_assessment", "campaign_timeline", "first_search_slot", "max_bidding_price",
+                        "campaign_clicks", "campaign_impressions", "campaign_cpc", "campaign_roas", "cpc",
+                        "campaign_gmv", "campaign_cost"]
+        }
     }
 }
 
@@ -205,6 +333,17 @@ def get_sql_params_mapping(data_source: str) -> Dict[str, str]:
     
     return mapping
 
+def get_sql_param_names(data_source: str) -> List[str]:
+    """Get the names of all SQL parameters used by a data source."""
+    return list(get_sql_params_mapping(data_source).values())
+
+def resolve_date_preset(preset_name: str, today: Optional[date] = None) -> Optional[Tuple[date, date]]:
+    """Resolve a date range preset to concrete (start, end) dates, or None for a custom range."""
+    preset = INPUT_FIELDS["date_range"]["presets"].get(preset_name)
+    if preset is None:
+        return None
+    return preset(today or datetime.now().date())
+
 def validate_data_source(data_source: str) -> bool:
     """Check if a data source is valid."""
     return data_source in DATA_SOURCE_CONFIGS
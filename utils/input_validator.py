@@ -5,10 +5,12 @@ This module provides validation functions that work with the input configuration
 to validate user inputs dynamically based on field definitions.
 """
 
+import json
 from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, date
-from utils.input_config import get_input_config, get_data_source_config
-from utils.helpers import trace_function_call
+from utils.input_config import get_input_config, get_data_source_config, get_sql_param_names, resolve_date_preset
+from utils.spans import traced
+from utils.tracing import trace_function_call
 
 def validate_field_value(field_name: str, value: Any, context: Dict[str, Any] = None) -> List[str]:
     """
@@ -101,30 +103,7 @@ def _validate_date_range_field(field_name: str, value: Tuple[date, date], rules:
     if rules.get("start_before_end", False) and start_date > end_date:
         errors.append("Start date cannot be after end date")
     
-    # Validate date range limits based on storefront count
-    if context and "storefront_ids" in context:
-        storefront_input = context["storefront_ids"]
-        if storefront_input:
-            storefront_list = [s.strip() for s in str(storefront_input).split(",") if s.strip()]
-            num_storefronts = len(storefront_list)
-            date_range_days = (end_date - start_date).days
-            
-            field_config = get_input_config(field_name)
-            limits = field_config.get("validation", {}).get("date_range_limits", {})
-            
-            max_days_allowed = limits.get("single_storefront", 60)
-            
-            if num_storefronts > 1 and num_storefronts <= 2:
-                max_days_allowed = limits.get("multiple_storefronts_2", 60)
-            elif num_storefronts > 2:
-                max_days_allowed = limits.get("multiple_storefronts_3plus", 30)
-            
-            if date_range_days > max_days_allowed:
-                errors.append(
-                    f"With {num_storefronts} storefront(s), the maximum allowed period is {max_days_allowed} days. "
-                    f"Please select a shorter date range."
-                )
-    
+    # Long ranges over many storefronts are not capped: they run as partitions (see utils/partitioned.py)
     return errors
 
 def _validate_select_field(field_name: str, value: str, field_config: Dict[str, Any]) -> List[str]:
@@ -138,6 +117,7 @@ def _validate_select_field(field_name: str, value: str, field_config: Dict[str,
     return errors
 
 @trace_function_call
+@traced("export.validate")
 def validate_data_source_inputs(data_source: str, input_values: Dict[str, Any]) -> List[str]:
     """
     Validate all inputs for a specific data source.
@@ -172,6 +152,7 @@ def validate_data_source_inputs(data_source: str, input_values: Dict[str, Any])
     return all_errors
 
 @trace_function_call
+@traced("export.build_params")
 def build_sql_params(data_source: str, input_values: Dict[str, Any]) -> Dict[str, Any]:
     """
     Build SQL parameters from input values based on data source configuration.
@@ -223,8 +204,57 @@ def build_sql_params(data_source: str, input_values: Dict[str, Any]) -> Dict[str
 
     # --- Separate handling for storefront_ids to ensure it's always processed ---
     if "storefront_ids" in input_values and input_values["storefront_ids"]:
-        field_value = input_values["storefront_ids"]
-        storefront_list = [int(s.strip()) for s in str(field_value).split(",") if s.strip()]
-        sql_params["storefront_ids"] = storefront_list
+        sql_params["storefront_ids"] = _canonical_id_list(input_values["storefront_ids"])
     
     return sql_params
+
+def canonicalize_sql_params(data_source: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Normalize query parameters so that logically identical requests are equal.
+
+    - keys that are not SQL parameters of the data source (e.g. `current_page`, `num_row`) are dropped
+    - ID lists are parsed, deduplicated and sorted
+    - IDs are coerced to int, dates to 'YYYY-MM-DD' strings and 'None' selections to None
+    - a `date_preset` name is resolved to concrete start and end dates
+    - optional parameters that are missing are set to None
+    """
+    params = dict(params)
+    preset_dates = resolve_date_preset(params.pop("date_preset")) if params.get("date_preset") else None
+    if preset_dates:
+        params["start_date"], params["end_date"] = preset_dates
+
+    canonical = {}
+    for name in get_sql_param_names(data_source):
+        value = params.get(name)
+        if value is None or value == "None":
+            canonical[name] = None
+        elif name == "storefront_ids":
+            canonical[name] = _canonical_id_list(value)
+        elif name == "workspace_id":
+            canonical[name] = int(str(value).strip())
+        elif name in ("start_date", "end_date"):
+            canonical[name] = _canonical_date(value)
+        else:
+            canonical[name] = str(value).strip()
+    return canonical
+
+def build_request_key(data_source: str, params: Dict[str, Any]) -> str:
+    """Build a canonical string identifying a request, shared by every equivalent set of parameters."""
+    canonical = canonicalize_sql_params(data_source, params)
+    return json.dumps({"data_source": data_source, "params": canonical}, sort_keys=True)
+
+def _canonical_id_list(value: Any) -> List[int]:
+    """Parse IDs given as a comma-separated string or a sequence into a sorted list without duplicates."""
+    if isinstance(value, (list, tuple, set)):
+        items = value
+    else:
+        items = str(value).split(",")
+    return sorted({int(str(item).strip()) for item in items if str(item).strip()})
+
+def _canonical_date(value: Any) -> str:
+    """Format a date, datetime or date string as 'YYYY-MM-DD'."""
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.strftime('%Y-%m-%d')
+    return datetime.strptime(str(value).strip()[:10], '%Y-%m-%d').strftime('%Y-%m-%d')
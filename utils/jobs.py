@@ -0,0 +1,426 @@
+"""
+Background Export Jobs
+
+Running a query and encoding an export file can take minutes, so both run as jobs on a
+worker pool shared by every session instead of inside the Streamlit script thread. The
+page only submits a job and polls its state; the user can keep working, queue more
+exports or leave the page, and pick finished files up on the Export Jobs page.
+
+Job records are persisted as JSON files, so they survive reruns, new sessions and server
+restarts. Each record names the process running the job: on start, a manager fails only
+the unfinished jobs whose process is gone, not those of another server process sharing
+JOBS_DIR. Nothing in this module may call Streamlit: jobs run outside any script context.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from utils.config import EXPORT_DIR, EXPORT_WORKERS, JOB_ABANDON_SECONDS, JOB_RETENTION_SECONDS, JOBS_DIR, MAX_EXPORT_ROWS
+from utils.exporters import export_file_name, write_export
+from utils.materialize import MaterializedResult, iter_result_chunks
+from utils.query_control import CancelToken, QueryCancelled, QueryTimeout, cancel_scope
+from utils.result_cache import get_result_cache
+from utils.metrics import EXPORT_BYTES, EXPORT_JOBS, EXPORT_ROWS, registry
+from utils.spans import current_traceparent, span, traced_chunks
+from utils.tracing import current_session_id, session_scope
+
+# Job kinds
+PREPARE_JOB = "prepare"  # Run the query, count it and materialize the result
+EXPORT_JOB = "export"  # Encode a materialized result into a download file
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Progress is persisted at most this often while a job runs
+_PROGRESS_SAVE_INTERVAL = 1.0
+
+# How often unfinished prepare jobs are checked for abandonment, in seconds
+_REAPER_INTERVAL = 5.0
+
+# Tells this process apart from an earlier one that had the same pid, e.g. after a container restart
+_PROCESS_ID = uuid.uuid4().hex
+
+
+@dataclass
+class ExportJob:
+    """State of one background job, persisted as JSON."""
+    job_id: str
+    kind: str
+    data_source: str
+    sql_params: Dict[str, Any]
+    owner: Optional[str] = None  # Session that submitted the job
+    export_format: Optional[str] = None
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    rows_done: int = 0
+    total_rows: Optional[int] = None
+    total_rows_exact: bool = True  # False if a probe only found the result to exceed the row limit
+    # Prepare jobs: the materialized result and the totals of the full result
+    result_key: Optional[str] = None
+    result_path: Optional[str] = None
+    summary: Optional[Dict[str, Optional[float]]] = None
+    # Export jobs: the download file
+    file_path: Optional[str] = None
+    file_name: Optional[str] = None
+    error: Optional[str] = None
+    error_kind: Optional[str] = None  # "connection", "query", "timeout" or "other"
+    last_seen: float = field(default_factory=time.time)  # Last time a page polled the job
+    trace_parent: Optional[str] = None  # W3C traceparent of the span that submitted the job
+    session_id: Optional[str] = None  # Streamlit session that submitted the job, whose traces include the job's calls
+    pid: Optional[int] = None  # Process running the job
+    process_id: Optional[str] = None  # _PROCESS_ID of that process
+
+    @property
+    def is_finished(self) -> bool:
+        return self.status in FINISHED_STATES
+
+    @property
+    def progress(self) -> float:
+        """Fraction of rows processed, for progress bars."""
+        if self.status == SUCCEEDED:
+            return 1.0
+        if not self.total_rows:
+            return 0.0
+        return min(self.rows_done / self.total_rows, 1.0)
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None:
+            return None
+        return (self.finished_at or time.time()) - self.started_at
+
+    def to_result(self) -> MaterializedResult:
+        """The materialized result produced by a prepare job."""
+        return MaterializedResult(
+            data_source=self.data_source,
+            key=self.result_key,
+            num_rows=self.total_rows or 0,
+            path=self.result_path,
+            rows_exact=self.total_rows_exact,
+        )
+
+
+class JobManager:
+    """Runs export jobs on a bounded thread pool and keeps their records on disk."""
+
+    def __init__(self, directory: Path, max_workers: int, retention_seconds: int):
+        self.directory = Path(directory)
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, ExportJob] = {}
+        self._tokens: Dict[str, CancelToken] = {}
+        self._last_saved: Dict[str, float] = {}
+        # Threads rather than processes: the work waits on the database or runs inside
+        # pyarrow, both of which release the GIL, and job state stays in one process
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export-job")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load()
+        threading.Thread(target=self._reap_abandoned, name="export-job-reaper", daemon=True).start()
+
+    # --- Public API ---
+    def submit_prepare(self, data_source: str, sql_params: Dict[str, Any], owner: Optional[str] = None,
+                       max_rows: int = MAX_EXPORT_ROWS) -> ExportJob:
+        """Queue a job that runs the data query and materializes its result."""
+        job = ExportJob(job_id=uuid.uuid4().hex, kind=PREPARE_JOB, data_source=data_source,
+                        sql_params=dict(sql_params), owner=owner)
+        return self._submit(job, lambda: _run_prepare(self, job, max_rows))
+
+    def submit_export(self, data_source: str, sql_params: Dict[str, Any], export_format: str,
+                      owner: Optional[str] = None, result: Optional[MaterializedResult] = None) -> ExportJob:
+        """Queue a job that writes the full result to a download file in `export_format`."""
+        job = ExportJob(job_id=uuid.uuid4().hex, kind=EXPORT_JOB, data_source=data_source,
+                        sql_params=dict(sql_params), owner=owner, export_format=export_format)
+        if result is not None:
+            job.result_key, job.result_path, job.total_rows = result.key, result.path, result.num_rows
+        job.file_name = export_file_name(data_source, export_format, datetime.now().strftime('%Y%m%d'))
+        job.file_path = str(EXPORT_DIR / f"{job.job_id}_{job.file_name}")
+        return self._submit(job, lambda: _run_export(self, job))
+
+    def get(self, job_id: str) -> Optional[ExportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self, owner: Optional[str] = None) -> List[ExportJob]:
+        """Jobs newest first, optionally only those submitted by `owner`."""
+        self._refresh_foreign()
+        self._purge_expired()
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if owner is None or job.owner == owner]
+        return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str):
+        """Cancel a queued or running job, stopping its query on the database."""
+        token = self._tokens.get(job_id)
+        if token is not None:
+            token.cancel()
+
+    def heartbeat(self, job_id: str):
+        """Record that a page is still waiting for the job."""
+        job = self.get(job_id)
+        if job is not None:
+            job.last_seen = time.time()
+
+    def report_progress(self, job: ExportJob, rows_done: int, total_rows: Optional[int] = None):
+        """Record progress of a running job; the record on disk is refreshed at most once a second."""
+        # Work that does not touch the database (e.g. encoding) stops here between chunks
+        self._tokens[job.job_id].raise_if_cancelled()
+        job.rows_done = rows_done
+        if total_rows is not None:
+            job.total_rows = total_rows
+        if time.time() - self._last_saved.get(job.job_id, 0) >= _PROGRESS_SAVE_INTERVAL:
+            self._save(job)
+
+    # --- Internals ---
+    def _submit(self, job: ExportJob, work: Callable[[], None]) -> ExportJob:
+        job.trace_parent = current_traceparent()
+        job.session_id = current_session_id()
+        job.pid, job.process_id = os.getpid(), _PROCESS_ID
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._tokens[job.job_id] = CancelToken()
+        self._save(job)
+        self._executor.submit(self._run, job, work)
+        return job
+
+    def _run(self, job: ExportJob, work: Callable[[], None]):
+        token = self._tokens[job.job_id]
+        try:
+            if token.cancelled:
+                # Cancelled while still queued
+                raise QueryCancelled("The job was cancelled.")
+            job.status = RUNNING
+            job.started_at = time.time()
+            self._save(job)
+            with session_scope(job.session_id), cancel_scope(token), \
+                    span(f"job.{job.kind}", parent=job.trace_parent, data_source=job.data_source, job_id=job.job_id):
+                work()
+            job.status = SUCCEEDED
+        except QueryCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.status = FAILED
+            job.error = str(e)
+            job.error_kind = _classify_error(e)
+        finally:
+            job.finished_at = time.time()
+            self._save(job)
+            EXPORT_JOBS.inc(data_source=job.data_source, kind=job.kind, status=job.status)
+            with self._lock:
+                self._tokens.pop(job.job_id, None)
+
+    def _reap_abandoned(self):
+        """
+        Cancel prepare jobs no page has polled for JOB_ABANDON_SECONDS, e.g. because the tab was closed.
+        Export jobs are kept: their files stay available on the Export Jobs page.
+        """
+        while True:
+            time.sleep(_REAPER_INTERVAL)
+            cutoff = time.time() - JOB_ABANDON_SECONDS
+            with self._lock:
+                abandoned = [job.job_id for job in self._jobs.values()
+                             if job.kind == PREPARE_JOB and not job.is_finished and job.last_seen < cutoff]
+            for job_id in abandoned:
+                self.cancel(job_id)
+
+    def _record_path(self, job_id: str) -> Path:
+        return self.directory / f"{job_id}.json"
+
+    def _save(self, job: ExportJob):
+        """Write the job record atomically, so readers never see a half-written file."""
+        path = self._record_path(job.job_id)
+        temp_path = path.with_suffix(".tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(asdict(job), f, default=str)
+        os.replace(temp_path, path)
+        self._last_saved[job.job_id] = time.time()
+
+    def _load(self):
+        """
+        Load persisted jobs. Jobs that were queued or running in a process that has stopped are
+        failed; those of another live process keep running there.
+        """
+        for path in self.directory.glob("*.json"):
+            job = _read_record(path)
+            if job is None:
+                path.unlink(missing_ok=True)
+                continue
+            self._jobs[job.job_id] = self._fail_if_orphaned(job)
+        self._purge_expired()
+
+    def _refresh_foreign(self):
+        """Re-read the records of unfinished jobs that another process runs, as that process updates them."""
+        with self._lock:
+            foreign = [job.job_id for job in self._jobs.values() if not job.is_finished and job.job_id not in self._tokens]
+        for job_id in foreign:
+            job = _read_record(self._record_path(job_id))
+            if job is not None:
+                job = self._fail_if_orphaned(job)
+            with self._lock:
+                if job is None:
+                    # Purged by its own process
+                    self._jobs.pop(job_id, None)
+                else:
+                    self._jobs[job_id] = job
+
+    def _fail_if_orphaned(self, job: ExportJob) -> ExportJob:
+        """Fail an unfinished job whose process has stopped, since nothing will finish it."""
+        if not job.is_finished and not _process_is_running(job):
+            job.status = FAILED
+            job.error = "Interrupted by a server restart. Please submit it again."
+            job.error_kind = "other"
+            job.finished_at = job.finished_at or time.time()
+            self._save(job)
+        return job
+
+    def _purge_expired(self):
+        """Delete finished jobs older than the retention period, with their export files."""
+        cutoff = time.time() - self.retention_seconds
+        with self._lock:
+            expired = [job for job in self._jobs.values() if job.is_finished and job.finished_at < cutoff]
+            for job in expired:
+                self._jobs.pop(job.job_id, None)
+                self._last_saved.pop(job.job_id, None)
+        for job in expired:
+            # Materialized results belong to the result cache; only export files are the job's own
+            if job.kind == EXPORT_JOB and job.file_path:
+                Path(job.file_path).unlink(missing_ok=True)
+            self._record_path(job.job_id).unlink(missing_ok=True)
+
+
+def _read_record(path: Path) -> Optional[ExportJob]:
+    """The job persisted at `path`, or None if it is missing or unreadable."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return ExportJob(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def _process_is_running(job: ExportJob) -> bool:
+    """Whether the process that ran `job` is still running. JOBS_DIR is local to one host."""
+    if job.process_id == _PROCESS_ID:
+        return True
+    if job.pid is None or job.pid == os.getpid() or os.name == "nt":
+        # A record written before pids were kept, an earlier process with this pid, or no signal 0 to probe with
+        return False
+    try:
+        os.kill(job.pid, 0)
+    except PermissionError:
+        # The process exists but belongs to another user
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def _run_prepare(manager: JobManager, job: ExportJob, max_rows: int):
+    from utils.logic import get_summary, materialize_result
+
+    result = materialize_result(
+        job.data_source,
+        job.sql_params,
+        max_rows=max_rows,
+        progress_callback=lambda rows, total: manager.report_progress(job, rows, total),
+    )
+    job.result_key, job.result_path, job.total_rows = result.key, result.path, result.num_rows
+    job.total_rows_exact = result.rows_exact
+    if not result.num_rows:
+        return
+    # Also for results too large to export: their totals are often all the user needs
+    try:
+        job.summary = get_summary(job.data_source, job.sql_params, result)
+    except QueryCancelled:
+        raise
+    except Exception:
+        # The result is usable without its totals; the page then summarizes the preview only
+        job.summary = None
+
+
+def _run_export(manager: JobManager, job: ExportJob):
+    from utils.logic import materialize_result
+
+    result = job.to_result()
+    # Held from the check onwards, so the file is not evicted before the first chunk is read
+    with get_result_cache().hold(result.key):
+        if not result.is_available:
+            # The materialized copy was evicted from the result cache: evaluate the query again
+            result = materialize_result(job.data_source, job.sql_params)
+            if not result.is_available:
+                raise RuntimeError(f"The result has {result.num_rows:,} rows and cannot be exported.")
+            job.result_key, job.result_path, job.total_rows = result.key, result.path, result.num_rows
+        _write_export(manager, job, result)
+
+
+def _write_export(manager: JobManager, job: ExportJob, result: MaterializedResult):
+    with span("export.write", data_source=job.data_source, format=job.export_format) as write_span:
+        # Reading the materialized result interleaves with encoding; each chunk read is a child span
+        job.rows_done = write_export(
+            traced_chunks("result.read", iter_result_chunks(result)),
+            Path(job.file_path),
+            job.export_format,
+            lambda rows: manager.report_progress(job, rows),
+        )
+        file_size = Path(job.file_path).stat().st_size
+        write_span.set(rows=job.rows_done, bytes=file_size)
+    EXPORT_ROWS.inc(job.rows_done, data_source=job.data_source, format=job.export_format)
+    EXPORT_BYTES.inc(file_size, data_source=job.data_source, format=job.export_format)
+
+
+def _classify_error(error: Exception) -> str:
+    if isinstance(error, QueryTimeout):
+        return "timeout"
+    if isinstance(error, OperationalError):
+        return "connection"
+    if isinstance(error, ProgrammingError):
+        return "query"
+    return "other"
+
+
+_manager: Optional[JobManager] = None
+_manager_lock = threading.Lock()
+
+
+def _collect_job_metrics():
+    """Unfinished jobs by kind and state, for the metrics endpoint: the saturation of the worker pool."""
+    counts = {(kind, status): 0 for kind in (PREPARE_JOB, EXPORT_JOB) for status in (QUEUED, RUNNING)}
+    if _manager is not None:
+        with _manager._lock:
+            jobs = list(_manager._jobs.values())
+        for job in jobs:
+            if (job.kind, job.status) in counts:
+                counts[(job.kind, job.status)] += 1
+    return [
+        ("export_jobs_in_progress", "gauge", "Background jobs waiting for or holding a worker",
+         [({"kind": kind, "status": status}, count) for (kind, status), count in counts.items()]),
+        ("export_workers", "gauge", "Size of the background job worker pool", [({}, EXPORT_WORKERS)]),
+    ]
+
+
+registry.register_collector(_collect_job_metrics)
+
+
+def get_job_manager() -> JobManager:
+    """Return the process-wide job manager, creating it on first use."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = JobManager(JOBS_DIR, EXPORT_WORKERS, JOB_RETENTION_SECONDS)
+    return _manager
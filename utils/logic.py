@@ -1,201 +1,448 @@
 import streamlit as st
 import pandas as pd
-from io import StringIO
-from sqlalchemy import text
-from sqlalchemy.exc import OperationalError, ProgrammingError
-from sqlalchemy import text
+import pyarrow.parquet as pq
+from typing import Callable, Iterator, Optional
+from utils.config import EXPORT_CHUNK_SIZE, MAX_EXPORT_ROWS, PREVIEW_ROW_LIMIT
 from utils.database import get_connection
-from utils.helpers import trace_function_call
-import importlib
-from utils.input_config import DATA_SOURCE_CONFIGS
+from utils.exporters import DEFAULT_EXPORT_FORMAT, write_export
+from utils.materialize import RESULT_LAYOUT, MaterializedResult, read_result_rows, with_row_ids
+from utils.result_cache import get_result_cache, make_cache_key
+from utils.result_types import apply_column_types
+from utils.session_store import get_session_store
+from utils.incremental import get_incremental_data, get_incremental_hash, get_incremental_spec
+from utils.partitioned import PartitionedRun, plan_partitions
+from utils.tracing import trace_function_call
+from utils.query_control import controlled_query
+from utils.query_profiler import MYSQL_DIALECTS, profile_query
+from utils.query_registry import get_query
+from utils.row_estimate import ESTIMATED, check_admission, get_row_history
+from utils.metrics import EXPORT_BLOCKED, EXPORT_REQUESTS, QUERY_ROWS, observe_query
+from utils.spans import Span, span, traced_chunks
+from utils.summary import Summary, get_summary_spec, read_summary, summarize_frame, summary_columns, summary_sql
+from utils.sql_binding import bind_text, expanding_statement, pad_in_lists
+from utils.input_validator import build_request_key, canonicalize_sql_params
 
+# Name of the column that carries the total row count in combined count + preview queries
+TOTAL_ROWS_COLUMN = "__total_rows"
 
-def get_query_by_source(data_source: str):
-    """Dynamically import and return the get_query function based on the data source config."""
-    config = DATA_SOURCE_CONFIGS.get(data_source)
-    if not config or 'data_logic_module' not in config:
-        raise ValueError(f"Unknown or misconfigured data source: {data_source}")
+# Session store entry of the preview rows of the session's current result
+PREVIEW_KEY = "preview"
 
-    module_name = config['data_logic_module']
-    try:
-        # Dynamically import the data logic module
-        data_logic_module = importlib.import_module(f"data_logic.{module_name}")
-        # Return the get_query function from the imported module
-        return getattr(data_logic_module, 'get_query')
-    except (ImportError, AttributeError) as e:
-        raise ImportError(f"Could not import or find 'get_query' in module 'data_logic.{module_name}': {e}")
-
-
-@st.cache_data(show_spinner=False, ttl=3600, persist=True)
-def _execute_query(query: str, params_to_bind: dict) -> pd.DataFrame:
-    print("--- DEBUG: EXECUTING QUERY ---")
-    print(f"Query: {query}")
-    print(f"Params: {params_to_bind}")
-    print("-----------------------------")
-    with get_connection() as db:
-        return pd.read_sql(text(query), db.connection(), params=params_to_bind)
+# Query types derived from the SQL file of another query type
+_DERIVED_QUERY_TYPES = {
+    'summary': 'data',  # The summary of the data source over the data query
+    'count': 'keys',  # Exact row count: COUNT(*) over the grouping keys
+    'probe': 'keys',  # Row count bounded by `limit`: COUNT(*) over the first `limit` grouping keys
+}
+
+
+def _build_query(query_type: str, data_source: str, limit: int = None, with_total: bool = False, **kwargs):
+    """
+    Return the compiled statement, the parameters to bind and the registry entry of a query.
+    With `with_total`, every row of a data query also carries the total row count of the
+    unlimited result in the TOTAL_ROWS_COLUMN column, computed by a `COUNT(*) OVER ()` window.
+    The query types of _DERIVED_QUERY_TYPES wrap the SQL of another query type; a 'probe'
+    stops counting after `limit` rows.
+    Statements are compiled once per variant and reused until the SQL file changes.
+    """
+    compiled = get_query(data_source, _DERIVED_QUERY_TYPES.get(query_type, query_type))
+    params_to_bind = canonicalize_sql_params(data_source, kwargs)
+
+    # List parameters the query does not reference are not sent to the DB driver
+    for name in [name for name, value in params_to_bind.items() if isinstance(value, (list, tuple))]:
+        if not compiled.references(name):
+            del params_to_bind[name]
+    # Lists (e.g. storefront_ids) become expanding IN-list parameters padded to a few bucket sizes
+    expanding = frozenset(name for name, value in params_to_bind.items() if isinstance(value, (list, tuple)))
+
+    with_total = with_total and query_type == 'data'
+    limit = limit if query_type in ('data', 'probe') else None
+
+    def _build(sql: str):
+        # Newlines keep a trailing `--` comment in the SQL file from swallowing the closing parenthesis
+        if query_type == 'summary':
+            sql = summary_sql(get_summary_spec(data_source), sql)
+        elif query_type == 'count':
+            sql = f"SELECT COUNT(*) AS row_count FROM (\n{sql}\n) AS _k"
+        elif query_type == 'probe':
+            # The database stops producing grouping keys once the limit is reached
+            return expanding_statement(
+                f"SELECT COUNT(*) AS row_count FROM (SELECT 1 AS _one FROM (\n{sql}\n) AS _k LIMIT {int(limit)}) AS _p",
+                expanding)
+        if with_total:
+            # The window is evaluated before LIMIT, so it counts the full result in the same pass
+            sql = f"SELECT _q.*, COUNT(*) OVER () AS {TOTAL_ROWS_COLUMN} FROM (\n{sql}\n) AS _q"
+        if limit is not None:
+            sql = f"{sql} LIMIT {int(limit)}"
+        return expanding_statement(sql, expanding)
+
+    query = compiled.variant((query_type, with_total, limit, expanding), _build)
+    return query, pad_in_lists(params_to_bind, expanding), compiled
 
 
 @trace_function_call
-@st.cache_data(show_spinner=False, ttl=3600, persist=True)
-def get_data(query_type: str, data_source: str, limit: int = None, **kwargs):
+def get_data(query_type: str, data_source: str, limit: int = None, with_total: bool = False, **kwargs):
     """
-    Fetches data from the DB.
+    Fetches data from the DB, going through the shared result cache.
     """
-    get_query_func = get_query_by_source(data_source)
-    base_query_str = get_query_func(query_type)
-    
-    params_to_bind = kwargs.copy()
-
-    # SQLAlchemy's text() construct doesn't natively support expanding a list for an IN clause when used with pandas.read_sql.
-    # To work around this, we safely format the list of integer IDs directly into the SQL string.
-    # This is safe from SQL injection because we explicitly cast all IDs to integers first.
-    if 'storefront_ids' in params_to_bind and isinstance(params_to_bind['storefront_ids'], (list, tuple)) and ':storefront_ids' in base_query_str:
-        storefront_ids = params_to_bind['storefront_ids']
-        
-        safe_ids = [int(sid) for sid in storefront_ids]
-        
-        if len(safe_ids) == 1:
-            ids_string = f"({safe_ids[0]})"
-        else:
-            ids_string = str(tuple(safe_ids))
+    query, params_to_bind, compiled = _build_query(query_type, data_source, limit, with_total, **kwargs)
 
-        base_query_str = base_query_str.replace(':storefront_ids', ids_string)
-        
-        del params_to_bind['storefront_ids']    
-    elif 'storefront_ids' in params_to_bind:
-        # Clean up storefront_ids if they are not needed in the query to avoid sending them to the DB driver
-        del params_to_bind['storefront_ids']
+    cache = get_result_cache()
+    cache_key = make_cache_key(build_request_key(data_source, kwargs), compiled.content_hash,
+                               query_type=query_type, limit=limit, with_total=with_total)
+    with span("db.query", data_source=data_source, query_type=query_type) as query_span:
+        df = cache.get_frame(cache_key)
+        if df is not None:
+            query_span.set(cache_hit=True, rows=len(df))
+            return apply_column_types(data_source, df)
 
-    if limit is not None and query_type == 'data':
-        final_query_str = f"{base_query_str} LIMIT {limit}"
-    else:
-        final_query_str = base_query_str
-    
-    query = text(final_query_str)
-    
+        with get_connection() as db:
+            connection = db.connection()
+            with profile_query(connection, data_source, query_type, query, params_to_bind), controlled_query(connection, data_source), \
+                    observe_query(data_source, query_type):
+                df = apply_column_types(data_source, pd.read_sql(query, connection, params=params_to_bind))
+        QUERY_ROWS.inc(len(df), data_source=data_source, query_type=query_type)
+        query_span.set(cache_hit=False, rows=len(df), bytes=int(df.memory_usage(index=False).sum()))
+        # Return the cached copy so hits and misses yield identical dtypes
+        return apply_column_types(data_source, pd.read_parquet(cache.put_frame(cache_key, df)))
+
+
+def explain_query(query_type: str, data_source: str, **kwargs) -> Optional[str]:
+    """The EXPLAIN plan of a query as text, or None for databases without SingleStore/MySQL style plans."""
+    query, params_to_bind, _ = _build_query(query_type, data_source, **kwargs)
     with get_connection() as db:
-        return pd.read_sql(query, db.connection(), params=params_to_bind)
+        connection = db.connection()
+        if connection.dialect.name not in MYSQL_DIALECTS:
+            return None
+        with controlled_query(connection, data_source):
+            rows = connection.execute(*bind_text(f"EXPLAIN {query.text}", params_to_bind)).fetchall()
+    return "\n".join(" ".join(str(value) for value in row if value is not None) for row in rows)
 
 
+def stream_data(data_source: str, chunk_size: int = EXPORT_CHUNK_SIZE, with_total: bool = False, **kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Streams the full data query from a server-side cursor in chunks of `chunk_size` rows.
+    Only one chunk is held in memory at a time, whatever the size of the result, and each
+    chunk carries the column types of the data source.
+    The query runs under the timeout of the data source and can be cancelled while it runs.
+    """
+    query, params_to_bind, _ = _build_query('data', data_source, with_total=with_total, **kwargs)
+
+    with get_connection() as db:
+        connection = db.connection(execution_options={"stream_results": True})
+        # Closing this generator early stops the query on the server instead of draining its rows
+        with profile_query(connection, data_source, 'data', query, params_to_bind) as timing, controlled_query(connection, data_source):
+            for chunk in pd.read_sql(query, connection, params=params_to_bind, chunksize=chunk_size):
+                # The rest of the block includes the time the consumer spends on each chunk
+                timing.mark_first_rows()
+                yield apply_column_types(data_source, chunk)
+
 
 @trace_function_call
 def load_data(data_source: str, limit: int = None):
     """Load data based on parameters in the session state."""
     try:
-        params = st.session_state.get('params', {}).copy()
+        params = st.session_state.get('params', {})
         if not params:
             return None
 
-        # Parameters are already built, just remove non-SQL keys
-        params.pop('data_source', None)
-        params.pop('current_page', None)  # Remove page info but keep data_source in session
-        params.pop('num_row', None)  # Remove row count info
-        sql_params = params
+        # Keep only the SQL parameters, in canonical form
+        sql_params = canonicalize_sql_params(data_source, params)
 
-        df = get_data("data", data_source, limit=limit, **sql_params)
-        st.session_state.df = df
-        return df
+        return get_data("data", data_source, limit=limit, **sql_params)
     except Exception as e:
         st.error(f"An error occurred while loading data: {str(e)}")
         return None
 
 
+@trace_function_call
+def submit_full_export(data_source: str, export_format: str = DEFAULT_EXPORT_FORMAT):
+    """
+    Queue a background job writing the full dataset for the parameters in the session state into a file in `export_format`.
+    The job re-encodes the session's materialized result, so the database is not queried again.
+    """
+    from utils.jobs import get_job_manager
+
+    params = st.session_state.get('params', {})
+    sql_params = canonicalize_sql_params(data_source, params)
+    result = st.session_state.get('result')
+    if result is not None and result.data_source != data_source:
+        result = None
+
+    EXPORT_REQUESTS.inc(data_source=data_source, stage="export")
+    # The job continues this trace (see utils/spans.py)
+    with span("export.request", data_source=data_source, format=export_format):
+        job = get_job_manager().submit_export(
+            data_source, sql_params, export_format, owner=st.session_state.get('owner_id'), result=result
+        )
+    st.session_state.job_id = job.job_id
+    st.session_state.stage = 'exporting_full'
+    return job
+
+
+def apply_export_job(job):
+    """Move the session to the download stage once its export job has finished."""
+    st.session_state.job_id = None
+    if job.status == 'cancelled':
+        st.session_state.user_message = {"type": "info", "text": "The export was cancelled."}
+        st.session_state.stage = 'loaded'
+        return
+    if job.status != 'succeeded':
+        st.session_state.user_message = {
+            "type": "error",
+            "text": f"An error occurred while exporting data: {job.error}"
+        }
+        st.session_state.stage = 'loaded'
+        return
+
+    st.session_state.download_info = {
+        "path": job.file_path,
+        "file_name": job.file_name,
+        "rows": job.rows_done,
+        "format": job.export_format,
+        "job_id": job.job_id,
+    }
+    st.session_state.stage = 'download_ready'
+
+
 @trace_function_call
 def get_row_count(data_source: str, **kwargs) -> int:
-    """Get the total row count."""
+    """Get the exact total row count, counting all grouping keys. Only computed on demand."""
     try:
-        params = kwargs.copy()
-        if not params:
+        if not kwargs:
             return None
 
-        # Parameters are already built, just remove non-SQL keys
-        params.pop('data_source', None)
-        params.pop('current_page', None)  # Remove page info but keep data_source in session
-        params.pop('num_row', None)  # Remove row count info
-        sql_params = params
+        # Keep only the SQL parameters, in canonical form
+        sql_params = canonicalize_sql_params(data_source, kwargs)
 
         # Get total row count
         num_row_df = get_data('count', data_source, **sql_params)
-        num_row = num_row_df.iloc[0, 0] if not num_row_df.empty else 0
+        num_row = int(num_row_df.iloc[0, 0]) if not num_row_df.empty else 0
+        get_row_history().record(data_source, sql_params, num_row)
         return num_row
     except Exception as e:
         st.error(f"An error occurred while getting row count: {str(e)}")
         return None
 
 
+def describe_row_count(num_row: int, exact: bool) -> str:
+    """A row count for messages; a probed count above the limit only says it exceeds the limit."""
+    return f"{num_row:,}" if exact else f"more than {MAX_EXPORT_ROWS:,}"
+
+
+@trace_function_call
+def get_summary(data_source: str, sql_params: dict, result: Optional[MaterializedResult] = None) -> Optional[Summary]:
+    """
+    Totals of the full result of a query, or None if the data source declares no summary.
+    They are computed from the materialized `result` when it is available, reading only the
+    columns the summary needs, so the data query is not evaluated a second time. Otherwise
+    (e.g. a result refused as too large) the database computes them over the data query,
+    except for sources with an incremental spec, whose data query is never run: their
+    summary is then None.
+    """
+    spec = get_summary_spec(data_source)
+    if not spec:
+        return None
+    if result is not None and result.is_available:
+        with get_result_cache().hold(result.key):
+            frame = pd.read_parquet(result.path, columns=summary_columns(spec))
+        return summarize_frame(spec, frame)
+    if get_incremental_spec(data_source):
+        return None
+    return read_summary(spec, get_data('summary', data_source, **sql_params))
+
+
+@trace_function_call
+def materialize_result(data_source: str, sql_params: dict, max_rows: int = MAX_EXPORT_ROWS,
+                       progress_callback: Optional[Callable[[int, int], None]] = None) -> MaterializedResult:
+    """
+    Evaluate the data query once and write its full result to a Parquet file in the result cache.
+
+    Unless the result is cached, an admission check (see utils/row_estimate.py) first decides
+    on a cheap row count whether the data query runs at all. The query carries a `COUNT(*) OVER ()` column, so the total is known from the first chunk.
+    If it exceeds `max_rows`, reading stops there and nothing is written. `progress_callback`
+    receives (rows fetched, total rows) after each chunk. A result already in the cache is
+    returned without touching the database.
+
+    Requests that the partition rules of their data source split into several partitions run
+    as concurrent partition queries instead (see utils/partitioned.py), merged into one result.
+
+    Sources with an incremental spec are instead assembled from cached per-day partial sums.
+    """
+    cache = get_result_cache()
+    if get_incremental_spec(data_source):
+        key = make_cache_key(build_request_key(data_source, sql_params), get_incremental_hash(data_source), query_type='incremental',
+                             layout=RESULT_LAYOUT)
+    else:
+        key = make_cache_key(build_request_key(data_source, sql_params), get_query(data_source, 'data').content_hash, query_type='materialized',
+                             layout=RESULT_LAYOUT)
+
+    with span("export.materialize", data_source=data_source) as materialize_span:
+        cached_path = cache.get_path(key)
+        if cached_path is not None:
+            num_row = pq.ParquetFile(cached_path).metadata.num_rows
+            materialize_span.set(cache_hit=True, rows=num_row, bytes=cached_path.stat().st_size)
+            return MaterializedResult(data_source=data_source, key=key, num_rows=num_row, path=str(cached_path))
+        materialize_span.set(cache_hit=False)
+
+        if get_incremental_spec(data_source):
+            df = apply_column_types(data_source, get_incremental_data(data_source, sql_params))
+            num_row = len(df)
+            materialize_span.set(rows=num_row, incremental=True)
+            if num_row == 0 or num_row > max_rows:
+                return MaterializedResult(data_source=data_source, key=key, num_rows=num_row)
+            path = cache.put_frame(key, next(with_row_ids(iter([df]))))
+            materialize_span.set(bytes=path.stat().st_size)
+            if progress_callback:
+                progress_callback(num_row, num_row)
+            return MaterializedResult(data_source=data_source, key=key, num_rows=num_row, path=str(path))
+
+        admission = check_admission(data_source, sql_params, max_rows)
+        if admission is not None and admission.kind != ESTIMATED and admission.rows > max_rows:
+            materialize_span.set(rows=admission.rows, refused_by=admission.strategy)
+            return MaterializedResult(data_source=data_source, key=key, num_rows=admission.rows,
+                                      rows_exact=admission.is_exact)
+
+        partitions = plan_partitions(data_source, sql_params)
+        if len(partitions) > 1:
+            materialize_span.set(partitions=len(partitions))
+            with PartitionedRun(data_source, partitions, max_rows) as run:
+                num_row = run.wait(progress_callback)
+                materialize_span.set(rows=num_row)
+                if run.exceeded:
+                    # The partitions still running were stopped, so the total may be a lower bound
+                    return MaterializedResult(data_source=data_source, key=key, num_rows=num_row, rows_exact=run.total_exact)
+                get_row_history().record(data_source, sql_params, num_row)
+                if num_row == 0:
+                    return MaterializedResult(data_source=data_source, key=key, num_rows=0)
+                return _write_result(data_source, key, run.chunks(), num_row, progress_callback, materialize_span)
+
+        chunks = stream_data(data_source, with_total=True, **sql_params)
+        try:
+            # Until the first rows arrive: query execution, the first fetch and its DataFrame
+            with span("db.execute", data_source=data_source), observe_query(data_source, 'data'):
+                first_chunk = next(chunks, None)
+            if first_chunk is None or first_chunk.empty:
+                materialize_span.set(rows=0)
+                return MaterializedResult(data_source=data_source, key=key, num_rows=0)
+
+            num_row = int(first_chunk[TOTAL_ROWS_COLUMN].iloc[0])
+            materialize_span.set(rows=num_row)
+            get_row_history().record(data_source, sql_params, num_row)
+            if num_row > max_rows:
+                return MaterializedResult(data_source=data_source, key=key, num_rows=num_row)
+
+            def _data_chunks():
+                yield first_chunk.drop(columns=[TOTAL_ROWS_COLUMN])
+                for chunk in chunks:
+                    yield chunk.drop(columns=[TOTAL_ROWS_COLUMN])
+
+            # Fetching interleaves with encoding; each fetched chunk is a "db.fetch" child span
+            return _write_result(data_source, key, traced_chunks("db.fetch", _data_chunks()), num_row, progress_callback,
+                                 materialize_span)
+        finally:
+            chunks.close()
+
+
+def _write_result(data_source: str, key: str, chunks: Iterator[pd.DataFrame], num_row: int,
+                  progress_callback: Optional[Callable[[int, int], None]], materialize_span: Span) -> MaterializedResult:
+    """Write the rows of a result with row ids to a Parquet file and publish it in the result cache under `key`."""
+    cache = get_result_cache()
+    temp_path = cache.new_temp_path()
+    with span("export.write", data_source=data_source, format="parquet") as write_span:
+        rows_written = write_export(
+            with_row_ids(chunks),
+            temp_path,
+            "parquet",
+            (lambda rows: progress_callback(rows, num_row)) if progress_callback else None,
+        )
+        write_span.set(rows=rows_written, bytes=temp_path.stat().st_size)
+    QUERY_ROWS.inc(rows_written, data_source=data_source, query_type='data')
+    path = cache.put_file(key, temp_path)
+    materialize_span.set(bytes=path.stat().st_size)
+    return MaterializedResult(data_source=data_source, key=key, num_rows=num_row, path=str(path))
+
+
 @trace_function_call
 def handle_export_process(data_source: str):
-    """Handle the entire process: row counting, and status updates."""
+    """Queue the background job that counts, previews and materializes the data, and wait for it."""
+    from utils.jobs import get_job_manager
+
     # `st.session_state.params` is now set by the caller (`create_action_buttons`)
-    params = st.session_state.get('params', {}).copy()
+    # Only the canonical SQL parameters are sent to the database
+    sql_params = canonicalize_sql_params(data_source, st.session_state.get('params', {}))
 
-    # Keep the data_source in params for tab state management
-    # but remove other non-SQL keys for the database query
-    current_page = params.pop('current_page', None)
-    params.pop('data_source', None)
-    sql_params = params
+    EXPORT_REQUESTS.inc(data_source=data_source, stage="prepare")
+    # Count, preview and full export are all served from this single evaluation
+    job = get_job_manager().submit_prepare(data_source, sql_params, owner=st.session_state.get('owner_id'))
+    st.session_state.job_id = job.job_id
+    st.session_state.result = None
+    st.session_state.summary = None
+    get_session_store().discard(PREVIEW_KEY)
+    st.session_state.stage = 'preparing'
 
-    try:
-        with st.spinner("Checking data size..."):
-            # Get total row count
-            num_row = get_row_count(data_source, **sql_params)
-            if num_row is None: # Handle case where get_row_count fails
-                st.session_state.user_message = {
-                    "type": "error",
-                    "text": "Failed to check data size. Please try again."
-                }
-                st.session_state.stage = 'initial'
-                return
-            
-            # Re-add the data_source to params so it's preserved for tab state
-            st.session_state.params['num_row'] = num_row
-            # Keep data_source in params for tab state management
-            st.session_state.params['data_source'] = data_source
-            if current_page:
-                st.session_state.params['current_page'] = current_page
-
-        # --- Handle user messages and warnings ---
-        if num_row == 0:
-            st.session_state.user_message = {
-                "type": "warning",
-                "text": "No data found for the selected criteria."
-            }
-            st.session_state.stage = 'initial'
-            return
-            
-        elif int(num_row) > 50000:
-            st.session_state.user_message = {
-                "type": "error",
-                "text": f"Data is too large to export ({num_row:,} rows). Please narrow your selection to under 50,000 rows."
-            }
-            st.session_state.stage = 'blocked'  # Set to blocked state instead of initial
-            return
-        else:
-            # Data size is acceptable, proceed with loading preview
-            st.session_state.stage = 'loading_preview'
 
-    except OperationalError as e:
-        st.session_state.user_message = {
-            "type": "error",
-            "text": "❌ Database Connection Error. Please try again later."
-        }
+@trace_function_call
+def apply_prepare_job(job):
+    """Apply a finished prepare job to the session: row count, summary, preview and the next stage."""
+    st.session_state.job_id = None
+    st.session_state.query_duration = job.duration or 0
+    st.session_state.summary = job.summary
+
+    if job.status == 'cancelled':
+        st.session_state.user_message = {"type": "info", "text": "The query was cancelled."}
+        st.session_state.stage = 'initial'
+        return
+    if job.status != 'succeeded':
+        if job.error_kind == 'timeout':
+            text = f"⏱️ {job.error} Please narrow your selection (shorter date range or fewer storefronts)."
+        elif job.error_kind == 'connection':
+            text = "❌ Database Connection Error. Please try again later."
+        elif job.error_kind == 'query':
+            text = "❌ An error occurred with the data query. Please check your inputs."
+        else:
+            text = f"❌ An unexpected error occurred: {job.error}"
+        st.session_state.user_message = {"type": "error", "text": text}
         st.session_state.stage = 'initial'
-    except ProgrammingError as e:
+        return
+
+    result = job.to_result()
+    st.session_state.result = result
+    num_row = result.num_rows
+    # data_source and current_page stay in params for tab state management
+    st.session_state.params['num_row'] = num_row
+    st.session_state.params['num_row_exact'] = result.rows_exact
+
+    # --- Handle user messages and warnings ---
+    if num_row == 0:
         st.session_state.user_message = {
-            "type": "error", 
-            "text": "❌ An error occurred with the data query. Please check your inputs."
+            "type": "warning",
+            "text": "No data found for the selected criteria."
         }
         st.session_state.stage = 'initial'
-    except Exception as e:
+        return
+        
+    elif int(num_row) > MAX_EXPORT_ROWS:
         st.session_state.user_message = {
             "type": "error",
-            "text": f"❌ An unexpected error occurred: {str(e)}"
+            "text": f"Data is too large to export ({describe_row_count(num_row, result.rows_exact)} rows). Please narrow your selection to under {MAX_EXPORT_ROWS:,} rows."
         }
-        st.session_state.stage = 'initial'
+        st.session_state.stage = 'blocked'  # Set to blocked state instead of initial
+        EXPORT_BLOCKED.inc(data_source=job.data_source)
+        return
+    else:
+        try:
+            # Data size is acceptable, show the preview from the materialized result
+            with span("export.preview", parent=job.trace_parent, data_source=job.data_source) as preview_span:
+                df_preview = read_result_rows(result, 0, PREVIEW_ROW_LIMIT)
+                preview_span.set(rows=len(df_preview))
+            get_session_store().put_frame(PREVIEW_KEY, df_preview)
+            st.session_state.stage = 'loaded'
+        except Exception as e:
+            st.session_state.user_message = {
+                "type": "error",
+                "text": f"❌ An unexpected error occurred: {str(e)}"
+            }
+            st.session_state.stage = 'initial'
 
 
-def convert_df_to_csv(df: pd.DataFrame):
-    output = StringIO()
-    df.to_csv(output, index=False, encoding='utf-8-sig')
-    return output.getvalue()
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Materialized Query Results
+
+A query result is computed once per parameter set and written to a local Parquet file
+in the shared result cache. Row counting, preview paging and the final export all read
+that materialized copy instead of running the data query against the database again.
+Rows read back carry the column types of their data source (see utils/result_types.py).
+
+Every materialized file starts with a ROW_ID_COLUMN holding the position of each row. It is
+the stable sort key preview pages are read by: a page is the `limit` rows after the last
+row id of the previous page, found through the row id statistics of the row groups, so
+reading a page deep in the result does not read the rows before it.
+"""
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from utils.config import EXPORT_CHUNK_SIZE
+from utils.result_cache import get_result_cache
+from utils.result_types import apply_column_types
+
+ROW_ID_COLUMN = "__row_id"
+# Part of the cache key of materialized results, so files written without row ids are not read
+RESULT_LAYOUT = "row_ids"
+
+
+@dataclass
+class MaterializedResult:
+    """Handle to a query result materialized on local disk."""
+    data_source: str
+    key: str  # Result cache key
+    num_rows: int
+    path: Optional[str] = None  # None when the result was not written (empty or too large)
+    rows_exact: bool = True  # False when the result was refused by a probe: it has more than `num_rows` - 1 rows
+
+    @property
+    def is_available(self) -> bool:
+        return self.path is not None and Path(self.path).exists()
+
+
+def with_row_ids(chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+    """Prepend ROW_ID_COLUMN to each chunk, numbering the rows of all chunks consecutively from 0."""
+    next_row_id = 0
+    for chunk in chunks:
+        chunk = chunk.copy(deep=False)
+        chunk.insert(0, ROW_ID_COLUMN, np.arange(next_row_id, next_row_id + len(chunk), dtype="int64"))
+        next_row_id += len(chunk)
+        yield chunk
+
+
+def read_result_page(result: MaterializedResult, after_row_id: int = -1, limit: int = 500) -> pd.DataFrame:
+    """
+    Read the `limit` rows following row id `after_row_id` (-1 for the first page) from a
+    materialized result. Row groups entirely before the key are skipped using their statistics.
+    The page is indexed by row id, so the last index value is the key of the next page.
+    """
+    with get_result_cache().hold(result.key):
+        table = _read_page_table(result, after_row_id, limit)
+    df = table.to_pandas().set_index(ROW_ID_COLUMN).rename_axis(None)
+    return apply_column_types(result.data_source, df)
+
+
+def _read_page_table(result: MaterializedResult, after_row_id: int, limit: int):
+    parquet_file = pq.ParquetFile(result.path)
+    metadata = parquet_file.metadata
+    row_id_index = parquet_file.schema_arrow.get_field_index(ROW_ID_COLUMN)
+    group_indices = []
+    rows_selected = 0
+    for group_index in range(parquet_file.num_row_groups):
+        group = metadata.row_group(group_index)
+        statistics = group.column(row_id_index).statistics
+        if statistics is not None and statistics.has_min_max:
+            if statistics.max <= after_row_id:
+                continue
+            rows_selected += group.num_rows - max(after_row_id + 1 - statistics.min, 0)
+        group_indices.append(group_index)
+        # Without statistics the rows of a group are not counted, so the following groups are read too
+        if rows_selected >= limit:
+            break
+
+    if not group_indices:
+        table = parquet_file.schema_arrow.empty_table()
+    else:
+        # Read as one table so the dictionaries of the row groups unify into one set of categories
+        table = parquet_file.read_row_groups(group_indices)
+        table = table.filter(pc.greater(table[ROW_ID_COLUMN], after_row_id)).slice(0, limit)
+    return table
+
+
+def read_result_rows(result: MaterializedResult, offset: int = 0, limit: int = 500) -> pd.DataFrame:
+    """Read `limit` rows starting at `offset` from a materialized result; row ids are positions."""
+    return read_result_page(result, offset - 1, limit)
+
+
+def iter_result_chunks(result: MaterializedResult, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    """Stream a materialized result back as DataFrame chunks, without its row ids."""
+    # The file stays in the result cache until the last chunk is read
+    with get_result_cache().hold(result.key):
+        parquet_file = pq.ParquetFile(result.path)
+        columns = [name for name in parquet_file.schema_arrow.names if name != ROW_ID_COLUMN]
+        for batch in parquet_file.iter_batches(batch_size=chunk_size, columns=columns):
+            yield apply_column_types(result.data_source, batch.to_pandas())
+
@@ -0,0 +1,289 @@
+"""
+Service Metrics
+
+A small in-process metrics registry (counters, gauges and histograms with labels) that the
+query, export, cache and connection pool code paths update, and an HTTP endpoint serving it
+in the Prometheus text exposition format (`GET /metrics` on METRICS_HOST:METRICS_PORT).
+The endpoint is started once per process by `start_metrics_server`; a second Streamlit
+process on the same host finds the port taken and serves no metrics.
+
+Values that already exist elsewhere (cache counters, pool state, job queue) are read by
+collectors at scrape time instead of being mirrored on every update.
+"""
+
+import math
+import threading
+from abc import ABC, abstractmethod
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from utils.config import METRICS_HOST, METRICS_PORT
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# A collector returns samples as (metric name, metric type, help, [(labels, value), ...])
+Sample = Tuple[Dict[str, str], float]
+CollectedMetric = Tuple[str, str, str, List[Sample]]
+
+
+class _Metric(ABC):
+    type_name = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    @abstractmethod
+    def render(self) -> List[str]:
+        """The sample lines of the metric, without its HELP and TYPE header."""
+
+
+class Counter(_Metric):
+    """A monotonically increasing count."""
+    type_name = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [_sample_line(self.name, self.labelnames, key, value) for key, value in sorted(values.items())]
+
+
+class Gauge(_Metric):
+    """A value that goes up and down."""
+    type_name = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str):
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return [_sample_line(self.name, self.labelnames, key, value) for key, value in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, with their sum and count."""
+    type_name = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = ()):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above the last bucket], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        """Observe the duration of the block in seconds, also when it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        lines = []
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip((*self.buckets, math.inf), counts):
+                cumulative += count
+                lines.append(_sample_line(f"{self.name}_bucket", (*self.labelnames, "le"), (*key, _format_value(bound)), cumulative))
+            lines.append(_sample_line(f"{self.name}_sum", self.labelnames, key, total))
+            lines.append(_sample_line(f"{self.name}_count", self.labelnames, key, cumulative))
+        return lines
+
+
+class MetricsRegistry:
+    """The metrics and collectors of this process."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], List[CollectedMetric]]] = []
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric already registered: {metric.name}")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = ()) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], List[CollectedMetric]]):
+        """Add a function returning metrics computed at scrape time."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        lines = []
+        for metric in metrics:
+            lines += _header(metric.name, metric.type_name, metric.documentation)
+            lines += metric.render()
+        for collector in collectors:
+            try:
+                collected = collector()
+            except Exception:
+                # A failing collector (e.g. the database is unreachable) must not break the scrape
+                continue
+            for name, type_name, documentation, samples in collected:
+                lines += _header(name, type_name, documentation)
+                lines += [_sample_line(name, tuple(labels), tuple(labels.values()), value) for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+def _header(name: str, type_name: str, documentation: str) -> List[str]:
+    documentation = documentation.replace("\\", "\\\\").replace("\n", "\\n")
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} {type_name}"]
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _sample_line(name: str, labelnames: Sequence[str], labelvalues: Sequence[str], value: float) -> str:
+    if not labelnames:
+        return f"{name} {_format_value(value)}"
+    labels = ",".join(f'{label}="{_escape_label(str(val))}"' for label, val in zip(labelnames, labelvalues))
+    return f"{name}{{{labels}}} {_format_value(value)}"
+
+
+registry = MetricsRegistry()
+
+# --- Metrics of the export service ---
+EXPORT_REQUESTS = registry.counter(
+    "export_requests_total", "Export requests submitted by users", ("data_source", "stage"))
+EXPORT_BLOCKED = registry.counter(
+    "export_blocked_total", "Requests refused because the result exceeds MAX_EXPORT_ROWS", ("data_source",))
+EXPORT_JOBS = registry.counter(
+    "export_jobs_total", "Finished background jobs", ("data_source", "kind", "status"))
+EXPORT_ROWS = registry.counter(
+    "export_rows_total", "Rows written to export files served for download", ("data_source", "format"))
+EXPORT_BYTES = registry.counter(
+    "export_bytes_total", "Bytes of export files served for download", ("data_source", "format"))
+QUERY_DURATION = registry.histogram(
+    "export_query_duration_seconds", "Database query latency, until the first rows for streamed queries",
+    ("data_source", "query_type"), buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300))
+QUERY_ROWS = registry.counter(
+    "export_query_rows_total", "Rows fetched from the database", ("data_source", "query_type"))
+QUERY_ERRORS = registry.counter(
+    "export_query_errors_total", "Database queries that failed, timed out or were cancelled", ("data_source", "query_type"))
+
+
+@contextmanager
+def observe_query(data_source: str, query_type: str) -> Iterator[None]:
+    """Record the latency of the block in QUERY_DURATION, and count it in QUERY_ERRORS if it raises."""
+    try:
+        with QUERY_DURATION.time(data_source=data_source, query_type=query_type):
+            yield
+    except BaseException:
+        QUERY_ERRORS.inc(data_source=data_source, query_type=query_type)
+        raise
+
+
+# --- HTTP endpoint ---
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = registry.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the Streamlit log
+        pass
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+_server_started = False
+
+
+def start_metrics_server(host: str = METRICS_HOST, port: int = METRICS_PORT) -> Optional[ThreadingHTTPServer]:
+    """
+    Serve the registry on http://host:port/metrics from a daemon thread. Only the first call
+    in a process starts the server; it is not started if `port` is 0 or already taken.
+    """
+    global _server, _server_started
+    if _server_started:
+        return _server
+    with _server_lock:
+        if _server_started:
+            return _server
+        _server_started = True
+        if not port:
+            return None
+        try:
+            _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+        except OSError:
+            return None
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
@@ -0,0 +1,344 @@
+"""
+Partitioned Execution
+
+The data query of a request over many storefronts or a long date range is split into
+partitions, each covering a few storefronts and one date window, which run concurrently on
+their own pooled connections. A long range across many storefronts then takes about as long
+as its slowest partition instead of one query scanning everything.
+
+Whether a data source can be split, and along which dimensions, is declared in the
+"partitions" entry of DATA_SOURCE_CONFIGS:
+
+    "partitions": {
+        "storefronts": True,                   # no result row combines rows of several storefronts
+        "date_grain": "month",                 # result rows aggregate at most one month ("day" or "month")
+        "order_by": [["search_volume", "desc"]],  # the ORDER BY of the data query
+    }
+
+A dimension may only be split when every result row is computed from rows of a single
+partition, so the union of the partition results equals the result of the whole query: date
+windows follow the date grain of the query, and sources that aggregate over the whole range
+(averages, MAX over all months) are not split by date at all.
+
+Each partition streams its rows into a temporary Parquet file, so a partition never waits for
+another and memory stays at one chunk per running partition. The files are then read back in
+partition order, or, for sources with an "order_by", merged on the ORDER BY columns, giving one
+output in the order of the whole query. The total row count is the sum of the `COUNT(*) OVER ()`
+totals of the partitions, and the remaining partitions are stopped as soon as it exceeds the limit.
+"""
+
+import contextvars
+import heapq
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+
+from utils.config import EXPORT_CHUNK_SIZE, PARTITION_STOREFRONTS, PARTITION_WINDOW_DAYS, PARTITION_WORKERS
+from utils.exporters import write_export
+from utils.input_config import DATA_SOURCE_CONFIGS
+from utils.metrics import observe_query
+from utils.query_control import CancelToken, QueryCancelled, cancel_scope, get_cancel_token
+from utils.result_cache import get_result_cache
+from utils.result_types import apply_column_types
+from utils.spans import span
+
+# Longest time `PartitionedRun.wait` goes without reporting progress, in seconds
+_PROGRESS_INTERVAL = 0.5
+
+
+def get_partition_spec(data_source: str) -> Optional[Dict[str, Any]]:
+    return DATA_SOURCE_CONFIGS.get(data_source, {}).get("partitions")
+
+
+def plan_partitions(data_source: str, sql_params: Dict[str, Any], max_storefronts: int = PARTITION_STOREFRONTS,
+                    window_days: int = PARTITION_WINDOW_DAYS) -> List[Dict[str, Any]]:
+    """
+    The SQL parameters of each partition of a request, date windows first, then storefronts.
+    A single partition (the request itself) when the data source cannot be split or the
+    request is small enough to run as one query.
+    """
+    spec = get_partition_spec(data_source)
+    if not spec:
+        return [sql_params]
+
+    storefront_groups = [None]
+    storefront_ids = sql_params.get("storefront_ids") or []
+    if spec.get("storefronts") and len(storefront_ids) > max_storefronts:
+        storefront_groups = [storefront_ids[i:i + max_storefronts] for i in range(0, len(storefront_ids), max_storefronts)]
+
+    windows = [None]
+    if spec.get("date_grain") and sql_params.get("start_date") and sql_params.get("end_date"):
+        start, end = date.fromisoformat(sql_params["start_date"]), date.fromisoformat(sql_params["end_date"])
+        windows = _date_windows(start, end, spec["date_grain"], window_days)
+
+    partitions = []
+    for window in windows:
+        for storefronts in storefront_groups:
+            params = dict(sql_params)
+            if window is not None:
+                params["start_date"], params["end_date"] = window[0].isoformat(), window[1].isoformat()
+            if storefronts is not None:
+                params["storefront_ids"] = storefronts
+            partitions.append(params)
+    return partitions
+
+
+def _date_windows(start: date, end: date, grain: str, window_days: int) -> List[Tuple[date, date]]:
+    """Consecutive windows covering start..end, of about `window_days` days, cut at `grain` boundaries."""
+    if grain == "day":
+        step = max(window_days, 1)
+        return [(day, min(day + timedelta(days=step - 1), end))
+                for day in (start + timedelta(days=offset) for offset in range(0, (end - start).days + 1, step))]
+    if grain == "month":
+        # The queries group by MONTH() without the year, so a range reaching the same month of
+        # the next year puts both in one group: such ranges are not split by date
+        if (end.year - start.year) * 12 + end.month - start.month >= 12:
+            return [(start, end)]
+        months_per_window = max(round(window_days / 30), 1)
+        windows, window_start = [], start
+        while window_start <= end:
+            month_index = window_start.year * 12 + window_start.month - 1 + months_per_window
+            next_start = date(month_index // 12, month_index % 12 + 1, 1)
+            windows.append((window_start, min(next_start - timedelta(days=1), end)))
+            window_start = next_start
+        return windows
+    raise ValueError(f"Unknown partition date grain: {grain}")
+
+
+class PartitionedRun:
+    """
+    The partitions of one data query, running on the shared partition executor. Use as a
+    context manager: leaving it stops the partitions still running and deletes their files.
+    """
+
+    def __init__(self, data_source: str, partitions: List[Dict[str, Any]], max_rows: int):
+        self.data_source = data_source
+        self.partitions = partitions
+        self.max_rows = max_rows
+        self.order_by = (get_partition_spec(data_source) or {}).get("order_by")
+        self.exceeded = False
+        self.error: Optional[BaseException] = None  # The first error of a partition, which stopped the others
+
+        self._paths: List[Path] = [get_result_cache().new_temp_path() for _ in partitions]
+        self._totals: List[Optional[int]] = [None] * len(partitions)
+        self._rows: List[int] = [0] * len(partitions)
+        self._futures: List[Future] = []
+        self._condition = threading.Condition()
+        # Stops the partitions of this run only: on cancellation of the job, or once the limit is exceeded
+        self._token = CancelToken()
+        self._parent_token = get_cancel_token()
+
+    def __enter__(self) -> "PartitionedRun":
+        if self._parent_token is not None:
+            self._parent_token.add_listener(self._token.cancel)
+        executor = get_partition_executor()
+        for index, params in enumerate(self.partitions):
+            # Each partition continues the trace of the caller (see utils/spans.py)
+            context = contextvars.copy_context()
+            self._futures.append(executor.submit(context.run, self._run_partition, index, params))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._token.cancel()
+        if self._parent_token is not None:
+            self._parent_token.remove_listener(self._token.cancel)
+        for future in self._futures:
+            future.cancel()
+        for future in self._futures:
+            # Running partitions stop at their next chunk; their files can only be deleted once they have
+            try:
+                future.result()
+            except Exception:
+                pass
+        for path in self._paths:
+            path.unlink(missing_ok=True)
+
+    @property
+    def total_rows(self) -> int:
+        """Sum of the totals reported so far; the total of the result once every partition reported."""
+        with self._condition:
+            return sum(total for total in self._totals if total is not None)
+
+    @property
+    def total_exact(self) -> bool:
+        with self._condition:
+            return all(total is not None for total in self._totals)
+
+    def wait(self, progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Wait until every partition finished or the total exceeds `max_rows` (`exceeded` is then
+        set), and return the total. `progress_callback` receives (rows fetched, total so far).
+        The error of a failed partition, or QueryCancelled when the job was cancelled, is raised.
+        """
+        while True:
+            with self._condition:
+                done = self.exceeded or self.error is not None or all(future.done() for future in self._futures)
+                if not done:
+                    self._condition.wait(_PROGRESS_INTERVAL)
+                rows, total = sum(self._rows), sum(total for total in self._totals if total is not None)
+            if progress_callback:
+                progress_callback(rows, total)
+            if done:
+                break
+
+        if self._parent_token is not None:
+            self._parent_token.raise_if_cancelled()
+        if self.error is not None and not self.exceeded:
+            raise self.error
+        return self.total_rows
+
+    def chunks(self) -> Iterator[pd.DataFrame]:
+        """The rows of all partitions in the order of the whole query, in chunks of the data source's types."""
+        present = [index for index in range(len(self.partitions)) if self._rows[index]]
+        if self.order_by and len(present) > 1:
+            yield from self._merged_chunks(present)
+            return
+        for index in present:
+            parquet_file = pq.ParquetFile(self._paths[index])
+            for batch in parquet_file.iter_batches(batch_size=EXPORT_CHUNK_SIZE):
+                yield apply_column_types(self.data_source, batch.to_pandas())
+
+    def _run_partition(self, index: int, params: Dict[str, Any]):
+        from utils.logic import TOTAL_ROWS_COLUMN, stream_data
+
+        if self._token.cancelled:
+            return
+        try:
+            with span("db.partition", data_source=self.data_source, partition=index) as partition_span, \
+                    cancel_scope(self._token), observe_query(self.data_source, 'partition'):
+                chunks = stream_data(self.data_source, with_total=True, **params)
+
+                def _counted_chunks():
+                    for chunk in chunks:
+                        if self._totals[index] is None and not chunk.empty:
+                            self._report_total(index, int(chunk[TOTAL_ROWS_COLUMN].iloc[0]))
+                        yield chunk.drop(columns=[TOTAL_ROWS_COLUMN])
+
+                try:
+                    rows = write_export(_counted_chunks(), self._paths[index], "parquet",
+                                        lambda rows: self._report_rows(index, rows))
+                finally:
+                    chunks.close()
+                if self._totals[index] is None:
+                    self._report_total(index, rows)
+                partition_span.set(rows=rows)
+        except QueryCancelled:
+            # Stopped by the run: the limit was exceeded, another partition failed or the job was cancelled
+            if not self._token.cancelled:
+                raise
+        except Exception as e:
+            with self._condition:
+                if self.error is None:
+                    self.error = e
+            # The result is incomplete without this partition: stop the others
+            self._token.cancel()
+            raise
+        finally:
+            with self._condition:
+                self._condition.notify_all()
+
+    def _report_rows(self, index: int, rows: int):
+        with self._condition:
+            self._rows[index] = rows
+
+    def _report_total(self, index: int, total: int):
+        with self._condition:
+            self._totals[index] = total
+            exceeded = sum(total for total in self._totals if total is not None) > self.max_rows
+            if exceeded:
+                self.exceeded = True
+            self._condition.notify_all()
+        if exceeded:
+            self._token.cancel()
+
+    def _merged_chunks(self, present: List[int]) -> Iterator[pd.DataFrame]:
+        """
+        Merge the sorted partition files on the ORDER BY columns. Only the sort keys are merged row
+        by row; the rows themselves are read sequentially from every file, a chunk at a time, and
+        each output chunk takes the next rows of each file, interleaved as the merge decided.
+        """
+        columns = [column for column, _ in self.order_by]
+        descending = [direction.lower() == "desc" for _, direction in self.order_by]
+
+        def _keys(index: int) -> Iterator[Tuple[tuple, int]]:
+            table = pq.read_table(self._paths[index], columns=columns)
+            values = [table.column(column).to_pylist() for column in columns]
+            for row in zip(*values):
+                yield tuple(_sort_key(value, desc) for value, desc in zip(row, descending)), index
+
+        # Equal keys keep the partition order, and rows of one partition keep their order
+        source_of_row = np.fromiter((index for _, index in heapq.merge(*[_keys(index) for index in present])),
+                                    dtype=np.int32, count=sum(self._rows[index] for index in present))
+        readers = {index: _SpoolReader(self._paths[index]) for index in present}
+        for start in range(0, len(source_of_row), EXPORT_CHUNK_SIZE):
+            sources = source_of_row[start:start + EXPORT_CHUNK_SIZE]
+            counts = np.bincount(sources, minlength=max(present) + 1)
+            pieces = [readers[index].take(int(counts[index])) for index in present if counts[index]]
+            # Rows of the pieces, in partition order, are placed where the merge put them
+            grouped_order = np.argsort(sources, kind="stable")
+            positions = np.empty(len(sources), dtype=np.int64)
+            positions[grouped_order] = np.arange(len(sources))
+            chunk = pd.concat(pieces, ignore_index=True).iloc[positions].reset_index(drop=True)
+            yield apply_column_types(self.data_source, chunk)
+
+
+def _sort_key(value: Any, descending: bool) -> tuple:
+    """Sort key of one ORDER BY value, placing NULLs first in ascending order and last in descending order, as SQL does."""
+    if not descending:
+        return (value is not None, value)
+    if isinstance(value, (int, float)):
+        return (value is None, -value if value is not None else 0)
+    return (value is None, _Descending(value) if value is not None else None)
+
+
+class _Descending:
+    """Reverses the comparison of a value that cannot be negated, e.g. a string or a date."""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __eq__(self, other: "_Descending") -> bool:
+        return self.value == other.value
+
+    def __lt__(self, other: "_Descending") -> bool:
+        return other.value < self.value
+
+
+class _SpoolReader:
+    """Reads a partition file sequentially, any number of rows at a time."""
+
+    def __init__(self, path: Path):
+        self._batches = pq.ParquetFile(path).iter_batches(batch_size=EXPORT_CHUNK_SIZE)
+        self._buffer: List[pd.DataFrame] = []
+        self._buffered = 0
+
+    def take(self, rows: int) -> pd.DataFrame:
+        while self._buffered < rows:
+            batch = next(self._batches).to_pandas()
+            self._buffer.append(batch)
+            self._buffered += len(batch)
+        buffered = pd.concat(self._buffer, ignore_index=True) if len(self._buffer) > 1 else self._buffer[0]
+        taken, rest = buffered.iloc[:rows], buffered.iloc[rows:]
+        self._buffer, self._buffered = [rest], len(rest)
+        return taken
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_partition_executor() -> ThreadPoolExecutor:
+    """Return the process-wide pool the partitions of every request run on, creating it on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=PARTITION_WORKERS, thread_name_prefix="partition")
+    return _executor
@@ -0,0 +1,83 @@
+"""
+Preview Pages
+
+Pages of materialized results for the preview browser, read by row id keyset (see
+`read_result_page`) and held in one small LRU shared by all sessions. While a user reads a
+page, the page after it is read in the background, so paging forward does not wait on disk.
+Pages are never kept in the session: a session only remembers where it is in its result.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from utils.config import PREVIEW_PAGE_CACHE_PAGES
+from utils.materialize import MaterializedResult, read_result_page
+
+# (result cache key, row id the page follows, page size)
+PageKey = Tuple[str, int, int]
+
+
+class PreviewPageCache:
+    """Recently read and prefetched pages of materialized results, least recently used evicted first."""
+
+    def __init__(self, max_pages: int = PREVIEW_PAGE_CACHE_PAGES):
+        self.max_pages = max_pages
+        self._pages: "OrderedDict[PageKey, pd.DataFrame]" = OrderedDict()
+        self._pending: Dict[PageKey, Future] = {}
+        self._lock = threading.Lock()
+        # One reader is enough: prefetches are small and a page read waits for its own prefetch
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview-prefetch")
+
+    def get_page(self, result: MaterializedResult, after_row_id: int, limit: int) -> pd.DataFrame:
+        """The page of `limit` rows after `after_row_id`, waiting for its prefetch if one is running."""
+        key = (result.key, after_row_id, limit)
+        with self._lock:
+            page = self._pages.get(key)
+            if page is not None:
+                self._pages.move_to_end(key)
+                return page
+            pending = self._pending.get(key)
+        if pending is not None:
+            return pending.result()
+        return self._read(key, result)
+
+    def prefetch(self, result: MaterializedResult, after_row_id: int, limit: int):
+        """Read the page of `limit` rows after `after_row_id` in the background, unless it is cached already."""
+        key = (result.key, after_row_id, limit)
+        with self._lock:
+            if key in self._pages or key in self._pending:
+                return
+            self._pending[key] = self._executor.submit(self._read, key, result)
+
+    def _read(self, key: PageKey, result: MaterializedResult) -> pd.DataFrame:
+        try:
+            page = read_result_page(result, key[1], key[2])
+        except Exception:
+            with self._lock:
+                self._pending.pop(key, None)
+            raise
+        with self._lock:
+            self._pages[key] = page
+            self._pages.move_to_end(key)
+            self._pending.pop(key, None)
+            while len(self._pages) > self.max_pages:
+                self._pages.popitem(last=False)
+        return page
+
+
+_cache: Optional[PreviewPageCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_preview_pages() -> PreviewPageCache:
+    """Return the process-wide preview page cache, creating it on first use."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PreviewPageCache()
+    return _cache
@@ -0,0 +1,296 @@
+"""
+Query Control
+
+Query timeouts and cancellation for queries running on the database.
+
+Every data query runs inside `controlled_query`, which enforces the timeout budget of its
+data source twice:
+
+- On the server: before the query, the session's limit is set to the budget plus
+  SERVER_TIMEOUT_GRACE_SECONDS, `max_execution_time` on MySQL and a resource pool with that
+  QUERY_TIMEOUT on SingleStore (`python -m utils.query_control` prints the statements creating
+  them). This bounds the query even if this process dies while it runs.
+- In this process: the query is registered with a watchdog thread. When it outlives its
+  budget, or the job it belongs to is cancelled, the watchdog stops it with
+  `KILL QUERY <connection id>` from a separate connection on SingleStore/MySQL, or an
+  interrupt on SQLite. The waiting caller then gets a QueryTimeout or QueryCancelled error
+  instead of the driver's error. The server limit is the backstop; the watchdog normally
+  stops the query first.
+
+The server's connection id and the session's current limit are cached per DBAPI connection
+in the pool's `info` dict, which the pool clears when it replaces the connection, so neither
+costs a round trip per query.
+
+Cancellation is requested through a CancelToken. Background jobs install their token with
+`cancel_scope`, so every query issued while the job runs can be cancelled through it.
+"""
+
+import contextvars
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterator, List, Optional
+
+from sqlalchemy.engine import Connection
+
+from utils.config import DEFAULT_QUERY_TIMEOUT_SECONDS, QUERY_TIMEOUT_RESOURCE_POOL_PREFIX, SERVER_TIMEOUT_GRACE_SECONDS
+from utils.input_config import DATA_SOURCE_CONFIGS
+
+# Dialects whose queries are stopped with `KILL QUERY <connection id>`
+_KILL_QUERY_DIALECTS = ("mysql", "singlestoredb")
+
+# SingleStore's built-in pool, used by sessions without a limit
+_DEFAULT_RESOURCE_POOL = "default_pool"
+
+# Keys of the server's connection id and of the session's limit in the pool's per-connection info dict
+_CONNECTION_ID_KEY = "query_control.connection_id"
+_SERVER_LIMIT_KEY = "query_control.server_limit"
+
+_logger = logging.getLogger(__name__)
+
+# Longest time the watchdog sleeps between deadline checks, in seconds
+_WATCHDOG_INTERVAL = 0.5
+
+
+class QueryCancelled(Exception):
+    """The query was stopped because its job was cancelled."""
+
+
+class QueryTimeout(Exception):
+    """The query was stopped because it exceeded the timeout of its data source."""
+
+
+class CancelToken:
+    """A cancellation flag that also notifies the queries currently running under it."""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        with self._lock:
+            self._event.set()
+            listeners = list(self._listeners)
+        for listener in listeners:
+            listener()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise QueryCancelled("The query was cancelled.")
+
+    def add_listener(self, listener: Callable[[], None]):
+        with self._lock:
+            self._listeners.append(listener)
+            already_cancelled = self._event.is_set()
+        if already_cancelled:
+            listener()
+
+    def remove_listener(self, listener: Callable[[], None]):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+
+_current_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar("cancel_token", default=None)
+
+
+@contextmanager
+def cancel_scope(token: CancelToken):
+    """Make `token` the cancel token of every query run inside this block."""
+    reset = _current_token.set(token)
+    try:
+        yield token
+    finally:
+        _current_token.reset(reset)
+
+
+def get_cancel_token() -> Optional[CancelToken]:
+    """The cancel token of the current scope, if any."""
+    return _current_token.get()
+
+
+def get_query_timeout(data_source: str) -> Optional[float]:
+    """The query timeout of a data source in seconds, or None if its queries may run indefinitely."""
+    timeout = DATA_SOURCE_CONFIGS.get(data_source, {}).get("timeout_seconds", DEFAULT_QUERY_TIMEOUT_SECONDS)
+    return timeout if timeout and timeout > 0 else None
+
+
+class _QueryGuard:
+    """A running query that can be stopped on the server, at most once."""
+
+    def __init__(self, kill: Optional[Callable[[], None]], deadline: Optional[float]):
+        self._kill = kill
+        self.deadline = deadline
+        self.reason: Optional[str] = None  # "timeout", "cancelled" or "abandoned" once stopped
+        self._done = False
+        # Held while killing, so the connection is not returned to the pool (and reused) mid-kill
+        self._lock = threading.Lock()
+
+    def stop(self, reason: str):
+        with self._lock:
+            if self._done or self.reason is not None:
+                return
+            self.reason = reason
+            if self._kill is not None:
+                try:
+                    self._kill()
+                except Exception:
+                    # The query may have finished in the meantime; there is nothing left to stop
+                    pass
+
+    def finish(self):
+        with self._lock:
+            self._done = True
+
+
+class _Watchdog:
+    """A daemon thread that stops queries whose deadline has passed."""
+
+    def __init__(self):
+        self._guards: List[_QueryGuard] = []
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, guard: _QueryGuard):
+        with self._condition:
+            self._guards.append(guard)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="query-watchdog", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+
+    def unregister(self, guard: _QueryGuard):
+        with self._condition:
+            if guard in self._guards:
+                self._guards.remove(guard)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                now = time.monotonic()
+                expired = [guard for guard in self._guards if guard.deadline <= now]
+                for guard in expired:
+                    self._guards.remove(guard)
+                next_deadline = min((guard.deadline for guard in self._guards), default=now + _WATCHDOG_INTERVAL)
+                if not expired:
+                    self._condition.wait(max(min(next_deadline - now, _WATCHDOG_INTERVAL), 0.01))
+            for guard in expired:
+                guard.stop("timeout")
+
+
+_watchdog = _Watchdog()
+
+
+def _make_killer(connection: Connection) -> Optional[Callable[[], None]]:
+    """Return a function that stops the statement running on `connection` from another thread."""
+    dialect = connection.dialect.name
+    if dialect in _KILL_QUERY_DIALECTS:
+        connection_id = _connection_id(connection)
+        engine = connection.engine
+
+        def _kill():
+            # KILL QUERY stops the statement but keeps the session, so the connection stays usable
+            with engine.connect() as admin:
+                admin.exec_driver_sql(f"KILL QUERY {connection_id}")
+        return _kill
+
+    if dialect == "sqlite":
+        dbapi_connection = connection.connection.dbapi_connection
+        return dbapi_connection.interrupt
+
+    return None
+
+
+def _connection_id(connection: Connection) -> int:
+    """The server's id of the DBAPI connection behind `connection`, queried on its first use only."""
+    info = connection.info
+    if _CONNECTION_ID_KEY not in info:
+        info[_CONNECTION_ID_KEY] = int(connection.exec_driver_sql("SELECT CONNECTION_ID()").scalar())
+    return info[_CONNECTION_ID_KEY]
+
+
+def server_limit(timeout: Optional[float]) -> int:
+    """The server-side limit in whole seconds for a query timeout, 0 for none."""
+    return int(math.ceil(timeout)) + SERVER_TIMEOUT_GRACE_SECONDS if timeout else 0
+
+
+def resource_pool_statements() -> List[str]:
+    """The SingleStore statements creating the resource pool of every configured timeout, for the DBA."""
+    limits = {server_limit(get_query_timeout(data_source)) for data_source in DATA_SOURCE_CONFIGS}
+    return [
+        f"CREATE RESOURCE POOL IF NOT EXISTS {QUERY_TIMEOUT_RESOURCE_POOL_PREFIX}{limit}s WITH QUERY_TIMEOUT = {limit}"
+        for limit in sorted(limits - {0})
+    ]
+
+
+def _apply_server_limit(connection: Connection, timeout: Optional[float]):
+    """Set the server-side limit of the session of `connection` for a query with `timeout`, unless it is set already."""
+    dialect = connection.dialect.name
+    if dialect not in _KILL_QUERY_DIALECTS:
+        return
+    limit = server_limit(timeout)
+    info = connection.info
+    if info.get(_SERVER_LIMIT_KEY) == limit:
+        return
+    if dialect == "mysql":
+        connection.exec_driver_sql(f"SET SESSION max_execution_time = {limit * 1000}")
+    elif QUERY_TIMEOUT_RESOURCE_POOL_PREFIX:
+        pool = f"{QUERY_TIMEOUT_RESOURCE_POOL_PREFIX}{limit}s" if limit else _DEFAULT_RESOURCE_POOL
+        try:
+            connection.exec_driver_sql(f"SET resource_pool = {pool}")
+        except Exception as e:
+            # The pool was not created: the watchdog alone enforces the timeout on this connection
+            _logger.warning("Could not use resource pool %s, the query timeout is enforced client-side only: %s", pool, e)
+    info[_SERVER_LIMIT_KEY] = limit
+
+
+@contextmanager
+def controlled_query(connection: Connection, data_source: str) -> Iterator[_QueryGuard]:
+    """
+    Run the statements issued on `connection` inside this block under the timeout of `data_source`
+    and the current cancel token. Leaving the block early (e.g. closing a streaming generator)
+    stops the statement on the server instead of draining its remaining rows.
+    """
+    token = get_cancel_token()
+    if token is not None:
+        token.raise_if_cancelled()
+
+    timeout = get_query_timeout(data_source)
+    _apply_server_limit(connection, timeout)
+    guard = _QueryGuard(_make_killer(connection), time.monotonic() + timeout if timeout else None)
+    if guard.deadline is not None:
+        _watchdog.register(guard)
+
+    def _on_cancel():
+        guard.stop("cancelled")
+
+    if token is not None:
+        token.add_listener(_on_cancel)
+    try:
+        yield guard
+    except GeneratorExit:
+        guard.stop("abandoned")
+        raise
+    except Exception as e:
+        if guard.reason == "timeout":
+            raise QueryTimeout(f"The query exceeded the {timeout:g} s time limit of this report.") from e
+        if guard.reason == "cancelled":
+            raise QueryCancelled("The query was cancelled.") from e
+        raise
+    finally:
+        if token is not None:
+            token.remove_listener(_on_cancel)
+        _watchdog.unregister(guard)
+        guard.finish()
+
+
+if __name__ == "__main__":
+    for statement in resource_pool_statements():
+        print(f"{statement};")
@@ -0,0 +1,205 @@
+"""
+Slow Query Profiler
+
+An opt-in profiling mode (QUERY_PROFILING) for data queries. A query that runs longer than
+the "slow_query_seconds" threshold of its data source gets its execution plan captured
+after it finishes: `EXPLAIN` output, and with QUERY_PROFILING=profile also the SingleStore
+`PROFILE` statistics of a second, profiled execution. Records are kept with the SQL, the
+bound parameters and the duration in a bounded in-process log that the debug panel shows.
+
+Plans are captured on one background thread, so the job that ran the slow query does not
+wait for them (PROFILE runs the query a second time). At most PLAN_CAPTURE_BACKLOG captures
+wait at once; slow queries beyond that are recorded without a plan. Profiling never fails
+the query it observes; capture errors are stored in the record.
+
+A query is recorded however its block ends, with the outcome: a query that timed out or
+failed is the one most worth a plan. For a streamed query the block also spans the time the
+consumer spends on each chunk, so its duration is measured up to the first fetched rows
+(`QueryTiming.mark_first_rows`) and the end-to-end time is kept separately.
+"""
+
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional
+
+from sqlalchemy.engine import Connection, Engine
+
+from utils.config import PLAN_CAPTURE_BACKLOG, QUERY_PROFILING, SLOW_QUERY_LOG_SIZE, SLOW_QUERY_SECONDS
+from utils.input_config import DATA_SOURCE_CONFIGS
+from utils.query_control import QueryCancelled, QueryTimeout, controlled_query
+from utils.sql_binding import bind_text
+
+# Dialects with SingleStore/MySQL style EXPLAIN and PROFILE statements
+MYSQL_DIALECTS = ("mysql", "singlestoredb")
+
+# How the profiled block ended
+OK = "ok"
+CLOSED = "closed"  # A streaming consumer stopped reading early
+TIMEOUT = "timeout"
+CANCELLED = "cancelled"
+ERROR = "error"
+
+
+@dataclass
+class SlowQueryRecord:
+    """A query that exceeded its slow-query threshold, with its captured plan."""
+    data_source: str
+    query_type: str
+    sql: str
+    params: Dict[str, Any]
+    duration: float  # Until the query finished, or for a streamed query until its first rows arrived
+    threshold: float
+    outcome: str = OK
+    end_to_end: Optional[float] = None  # Streamed queries: including the time the consumer spent on the chunks
+    captured_at: float = field(default_factory=time.time)
+    explain: Optional[str] = None
+    profile: Optional[str] = None
+    error: Optional[str] = None  # Why the plan could not be captured
+    capturing: bool = False  # True until the background capture of the plan has finished
+
+
+_records: "deque[SlowQueryRecord]" = deque(maxlen=SLOW_QUERY_LOG_SIZE)
+_records_lock = threading.Lock()
+
+# Captures running or waiting on the executor
+_capture_slots = threading.BoundedSemaphore(PLAN_CAPTURE_BACKLOG)
+_capture_executor: Optional[ThreadPoolExecutor] = None
+_capture_executor_lock = threading.Lock()
+
+
+def get_slow_query_threshold(data_source: str) -> float:
+    """Duration in seconds above which a query of `data_source` is profiled."""
+    return DATA_SOURCE_CONFIGS.get(data_source, {}).get("slow_query_seconds", SLOW_QUERY_SECONDS)
+
+
+def get_slow_queries() -> List[SlowQueryRecord]:
+    """Captured slow queries, newest first."""
+    with _records_lock:
+        return list(reversed(_records))
+
+
+def clear_slow_queries():
+    with _records_lock:
+        _records.clear()
+
+
+class QueryTiming:
+    """Clock of a profiled query. A streaming caller marks when the first rows arrived."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.first_rows: Optional[float] = None
+
+    def mark_first_rows(self):
+        if self.first_rows is None:
+            self.first_rows = time.perf_counter()
+
+
+@contextmanager
+def profile_query(connection: Connection, data_source: str, query_type: str, query, params: Dict[str, Any]) -> Iterator[QueryTiming]:
+    """
+    Time the block that runs `query` on `connection`. If profiling is enabled and the query took
+    longer than the data source's threshold, capture the plan of `query` in the background on a
+    separate connection, whether the block returned or raised.
+    """
+    timing = QueryTiming()
+    if not QUERY_PROFILING:
+        yield timing
+        return
+
+    outcome = OK
+    try:
+        yield timing
+    except QueryTimeout:
+        outcome = TIMEOUT
+        raise
+    except QueryCancelled:
+        outcome = CANCELLED
+        raise
+    except GeneratorExit:
+        outcome = CLOSED
+        raise
+    except BaseException:
+        outcome = ERROR
+        raise
+    finally:
+        _record_if_slow(connection, data_source, query_type, query, params, timing, outcome)
+
+
+def _record_if_slow(connection: Connection, data_source: str, query_type: str, query, params: Dict[str, Any],
+                    timing: QueryTiming, outcome: str):
+    end = time.perf_counter()
+    duration = (timing.first_rows or end) - timing.start
+    threshold = get_slow_query_threshold(data_source)
+    if duration < threshold:
+        return
+
+    record = SlowQueryRecord(
+        data_source=data_source,
+        query_type=query_type,
+        sql=query.text,
+        params=dict(params),
+        duration=duration,
+        threshold=threshold,
+        outcome=outcome,
+        end_to_end=end - timing.start if timing.first_rows is not None else None,
+    )
+    if _capture_slots.acquire(blocking=False):
+        record.capturing = True
+        try:
+            _get_capture_executor().submit(_capture_in_background, connection.engine, record, query, params)
+        except RuntimeError as e:
+            # The executor is shut down at interpreter exit
+            _capture_slots.release()
+            record.capturing, record.error = False, str(e)
+    else:
+        record.error = f"{PLAN_CAPTURE_BACKLOG} plan captures were already waiting."
+    with _records_lock:
+        _records.append(record)
+
+
+def _get_capture_executor() -> ThreadPoolExecutor:
+    global _capture_executor
+    if _capture_executor is None:
+        with _capture_executor_lock:
+            if _capture_executor is None:
+                # One thread: captures of concurrent slow queries must not add to the load that slowed them
+                _capture_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="plan-capture")
+    return _capture_executor
+
+
+def _capture_in_background(engine: Engine, record: SlowQueryRecord, query, params: Dict[str, Any]):
+    try:
+        _capture_plan(engine, record, query, params)
+    except Exception as e:
+        record.error = str(e)
+    finally:
+        record.capturing = False
+        _capture_slots.release()
+
+
+def _capture_plan(engine: Engine, record: SlowQueryRecord, query, params: Dict[str, Any]):
+    dialect = engine.dialect.name
+    # A separate connection: the original may still hold an open streaming cursor
+    with engine.connect() as admin:
+        if dialect in MYSQL_DIALECTS:
+            record.explain = _rows_to_text(admin.execute(*bind_text(f"EXPLAIN {query.text}", params)).fetchall())
+            if QUERY_PROFILING == "profile" and record.outcome in (OK, CLOSED):
+                # PROFILE runs the query again, under the same timeout as the original, so only
+                # after a run that got its rows. No user waits for it: it runs outside their job
+                with controlled_query(admin, record.data_source):
+                    admin.execute(*bind_text(f"PROFILE {query.text}", params)).fetchall()
+                    record.profile = _rows_to_text(admin.exec_driver_sql("SHOW PROFILE").fetchall())
+        elif dialect == "sqlite":
+            rows = admin.execute(*bind_text(f"EXPLAIN QUERY PLAN {query.text}", params)).fetchall()
+            record.explain = "\n".join(str(row[-1]) for row in rows)
+        else:
+            record.error = f"Plan capture is not supported for the {dialect} dialect."
+
+
+def _rows_to_text(rows) -> str:
+    return "\n".join(" | ".join("" if value is None else str(value) for value in row) for row in rows)
@@ -0,0 +1,130 @@
+"""
+Query Registry
+
+One registry for every SQL file in data_logic/sql/. A file is read the first time one of its
+queries is needed and compiled once into a SQLAlchemy `TextClause`, together with the names
+of its bind parameters and a hash of its content. Statements derived from it (e.g. wrapped
+with a total-row window or a LIMIT) are compiled once per variant as well.
+
+Before a query is served the file's modification time is checked; an edited file is read
+and compiled again, so SQL changes take effect without restarting the app. The content hash
+is part of every result cache key, so cached results of the old SQL are never served.
+
+Data sources name their SQL files in the "queries" entry of DATA_SOURCE_CONFIGS.
+"""
+
+import hashlib
+import re
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.sql.elements import TextClause
+
+from utils.config import PROJECT_ROOT
+from utils.input_config import DATA_SOURCE_CONFIGS
+
+SQL_DIR = PROJECT_ROOT / "data_logic" / "sql"
+
+# Bind parameters as SQLAlchemy's text() recognizes them: `:name`, but not `::cast` or `\:escaped`
+_BIND_PARAM_RE = re.compile(r"(?<![:\w\\]):(\w+)(?!:)")
+
+
+@dataclass
+class CompiledQuery:
+    """A SQL file compiled into a statement, with its bind parameters and content hash."""
+    name: str  # File name without the .sql suffix
+    path: Path
+    sql: str
+    statement: TextClause
+    bind_names: Tuple[str, ...]  # In order of first appearance
+    content_hash: str  # sha256 of the SQL text
+    mtime_ns: int
+    _variants: Dict[Hashable, TextClause] = field(default_factory=dict, repr=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def references(self, param_name: str) -> bool:
+        return param_name in self.bind_names
+
+    def variant(self, key: Hashable, build: Callable[[str], TextClause]) -> TextClause:
+        """
+        The statement `build(sql)` returns, compiled once per `key`. Variants belong to this
+        version of the file and are dropped with it when the file changes.
+        """
+        statement = self._variants.get(key)
+        if statement is None:
+            with self._lock:
+                statement = self._variants.get(key)
+                if statement is None:
+                    statement = self._variants[key] = build(self.sql)
+        return statement
+
+
+class QueryRegistry:
+    """Lazily loads, compiles and hot-reloads the SQL files of a directory."""
+
+    def __init__(self, directory: Path = SQL_DIR):
+        self.directory = Path(directory)
+        self._queries: Dict[str, CompiledQuery] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CompiledQuery:
+        """The compiled query of `<name>.sql`, read again if the file changed since it was last compiled."""
+        path = self.directory / f"{name}.sql"
+        try:
+            mtime_ns = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Query file not found: {path.resolve()}") from None
+
+        query = self._queries.get(name)
+        if query is not None and query.mtime_ns == mtime_ns:
+            return query
+        with self._lock:
+            query = self._queries.get(name)
+            if query is None or query.mtime_ns != mtime_ns:
+                query = self._queries[name] = _compile(name, path, mtime_ns)
+        return query
+
+    def names(self) -> List[str]:
+        """Names of all SQL files in the directory."""
+        return sorted(path.stem for path in self.directory.glob("*.sql"))
+
+
+def _compile(name: str, path: Path, mtime_ns: int) -> CompiledQuery:
+    sql = path.read_text(encoding="utf-8")
+    return CompiledQuery(
+        name=name,
+        path=path,
+        sql=sql,
+        statement=text(sql),
+        bind_names=tuple(dict.fromkeys(_BIND_PARAM_RE.findall(sql))),
+        content_hash=hashlib.sha256(sql.encode("utf-8")).hexdigest(),
+        mtime_ns=mtime_ns,
+    )
+
+
+_registry: Optional[QueryRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_query_registry() -> QueryRegistry:
+    """Return the process-wide query registry, creating it on first use."""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = QueryRegistry()
+    return _registry
+
+
+def get_query(data_source: str, query_type: str) -> CompiledQuery:
+    """The compiled `query_type` query ("data", "keys", ...) of a data source."""
+    config = DATA_SOURCE_CONFIGS.get(data_source)
+    if not config or "queries" not in config:
+        raise ValueError(f"Unknown or misconfigured data source: {data_source}")
+    name = config["queries"].get(query_type)
+    if name is None:
+        raise ValueError(f"Data source '{data_source}' has no '{query_type}' query")
+    return get_query_registry().get(name)
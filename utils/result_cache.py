@@ -0,0 +1,281 @@
+"""
+Result Cache
+
+A bounded on-disk cache of query results shared by every session of the process.
+Entries are zstd-compressed Parquet files keyed on the data source, the query parameters
+and a hash of the SQL text. When the cache grows past its byte budget, entries are evicted
+in LRU or LFU order; entries older than the TTL are treated as misses. An entry whose file is
+being read (see `ResultCache.hold`, e.g. a materialized result being exported) is neither
+evicted nor expired until the reader is done.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+import pandas as pd
+
+from utils.config import (
+    PARTIAL_CACHE_DIR,
+    PARTIAL_CACHE_MAX_BYTES,
+    PARTIAL_CACHE_TTL_SECONDS,
+    RESULT_CACHE_DIR,
+    RESULT_CACHE_MAX_BYTES,
+    RESULT_CACHE_POLICY,
+    RESULT_CACHE_TTL_SECONDS,
+)
+from utils.exporters import write_export
+from utils.metrics import registry
+
+
+def make_cache_key(request_key: str, sql_hash: str, **variant: Any) -> str:
+    """
+    Build a cache key from a canonical request key, the content hash of the SQL (see
+    utils/query_registry.py) and any query variant options. Editing the SQL changes the key.
+    """
+    payload = json.dumps(
+        {
+            "request": request_key,
+            "sql": sql_hash,
+            "variant": variant,
+        },
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+@dataclass
+class _CacheEntry:
+    path: Path
+    size: int
+    created: float
+    last_access: float
+    hits: int = 0
+
+
+class ResultCache:
+    """Size-bounded Parquet result cache with LRU/LFU eviction and hit/miss counters."""
+
+    def __init__(self, directory: Path, max_bytes: int, ttl_seconds: Optional[int] = None, policy: str = "lru"):
+        if policy not in ("lru", "lfu"):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.policy = policy
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._holds: Counter = Counter()  # Readers of each entry's file
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "bytes_written": 0}
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._load_index()
+
+    # --- Public API ---
+    def get_path(self, key: str) -> Optional[Path]:
+        """Return the file of a cached entry and record the access, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                # Another process sharing the directory may have written it
+                entry = self._adopt(key)
+            if entry is not None and self._is_expired(entry):
+                if not self._holds[key]:
+                    self._remove(key)
+                    self._counters["expirations"] += 1
+                entry = None
+            if entry is None or not entry.path.exists():
+                if entry is not None:
+                    self._remove(key)
+                self._counters["misses"] += 1
+                return None
+
+            entry.hits += 1
+            entry.last_access = time.time()
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            try:
+                os.utime(entry.path, (entry.last_access, entry.path.stat().st_mtime))
+            except OSError:
+                pass
+            return entry.path
+
+    def get_frame(self, key: str) -> Optional[pd.DataFrame]:
+        """Return a cached DataFrame, or None on a miss."""
+        path = self.get_path(key)
+        if path is None:
+            return None
+        try:
+            return pd.read_parquet(path)
+        except (OSError, ValueError):
+            # The file was evicted or replaced between the lookup and the read
+            return None
+
+    def put_frame(self, key: str, df: pd.DataFrame) -> Path:
+        """Store a DataFrame under `key`."""
+        temp_path = self.new_temp_path()
+        write_export(iter([df]), temp_path, "parquet")
+        return self.put_file(key, temp_path)
+
+    def put_file(self, key: str, source_path: Path) -> Path:
+        """Move a finished Parquet file into the cache under `key` and enforce the byte budget."""
+        target = self._path_for(key)
+        os.replace(source_path, target)
+        size = target.stat().st_size
+        now = time.time()
+        with self._lock:
+            if key in self._entries:
+                self._entries.pop(key)
+            self._entries[key] = _CacheEntry(path=target, size=size, created=now, last_access=now)
+            self._counters["bytes_written"] += size
+            self._evict_to_budget(keep=key)
+        return target
+
+    @contextmanager
+    def hold(self, key: str) -> Iterator[None]:
+        """
+        Keep the entry of `key` from being evicted or expired while the block reads its file.
+        The cache may exceed its budget meanwhile; the next `put_file` evicts down to it again.
+        """
+        with self._lock:
+            self._holds[key] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._holds[key] -= 1
+                if not self._holds[key]:
+                    del self._holds[key]
+
+    def new_temp_path(self) -> Path:
+        """A path inside the cache directory for writing an entry before it is published with `put_file`."""
+        return self.directory / f".{uuid.uuid4().hex}.tmp"
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters and current size of the cache."""
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_ratio": round(self._counters["hits"] / lookups, 3) if lookups else None,
+                "entries": len(self._entries),
+                "bytes": sum(entry.size for entry in self._entries.values()),
+                "max_bytes": self.max_bytes,
+                "policy": self.policy,
+            }
+
+    # --- Internals (callers hold the lock) ---
+    def _path_for(self, key: str) -> Path:
+        return self.directory / f"{key}.parquet"
+
+    def _load_index(self):
+        """Rebuild the index from the files on disk, oldest access first."""
+        files = []
+        for path in self.directory.glob("*.parquet"):
+            stat = path.stat()
+            files.append((stat.st_atime, path, stat))
+        for path in self.directory.glob(".*.tmp"):
+            # Left behind by an interrupted write
+            path.unlink(missing_ok=True)
+        for last_access, path, stat in sorted(files):
+            self._entries[path.stem] = _CacheEntry(path=path, size=stat.st_size, created=stat.st_mtime, last_access=last_access)
+        self._evict_to_budget()
+
+    def _adopt(self, key: str) -> Optional[_CacheEntry]:
+        path = self._path_for(key)
+        if not path.exists():
+            return None
+        stat = path.stat()
+        entry = _CacheEntry(path=path, size=stat.st_size, created=stat.st_mtime, last_access=stat.st_atime)
+        self._entries[key] = entry
+        return entry
+
+    def _is_expired(self, entry: _CacheEntry) -> bool:
+        return self.ttl_seconds is not None and time.time() - entry.created > self.ttl_seconds
+
+    def _remove(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.path.unlink(missing_ok=True)
+
+    def _evict_to_budget(self, keep: Optional[str] = None):
+        total = sum(entry.size for entry in self._entries.values())
+        while total > self.max_bytes:
+            victim = self._pick_victim(keep)
+            if victim is None:
+                # Everything left is the new entry or held by a reader
+                break
+            total -= self._entries[victim].size
+            self._remove(victim)
+            self._counters["evictions"] += 1
+
+    def _pick_victim(self, keep: Optional[str]) -> Optional[str]:
+        candidates = [key for key in self._entries if key != keep and not self._holds[key]]
+        if not candidates:
+            return None
+        if self.policy == "lfu":
+            # Least hits first; ties broken by least recent access
+            return min(candidates, key=lambda key: (self._entries[key].hits, self._entries[key].last_access))
+        # OrderedDict keeps the least recently used entry first
+        return candidates[0]
+
+
+_caches: Dict[str, ResultCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _get_cache(name: str, directory: Path, max_bytes: int, ttl_seconds: int) -> ResultCache:
+    if name not in _caches:
+        with _caches_lock:
+            if name not in _caches:
+                _caches[name] = ResultCache(directory, max_bytes, ttl_seconds, RESULT_CACHE_POLICY)
+    return _caches[name]
+
+
+def _collect_cache_metrics():
+    """Counters and size of the caches created in this process, for the metrics endpoint."""
+    with _caches_lock:
+        stats = {name: cache.stats() for name, cache in _caches.items()}
+    metrics = [
+        (f"result_cache_{counter}_total", "counter", documentation,
+         [({"cache": name}, cache_stats[counter]) for name, cache_stats in stats.items()])
+        for counter, documentation in (
+            ("hits", "Cache lookups that found a fresh entry"),
+            ("misses", "Cache lookups that found no fresh entry"),
+            ("evictions", "Entries evicted to stay within the byte budget"),
+            ("expirations", "Entries dropped because they outlived the TTL"),
+            ("bytes_written", "Bytes written into the cache"),
+        )
+    ]
+    metrics += [
+        ("result_cache_hit_ratio", "gauge", "Share of lookups that were hits",
+         [({"cache": name}, cache_stats["hit_ratio"]) for name, cache_stats in stats.items() if cache_stats["hit_ratio"] is not None]),
+        ("result_cache_entries", "gauge", "Entries in the cache",
+         [({"cache": name}, cache_stats["entries"]) for name, cache_stats in stats.items()]),
+        ("result_cache_bytes", "gauge", "Size of the cache on disk",
+         [({"cache": name}, cache_stats["bytes"]) for name, cache_stats in stats.items()]),
+        ("result_cache_max_bytes", "gauge", "Byte budget of the cache",
+         [({"cache": name}, cache_stats["max_bytes"]) for name, cache_stats in stats.items()]),
+    ]
+    return metrics
+
+
+registry.register_collector(_collect_cache_metrics)
+
+
+def get_result_cache() -> ResultCache:
+    """Return the process-wide result cache, creating it on first use."""
+    return _get_cache("results", RESULT_CACHE_DIR, RESULT_CACHE_MAX_BYTES, RESULT_CACHE_TTL_SECONDS)
+
+
+def get_partial_cache() -> ResultCache:
+    """Return the process-wide cache of per-day partial aggregates, creating it on first use."""
+    return _get_cache("partials", PARTIAL_CACHE_DIR, PARTIAL_CACHE_MAX_BYTES, PARTIAL_CACHE_TTL_SECONDS)
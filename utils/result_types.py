@@ -0,0 +1,108 @@
+"""
+Result Column Types
+
+Fetched results are typed right after they leave the driver, using the "column_types"
+schema of their data source in DATA_SOURCE_CONFIGS:
+
+- "category": low-cardinality strings (marketplace, country, device type, ...) become
+  categoricals, one small integer code per row instead of a string. They are written
+  to Parquet as dictionary columns, so cached and materialized results keep the type.
+- "int8" ... "int64": integer counts the database returns as floats or decimals (e.g. SUMs)
+  become nullable integers of that width. Only lossless conversions are made: a column
+  holding values outside the range becomes Int64, one holding fractions float64, and a
+  warning is logged. Results arrive in chunks, so the widened type is remembered for the
+  column and applied to every later chunk; the exporters widen the chunks written before.
+- "float32" / "float64" and "str": cast as named.
+
+Independently of the schema, DECIMAL values, which the driver returns as Python `Decimal`
+objects of ~100 bytes each, become float64. Columns the schema does not name keep their type.
+"""
+
+import logging
+import threading
+from decimal import Decimal
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from utils.input_config import DATA_SOURCE_CONFIGS
+
+_INTEGER_TYPES = {
+    "int8": pd.Int8Dtype(),
+    "int16": pd.Int16Dtype(),
+    "int32": pd.Int32Dtype(),
+    "int64": pd.Int64Dtype(),
+}
+_logger = logging.getLogger(__name__)
+
+# Integer columns whose values did not fit their declared type: (data source, column) -> widened type
+_widened: Dict[Tuple[str, str], str] = {}
+_widened_lock = threading.Lock()
+
+_OTHER_TYPES = {
+    "category": "category",
+    "float32": "float32",
+    "float64": "float64",
+    "str": "str",
+}
+
+
+def get_column_types(data_source: str) -> Dict[str, str]:
+    return DATA_SOURCE_CONFIGS.get(data_source, {}).get("column_types", {})
+
+
+def apply_column_types(data_source: str, df: pd.DataFrame) -> pd.DataFrame:
+    """Return `df` with the column types of `data_source` applied and decimals converted to floats."""
+    column_types = get_column_types(data_source)
+    converted = {}
+    for name in df.columns:
+        original = series = df[name]
+        if series.dtype == object and _holds_decimals(series):
+            series = pd.to_numeric(series, errors='coerce')
+        declared = column_types.get(name)
+        if declared is not None:
+            series = _convert(data_source, name, series, declared)
+        if series is not original:
+            converted[name] = series
+    if not converted:
+        return df
+    return df.assign(**converted)
+
+
+def _holds_decimals(series: pd.Series) -> bool:
+    first_valid = series.first_valid_index()
+    return first_valid is not None and isinstance(series[first_valid], Decimal)
+
+
+def _convert(data_source: str, name: str, series: pd.Series, declared: str) -> pd.Series:
+    declared = _widened.get((data_source, name), declared)
+    if declared in _INTEGER_TYPES:
+        dtype = _INTEGER_TYPES[declared]
+        if series.dtype == dtype:
+            return series
+        values = pd.to_numeric(series, errors='coerce')
+        present = values.dropna().to_numpy(dtype="float64")
+        info = np.iinfo(dtype.numpy_dtype)
+        if len(present) and (np.any(present % 1 != 0) or present.min() < info.min or present.max() > info.max):
+            return _convert(data_source, name, series, _widen(data_source, name, declared, present))
+        return values.astype(dtype)
+
+    dtype = _OTHER_TYPES.get(declared)
+    if dtype is None:
+        raise ValueError(f"Unknown column type '{declared}' for column '{name}' of {data_source}")
+    if str(series.dtype) == dtype:
+        return series
+    return series.astype(dtype)
+
+
+def _widen(data_source: str, name: str, declared: str, present: np.ndarray) -> str:
+    """Record and return the narrowest type holding `present`: Int64 for integers, else float64."""
+    info = np.iinfo(np.int64)
+    fits_int64 = not np.any(present % 1 != 0) and present.min() >= info.min and present.max() <= info.max
+    widened = "int64" if fits_int64 and declared != "int64" else "float64"
+    with _widened_lock:
+        _widened[(data_source, name)] = widened
+    _logger.warning("Column '%s' of %s is declared %s but holds %s values; using %s for it from now on.",
+                    name, data_source, declared, "out-of-range" if fits_int64 else "fractional", widened)
+    return widened
@@ -0,0 +1,190 @@
+"""
+Row Count Admission Check
+
+Before the data query of a request runs, `check_admission` decides whether its result can
+fit under MAX_EXPORT_ROWS, asking the strategies of ROW_COUNT_STRATEGIES in order:
+
+- "history": rows per storefront and day observed for earlier results of the same data
+             source and workspace, scaled to the request. Free, but only an estimate.
+- "plan":    the optimizer's row estimate for the grouping keys query (`est_rows` of its
+             EXPLAIN plan). Costs a compilation; only SingleStore reports it.
+- "probe":   COUNT(*) over at most MAX_EXPORT_ROWS + 1 grouping keys (the "keys" query of the
+             data source, without the metric joins of the data query). Exact up to the limit.
+- "exact":   COUNT(*) over all grouping keys.
+
+Estimates can only admit a request, and only when they are well below the limit
+(ROW_ESTIMATE_ADMIT_RATIO); a request is refused only on a probe or an exact count. An
+admitted request that is larger than estimated is still stopped by the exact
+`COUNT(*) OVER ()` total that materialization reads from its first chunk. Exact counts are
+otherwise only computed on demand (`get_row_count`), e.g. when a refused user asks for one.
+
+Strategies are functions (data_source, sql_params, max_rows) -> Optional[RowEstimate]
+registered in ROW_COUNT_STRATEGY_FUNCTIONS; None means the strategy has no answer.
+"""
+
+import json
+import os
+import re
+import threading
+from dataclasses import dataclass
+from datetime import date
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from utils.config import MAX_EXPORT_ROWS, ROW_COUNT_STRATEGIES, ROW_ESTIMATE_ADMIT_RATIO, ROW_HISTORY_PATH
+from utils.spans import span
+
+# Kinds of row counts
+ESTIMATED = "estimated"  # An approximation
+AT_MOST = "at_most"  # Exact up to the probe limit; `rows` above the limit means "more than the limit"
+EXACT = "exact"
+
+# Weight of the newest observation in the per-workspace rate
+_HISTORY_SMOOTHING = 0.3
+
+_EST_ROWS = re.compile(r"est_rows:\s*([\d,]+)")
+
+
+@dataclass
+class RowEstimate:
+    """A row count of a request and how it was obtained."""
+    rows: int
+    kind: str
+    strategy: str
+    limit: Optional[int] = None  # The row limit of a probe
+
+    @property
+    def is_exact(self) -> bool:
+        return self.kind == EXACT or (self.kind == AT_MOST and self.rows <= self.limit)
+
+
+def check_admission(data_source: str, sql_params: Dict[str, Any], max_rows: int = MAX_EXPORT_ROWS) -> Optional[RowEstimate]:
+    """
+    The first decisive row count of the configured strategies: an estimate well below
+    `max_rows`, or a probed or exact count. None if no strategy decided, in which case the
+    request is admitted and materialization enforces the limit.
+    """
+    with span("export.admission", data_source=data_source) as admission_span:
+        for name in ROW_COUNT_STRATEGIES:
+            estimate = ROW_COUNT_STRATEGY_FUNCTIONS[name](data_source, sql_params, max_rows)
+            if estimate is None:
+                continue
+            if estimate.kind == ESTIMATED and estimate.rows > max_rows * ROW_ESTIMATE_ADMIT_RATIO:
+                # Too close to the limit to trust: ask the next strategy
+                continue
+            admission_span.set(strategy=name, rows=estimate.rows, kind=estimate.kind)
+            return estimate
+        return None
+
+
+# --- Strategies ---
+def _history_estimate(data_source: str, sql_params: Dict[str, Any], max_rows: int) -> Optional[RowEstimate]:
+    rate = get_row_history().rate(data_source, sql_params)
+    if rate is None:
+        return None
+    return RowEstimate(rows=int(rate * _request_scale(sql_params)), kind=ESTIMATED, strategy="history")
+
+
+def _plan_estimate(data_source: str, sql_params: Dict[str, Any], max_rows: int) -> Optional[RowEstimate]:
+    from utils.logic import explain_query
+
+    try:
+        plan = explain_query('keys', data_source, **sql_params)
+    except Exception:
+        # An estimate is optional; the next strategy decides
+        return None
+    match = _EST_ROWS.search(plan or "")
+    if match is None:
+        return None
+    # Plans list operators from the root down, so the first estimate is the closest to the result
+    return RowEstimate(rows=int(match.group(1).replace(",", "")), kind=ESTIMATED, strategy="plan")
+
+
+def _probe_count(data_source: str, sql_params: Dict[str, Any], max_rows: int) -> Optional[RowEstimate]:
+    from utils.logic import get_data
+
+    df = get_data('probe', data_source, limit=max_rows + 1, **sql_params)
+    return RowEstimate(rows=int(df.iloc[0, 0]) if not df.empty else 0, kind=AT_MOST, strategy="probe", limit=max_rows)
+
+
+def _exact_count(data_source: str, sql_params: Dict[str, Any], max_rows: int) -> Optional[RowEstimate]:
+    from utils.logic import get_data
+
+    df = get_data('count', data_source, **sql_params)
+    return RowEstimate(rows=int(df.iloc[0, 0]) if not df.empty else 0, kind=EXACT, strategy="exact")
+
+
+ROW_COUNT_STRATEGY_FUNCTIONS: Dict[str, Callable[[str, Dict[str, Any], int], Optional[RowEstimate]]] = {
+    "history": _history_estimate,
+    "plan": _plan_estimate,
+    "probe": _probe_count,
+    "exact": _exact_count,
+}
+
+
+# --- Row count history ---
+def _request_scale(sql_params: Dict[str, Any]) -> float:
+    """Storefronts times days of a request; results are assumed to grow with both."""
+    storefronts = len(sql_params.get("storefront_ids") or []) or 1
+    days = 1
+    if sql_params.get("start_date") and sql_params.get("end_date"):
+        days = (date.fromisoformat(sql_params["end_date"]) - date.fromisoformat(sql_params["start_date"])).days + 1
+    return storefronts * max(days, 1)
+
+
+class RowHistory:
+    """Smoothed rows per storefront and day of past results, by data source and workspace, kept in a JSON file."""
+
+    def __init__(self, path: Path = ROW_HISTORY_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._rates: Optional[Dict[str, float]] = None
+
+    def rate(self, data_source: str, sql_params: Dict[str, Any]) -> Optional[float]:
+        with self._lock:
+            return self._load().get(self._key(data_source, sql_params))
+
+    def record(self, data_source: str, sql_params: Dict[str, Any], rows: int):
+        """Fold an exact row count of a request into the rate of its data source and workspace."""
+        observed = rows / _request_scale(sql_params)
+        key = self._key(data_source, sql_params)
+        with self._lock:
+            rates = self._load()
+            previous = rates.get(key)
+            rates[key] = observed if previous is None else (1 - _HISTORY_SMOOTHING) * previous + _HISTORY_SMOOTHING * observed
+            self._save(rates)
+
+    @staticmethod
+    def _key(data_source: str, sql_params: Dict[str, Any]) -> str:
+        return f"{data_source}:{sql_params.get('workspace_id')}"
+
+    def _load(self) -> Dict[str, float]:
+        if self._rates is None:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    self._rates = {key: float(value) for key, value in json.load(f).items()}
+            except (OSError, ValueError, AttributeError):
+                self._rates = {}
+        return self._rates
+
+    def _save(self, rates: Dict[str, float]):
+        """Write the file atomically, so a concurrent reader never sees it half-written."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(rates, f)
+        os.replace(temp_path, self.path)
+
+
+_history: Optional[RowHistory] = None
+_history_lock = threading.Lock()
+
+
+def get_row_history() -> RowHistory:
+    """Return the process-wide row count history, creating it on first use."""
+    global _history
+    if _history is None:
+        with _history_lock:
+            if _history is None:
+                _history = RowHistory()
+    return _history
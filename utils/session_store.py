@@ -0,0 +1,155 @@
+"""
+Session Data Store
+
+The DataFrames a session keeps between reruns (e.g. the preview of its current result) are
+held here instead of directly in `st.session_state`, one entry per name. A session never
+holds more than SESSION_MEMORY_BUDGET_BYTES of them in memory: a frame larger than
+SESSION_SPILL_BYTES is written straight to a Parquet file in SESSION_STORE_DIR, and when the
+budget is exceeded the largest in-memory entries are spilled until it fits. Spilled entries
+are read back on access.
+
+Entries not accessed for SESSION_IDLE_SECONDS are dropped, as are the spill files of
+sessions that ended (Streamlit gives no notice when a session ends, so idle session
+directories are swept when a new store is created). A dropped entry reads as missing;
+callers rebuild it from its source, e.g. the preview from the materialized result.
+"""
+
+import os
+import shutil
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+import streamlit as st
+
+from utils.config import SESSION_IDLE_SECONDS, SESSION_MEMORY_BUDGET_BYTES, SESSION_SPILL_BYTES, SESSION_STORE_DIR
+
+
+@dataclass
+class _Entry:
+    size: int  # In-memory size of the frame in bytes
+    last_access: float
+    frame: Optional[pd.DataFrame] = None  # None once spilled
+    path: Optional[Path] = None  # Spill file
+
+
+class SessionStore:
+    """Named DataFrames of one session, within a memory budget and spilled to disk beyond it."""
+
+    def __init__(self, session_key: str, directory: Path = SESSION_STORE_DIR,
+                 memory_budget: int = SESSION_MEMORY_BUDGET_BYTES, spill_bytes: int = SESSION_SPILL_BYTES,
+                 idle_seconds: int = SESSION_IDLE_SECONDS):
+        self.directory = Path(directory) / session_key
+        self.memory_budget = memory_budget
+        self.spill_bytes = spill_bytes
+        self.idle_seconds = idle_seconds
+        self._entries: Dict[str, _Entry] = {}
+        # Reruns and fragments of a session may overlap
+        self._lock = threading.Lock()
+
+    # --- Public API ---
+    def put_frame(self, name: str, df: pd.DataFrame):
+        """Store `df` under `name`, replacing (and freeing) any previous entry of that name."""
+        size = int(df.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            self._remove(name)
+            entry = _Entry(size=size, last_access=time.time(), frame=df)
+            self._entries[name] = entry
+            if size > self.spill_bytes:
+                self._spill(name, entry)
+            self._enforce_budget(keep=name)
+
+    def get_frame(self, name: str) -> Optional[pd.DataFrame]:
+        """The frame stored under `name`, or None if there is none or it expired."""
+        with self._lock:
+            self._expire_idle()
+            entry = self._entries.get(name)
+            if entry is None:
+                return None
+            entry.last_access = time.time()
+            if entry.frame is not None:
+                return entry.frame
+            path = entry.path
+        try:
+            # Spilled frames are not brought back into memory; each access reads the file
+            df = pd.read_parquet(path)
+            # Marks the session directory as in use for sweep_idle_sessions
+            os.utime(path)
+            return df
+        except (OSError, ValueError):
+            self.discard(name)
+            return None
+
+    def discard(self, name: str):
+        """Free the entry stored under `name`, in memory and on disk."""
+        with self._lock:
+            self._remove(name)
+
+    def clear(self):
+        """Free every entry of the session."""
+        with self._lock:
+            for name in list(self._entries):
+                self._remove(name)
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "memory_bytes": sum(entry.size for entry in self._entries.values() if entry.frame is not None),
+                "spilled_entries": sum(1 for entry in self._entries.values() if entry.frame is None),
+                "memory_budget": self.memory_budget,
+            }
+
+    # --- Internals (callers hold the lock) ---
+    def _remove(self, name: str):
+        entry = self._entries.pop(name, None)
+        if entry is not None and entry.path is not None:
+            entry.path.unlink(missing_ok=True)
+
+    def _spill(self, name: str, entry: _Entry):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{name}.parquet"
+        # With its index: preview pages are indexed by row id
+        entry.frame.to_parquet(path)
+        entry.path, entry.frame = path, None
+
+    def _enforce_budget(self, keep: Optional[str] = None):
+        in_memory = {name: entry for name, entry in self._entries.items() if entry.frame is not None}
+        total = sum(entry.size for entry in in_memory.values())
+        # Largest first, so the fewest entries are moved to disk; the entry just stored goes last
+        for name in sorted(in_memory, key=lambda name: (name == keep, -in_memory[name].size)):
+            if total <= self.memory_budget:
+                break
+            self._spill(name, in_memory[name])
+            total -= in_memory[name].size
+
+    def _expire_idle(self):
+        cutoff = time.time() - self.idle_seconds
+        for name in [name for name, entry in self._entries.items() if entry.last_access < cutoff]:
+            self._remove(name)
+
+
+def sweep_idle_sessions(directory: Path = SESSION_STORE_DIR, idle_seconds: int = SESSION_IDLE_SECONDS):
+    """Delete the spill directories of sessions that have not written anything for `idle_seconds`."""
+    cutoff = time.time() - idle_seconds
+    if not Path(directory).exists():
+        return
+    for session_dir in Path(directory).iterdir():
+        try:
+            if session_dir.is_dir() and max((p.stat().st_mtime for p in session_dir.iterdir()),
+                                            default=session_dir.stat().st_mtime) < cutoff:
+                shutil.rmtree(session_dir, ignore_errors=True)
+        except OSError:
+            continue
+
+
+def get_session_store() -> SessionStore:
+    """The data store of the current Streamlit session, created on first use."""
+    if 'session_store' not in st.session_state:
+        sweep_idle_sessions()
+        st.session_state.session_store = SessionStore(st.session_state.owner_id)
+    return st.session_state.session_store
@@ -0,0 +1,201 @@
+"""
+Export Pipeline Spans
+
+Nested, timed spans of the stages of an export (validation, parameter building, query
+execution, fetching, encoding, preview), each carrying the data source and row counts or
+byte sizes as attributes. Finished spans are appended to a local JSONL file (SPAN_LOG_PATH)
+that rotates at SPAN_LOG_MAX_BYTES. Every line is an OTLP/JSON `ExportTraceServiceRequest`
+holding one span, the format the OpenTelemetry Collector's file exporter writes and its
+`otlpjsonfile` receiver reads, so the file can be shipped to any tracing backend or
+aggregated directly, e.g. with DuckDB or jq.
+
+The current span is tracked in a context variable. Background jobs run on other threads,
+so a job carries the W3C `traceparent` of the span that submitted it and continues that trace.
+"""
+
+import functools
+import json
+import logging
+import os
+import secrets
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from logging.handlers import RotatingFileHandler
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from utils.config import SPAN_LOG_BACKUP_COUNT, SPAN_LOG_MAX_BYTES, SPAN_LOG_PATH
+
+SERVICE_NAME = "data-export-tool"
+
+# OTLP enum values
+_SPAN_KIND_INTERNAL = 1
+_STATUS_CODE_OK = 1
+_STATUS_CODE_ERROR = 2
+
+
+@dataclass
+class Span:
+    """A running span; attributes can be added until it ends."""
+    name: str
+    trace_id: str
+    span_id: str
+    parent_span_id: Optional[str]
+    start_ns: int  # Wall clock, as OTLP expects
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    _start_perf_ns: int = field(default_factory=time.perf_counter_ns, repr=False)
+
+    def set(self, **attributes: Any):
+        self.attributes.update(attributes)
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-01"
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_traceparent() -> Optional[str]:
+    """W3C traceparent of the current span, to continue its trace on another thread."""
+    current = _current_span.get()
+    return current.traceparent if current is not None else None
+
+
+def _parse_traceparent(traceparent: Optional[str]) -> Optional[Tuple[str, str]]:
+    parts = (traceparent or "").split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+@contextmanager
+def span(name: str, parent: Optional[str] = None, **attributes: Any) -> Iterator[Span]:
+    """
+    Time the block as a span named `name`. It is a child of the current span, or of the
+    `parent` traceparent if given, and starts a new trace otherwise. The span is written when
+    the block ends; an exception marks it as failed and is re-raised.
+    """
+    current = _current_span.get()
+    remote_parent = _parse_traceparent(parent) if parent else None
+    if remote_parent is not None:
+        trace_id, parent_span_id = remote_parent
+    elif current is not None:
+        trace_id, parent_span_id = current.trace_id, current.span_id
+    else:
+        trace_id, parent_span_id = secrets.token_hex(16), None
+
+    active = Span(name=name, trace_id=trace_id, span_id=secrets.token_hex(8), parent_span_id=parent_span_id,
+                  start_ns=time.time_ns(), attributes=dict(attributes))
+    token = _current_span.set(active)
+    error = None
+    try:
+        yield active
+    except BaseException as e:
+        error = e
+        raise
+    finally:
+        _current_span.reset(token)
+        _write(active, time.perf_counter_ns() - active._start_perf_ns, error)
+
+
+def traced(name: str) -> Callable[[Callable], Callable]:
+    """
+    Decorator recording each call of the function as a child span of the current span.
+    Calls outside a trace (e.g. input validation on every rerun of a page) are not recorded.
+    """
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if _current_span.get() is None:
+                return func(*args, **kwargs)
+            with span(name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traced_chunks(name: str, chunks: Iterable, **attributes: Any) -> Iterator:
+    """
+    Yield from `chunks`, recording the production of each chunk as a span with its row count.
+    Used to separate the time spent reading chunks (e.g. fetching them from the database)
+    from the time the consumer spends on them (e.g. encoding them).
+    """
+    iterator = iter(chunks)
+    while True:
+        with span(name, **attributes) as chunk_span:
+            chunk = next(iterator, None)
+            chunk_span.set(rows=len(chunk) if chunk is not None else 0)
+        if chunk is None:
+            return
+        yield chunk
+
+
+# --- JSONL sink ---
+_logger: Optional[logging.Logger] = None
+
+
+def _get_logger() -> Optional[logging.Logger]:
+    global _logger
+    if _logger is None and SPAN_LOG_PATH:
+        logger = logging.getLogger("export_spans")
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            SPAN_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+            # Rotation happens under the handler's lock, so concurrent writers never interleave lines
+            handler = RotatingFileHandler(SPAN_LOG_PATH, maxBytes=SPAN_LOG_MAX_BYTES,
+                                          backupCount=SPAN_LOG_BACKUP_COUNT, encoding="utf-8")
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+        _logger = logger
+    return _logger
+
+
+def _write(finished: Span, duration_ns: int, error: Optional[BaseException]):
+    logger = _get_logger()
+    if logger is None:
+        return
+    otlp_span = {
+        "traceId": finished.trace_id,
+        "spanId": finished.span_id,
+        "name": finished.name,
+        "kind": _SPAN_KIND_INTERNAL,
+        "startTimeUnixNano": str(finished.start_ns),
+        "endTimeUnixNano": str(finished.start_ns + duration_ns),
+        "attributes": _otlp_attributes(finished.attributes),
+        "status": {"code": _STATUS_CODE_OK} if error is None
+                  else {"code": _STATUS_CODE_ERROR, "message": f"{type(error).__name__}: {error}"[:500]},
+    }
+    if finished.parent_span_id:
+        otlp_span["parentSpanId"] = finished.parent_span_id
+    request = {
+        "resourceSpans": [{
+            "resource": {"attributes": _RESOURCE_ATTRIBUTES},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": [otlp_span]}],
+        }]
+    }
+    try:
+        logger.info(json.dumps(request, separators=(",", ":"), default=str))
+    except Exception:
+        # Tracing never fails the export it observes
+        pass
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        # OTLP/JSON encodes 64-bit integers as strings
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: Dict[str, Any]) -> list:
+    return [{"key": key, "value": _otlp_value(value)} for key, value in attributes.items() if value is not None]
+
+
+_RESOURCE_ATTRIBUTES = _otlp_attributes({"service.name": SERVICE_NAME, "process.pid": os.getpid()})
@@ -0,0 +1,60 @@
+"""
+SQL Parameter Binding
+
+List parameters such as `storefront_ids` are bound as expanding IN-list parameters: the SQL
+file says `IN :storefront_ids` and the driver receives one placeholder per value, never
+values formatted into the SQL text.
+
+Every distinct list length is a distinct statement shape, and SingleStore compiles a plan
+per shape, which can take seconds. Lists are therefore padded to the next bucket size
+(1, 2, 4, 8, 16, ...) by repeating their last value, which does not change what the IN-list
+matches. Each query then has only a handful of shapes, which stay hot in the plan cache.
+"""
+
+import re
+from typing import Any, Dict, List, Sequence, Tuple
+
+from sqlalchemy import bindparam, text
+from sqlalchemy.sql.elements import TextClause
+
+
+def in_list_bucket(size: int) -> int:
+    """The padded length of an IN-list of `size` values: the next power of two."""
+    bucket = 1
+    while bucket < size:
+        bucket *= 2
+    return bucket
+
+
+def pad_in_list(values: Sequence[Any]) -> List[Any]:
+    """Pad `values` to its bucket size by repeating the last value. Empty lists stay empty."""
+    values = list(values)
+    if not values:
+        return values
+    return values + [values[-1]] * (in_list_bucket(len(values)) - len(values))
+
+
+def references_param(sql: str, name: str) -> bool:
+    return re.search(rf"(?<![:\w]):{re.escape(name)}\b", sql) is not None
+
+
+def expanding_statement(sql: str, names) -> TextClause:
+    """Compile `sql` with the parameters in `names` bound as expanding IN-lists."""
+    query = text(sql)
+    if names:
+        query = query.bindparams(*[bindparam(name, expanding=True) for name in sorted(names)])
+    return query
+
+
+def pad_in_lists(params: Dict[str, Any], names) -> Dict[str, Any]:
+    """A copy of `params` with the lists in `names` padded to their bucket size."""
+    return {name: pad_in_list(value) if name in names else value for name, value in params.items()}
+
+
+def bind_text(sql: str, params: Dict[str, Any]) -> Tuple[TextClause, Dict[str, Any]]:
+    """
+    Build the statement for `sql` with every list parameter it references bound as an
+    expanding IN-list padded to its bucket size. Returns the statement and the parameters to bind.
+    """
+    names = {name for name, value in params.items() if isinstance(value, (list, tuple)) and references_param(sql, name)}
+    return expanding_statement(sql, names), pad_in_lists(params, names)
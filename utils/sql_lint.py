@@ -0,0 +1,347 @@
+"""
+SQL Static Analysis
+
+Checks the query files in data_logic/sql/ for patterns that keep SingleStore from using
+segment elimination and indexes, or that multiply work:
+
+- non-sargable:  a function wrapped around a filtered column, e.g.
+                 `date(pfm.created_datetime) between :start_date and :end_date`
+- catch-all:     an optional filter written as `(:param is null or col = :param)`, which
+                 compiles to one plan for every value, so it cannot use the column's index
+- cross-join:    `JOIN ... ON (true)`, `ON 1 = 1`, `CROSS JOIN` or comma joins in FROM
+- duplicate-cte: a CTE of a `*_keys.sql` file repeated verbatim in the matching data file,
+                 so the two copies drift apart when only one is edited
+- in-list:       `IN (:param)`; list parameters are bound as expanding IN-lists that bring
+                 their own parentheses, so this becomes a row-value comparison (`IN ((1, 2))`)
+
+The analyzer tokenizes the SQL itself (no parser dependency) and tracks which clause each
+token belongs to, so functions in the SELECT list or GROUP BY are not reported.
+
+Findings already present when a rule was introduced are listed in a baseline file; the
+check fails only on new ones. It runs in the test suite (tests/test_sql_lint.py), or on its own:
+
+    python -m utils.sql_lint                    # exit status 1 on new findings
+    python -m utils.sql_lint --all              # also list baselined findings
+    python -m utils.sql_lint --update-baseline  # accept the current findings
+"""
+
+import argparse
+import json
+import re
+import sys
+from collections import Counter
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from utils.config import PROJECT_ROOT
+
+SQL_DIR = PROJECT_ROOT / "data_logic" / "sql"
+BASELINE_PATH = PROJECT_ROOT / "data_logic" / "sql_lint_baseline.json"
+
+# Functions that hide a column from index and segment elimination when they wrap it in a filter
+_WRAPPING_FUNCTIONS = {
+    "date", "day", "month", "year", "week", "quarter", "hour", "timestamp", "date_format", "str_to_date",
+    "unix_timestamp", "from_unixtime", "datediff", "cast", "convert", "lower", "upper", "trim", "ltrim", "rtrim",
+    "substring", "substr", "left", "right", "concat", "ifnull", "coalesce", "abs", "round", "floor", "ceil",
+}
+
+# Clauses whose expressions filter rows
+_PREDICATE_CLAUSES = {"where", "on", "having"}
+
+# Keywords that start a clause
+_CLAUSE_KEYWORDS = {"select", "from", "where", "on", "having", "group", "order", "limit", "join", "union", "with", "using"}
+
+_COMPARISON_OPERATORS = {"=", "<", ">", "<=", ">=", "<>", "!="}
+_COMPARISON_KEYWORDS = {"between", "in", "like", "not", "is", "regexp"}
+
+_TOKEN_RE = re.compile(
+    r"""
+      (?P<ws>\s+)
+    | (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.)*")
+    | (?P<param>:[A-Za-z_]\w*)
+    | (?P<name>`[^`]+`(?:\.`[^`]+`|\.[A-Za-z_]\w*)*|[A-Za-z_]\w*(?:\.(?:`[^`]+`|[A-Za-z_]\w*|\*))*)
+    | (?P<number>\d+(?:\.\d+)?)
+    | (?P<op><=|>=|<>|!=|=|<|>|\|\||[-+*/%])
+    | (?P<punct>[(),;])
+    | (?P<other>.)
+    """,
+    re.VERBOSE | re.DOTALL,
+)
+
+
+@dataclass(frozen=True)
+class Finding:
+    file: str  # Relative to the SQL directory
+    line: int
+    rule: str
+    message: str
+    snippet: str  # Normalized source of the offending expression; identifies the finding in the baseline
+
+    def fingerprint(self) -> Tuple[str, str, str]:
+        return self.file, self.rule, self.snippet
+
+
+@dataclass
+class _Token:
+    kind: str
+    text: str
+    line: int
+    clause: Optional[str] = None  # Innermost clause the token belongs to
+    clause_depth: int = 0  # Parenthesis depth at which that clause started
+    depth: int = 0  # Parenthesis depth of the token
+
+    @property
+    def word(self) -> str:
+        return self.text.lower()
+
+
+def tokenize(sql: str) -> List[_Token]:
+    """Split SQL into tokens, dropping whitespace and comments, and tag each with its clause."""
+    tokens: List[_Token] = []
+    line = 1
+    for match in _TOKEN_RE.finditer(sql):
+        kind, text = match.lastgroup, match.group()
+        if kind not in ("ws", "comment"):
+            tokens.append(_Token(kind, text, line))
+        line += text.count("\n")
+
+    # (clause, depth it started at) per open parenthesis; inner parentheses inherit the outer clause
+    stack: List[Tuple[Optional[str], int]] = [(None, 0)]
+    for index, token in enumerate(tokens):
+        if token.text == "(":
+            stack.append(stack[-1])
+        elif token.text == ")" and len(stack) > 1:
+            stack.pop()
+        elif token.kind == "name" and token.word in _CLAUSE_KEYWORDS:
+            stack[-1] = (token.word, len(stack) - 1)
+        token.clause, token.clause_depth = stack[-1]
+        token.depth = len(stack) - 1 if token.text != "(" else len(stack) - 2
+    return tokens
+
+
+def _matching_paren(tokens: Sequence[_Token], open_index: int) -> int:
+    depth = 0
+    for index in range(open_index, len(tokens)):
+        if tokens[index].text == "(":
+            depth += 1
+        elif tokens[index].text == ")":
+            depth -= 1
+            if depth == 0:
+                return index
+    return len(tokens) - 1
+
+
+def _is_column(token: _Token) -> bool:
+    return token.kind == "name" and token.word not in _CLAUSE_KEYWORDS and token.word not in ("true", "false", "null")
+
+
+def _snippet(tokens: Sequence[_Token], start: int, end: int) -> str:
+    return " ".join(token.word if token.kind == "name" else token.text for token in tokens[start:end + 1])
+
+
+def _check_non_sargable(file: str, tokens: List[_Token]) -> List[Finding]:
+    findings = []
+    for index, token in enumerate(tokens[:-2]):
+        if token.kind != "name" or token.word not in _WRAPPING_FUNCTIONS or tokens[index + 1].text != "(":
+            continue
+        if token.clause not in _PREDICATE_CLAUSES:
+            continue
+        argument = tokens[index + 2]
+        if not _is_column(argument) or tokens[index + 3].text == "(":
+            continue
+        close = _matching_paren(tokens, index + 1)
+        after = tokens[close + 1] if close + 1 < len(tokens) else None
+        before = tokens[index - 1] if index > 0 else None
+        compared_after = after is not None and (after.text in _COMPARISON_OPERATORS or after.word in _COMPARISON_KEYWORDS)
+        compared_before = before is not None and before.text in _COMPARISON_OPERATORS
+        if not (compared_after or compared_before):
+            continue
+        findings.append(Finding(
+            file, token.line, "non-sargable",
+            f"`{token.word}()` wraps the filtered column `{argument.text}`; compare the bare column with "
+            f"a range instead (e.g. `col >= :start_date and col < :end_date + interval 1 day`)",
+            _snippet(tokens, index, close + 1 if compared_after else close),
+        ))
+    return findings
+
+
+def _check_catch_all(file: str, tokens: List[_Token]) -> List[Finding]:
+    findings = []
+    for index, token in enumerate(tokens[:-3]):
+        if token.kind != "param" or token.clause not in _PREDICATE_CLAUSES:
+            continue
+        if [t.word for t in tokens[index + 1:index + 4]] != ["is", "null", "or"]:
+            continue
+        # The alternative runs up to the closing parenthesis of the group, or the next AND
+        end = index + 4
+        while end + 1 < len(tokens) and tokens[end + 1].text != ")" and tokens[end + 1].word not in ("and", "or"):
+            end += 1
+        findings.append(Finding(
+            file, token.line, "catch-all",
+            f"`{token.text} is null or ...` is a catch-all filter; build the predicate only when "
+            f"{token.text} is set so the plan can use the column",
+            _snippet(tokens, index, end),
+        ))
+    return findings
+
+
+def _check_cross_joins(file: str, tokens: List[_Token]) -> List[Finding]:
+    findings = []
+    for index, token in enumerate(tokens):
+        if token.word == "on" and token.kind == "name":
+            position = index + 1
+            while position < len(tokens) and tokens[position].text == "(":
+                position += 1
+            words = [t.word for t in tokens[position:position + 3]]
+            if words[:1] == ["true"] or words == ["1", "=", "1"]:
+                join_index = max((i for i in range(index) if tokens[i].word == "join"), default=None)
+                target = tokens[join_index + 1].text if join_index is not None else "?"
+                findings.append(Finding(
+                    file, token.line, "cross-join",
+                    f"`JOIN {target} ON ({' '.join(words[:1] if words[0] == 'true' else words)})` is a cross join; "
+                    f"join on the key that relates the tables",
+                    f"join {target.lower()} on true",
+                ))
+        elif token.word == "cross" and index + 1 < len(tokens) and tokens[index + 1].word == "join":
+            target = tokens[index + 2].text if index + 2 < len(tokens) else "?"
+            findings.append(Finding(file, token.line, "cross-join", f"`CROSS JOIN {target}`", f"cross join {target.lower()}"))
+        elif token.text == "," and token.clause == "from" and token.depth == token.clause_depth:
+            target = tokens[index + 1].text if index + 1 < len(tokens) else "?"
+            findings.append(Finding(
+                file, token.line, "cross-join",
+                f"comma join with `{target}` in FROM; write it as a JOIN with an ON condition",
+                f", {target.lower()}",
+            ))
+    return findings
+
+
+def _check_in_lists(file: str, tokens: List[_Token]) -> List[Finding]:
+    findings = []
+    for index, token in enumerate(tokens[:-3]):
+        if token.word == "in" and tokens[index + 1].text == "(" and tokens[index + 2].kind == "param" and tokens[index + 3].text == ")":
+            param = tokens[index + 2].text
+            findings.append(Finding(
+                file, token.line, "in-list",
+                f"`IN ({param})` wraps an expanding list parameter in a second pair of parentheses; write `IN {param}`",
+                f"in ( {param} )",
+            ))
+    return findings
+
+
+def _ctes(tokens: List[_Token]) -> Dict[str, Tuple[str, int]]:
+    """Map each CTE name to its normalized body and line."""
+    ctes = {}
+    for index, token in enumerate(tokens[:-2]):
+        # `name AS (` directly after WITH or after the comma that closes the previous CTE
+        previous = tokens[index - 1] if index else None
+        if previous is None or not (previous.word == "with" or (previous.text == "," and index >= 2 and tokens[index - 2].text == ")")):
+            continue
+        if token.kind != "name" or tokens[index + 1].word != "as" or tokens[index + 2].text != "(":
+            continue
+        if previous.text == "," and tokens[index - 1].clause != "with":
+            continue
+        close = _matching_paren(tokens, index + 2)
+        ctes[token.word] = (_snippet(tokens, index + 3, close - 1), token.line)
+    return ctes
+
+
+def _data_file_for(keys_file: Path) -> Optional[Path]:
+    base = keys_file.name[:-len("_keys.sql")]
+    for candidate in (f"{base}_data.sql", f"{base}.sql"):
+        if (keys_file.parent / candidate).exists():
+            return keys_file.parent / candidate
+    return None
+
+
+def _check_duplicate_ctes(directory: Path, file: Path, tokens: List[_Token]) -> List[Finding]:
+    if not file.name.endswith("_keys.sql"):
+        return []
+    data_file = _data_file_for(file)
+    if data_file is None:
+        return []
+    data_bodies = {body: name for name, (body, _) in _ctes(tokenize(data_file.read_text(encoding="utf-8"))).items()}
+    findings = []
+    for name, (body, line) in _ctes(tokens).items():
+        if body in data_bodies:
+            findings.append(Finding(
+                str(file.relative_to(directory)), line, "duplicate-cte",
+                f"CTE `{name}` repeats `{data_bodies[body]}` of {data_file.name} verbatim; derive the keys "
+                f"from the data query instead of keeping two copies",
+                f"{name} = {data_file.name}:{data_bodies[body]}",
+            ))
+    return findings
+
+
+def lint_file(path: Path, directory: Path = SQL_DIR) -> List[Finding]:
+    """All findings of one SQL file."""
+    path = Path(path)
+    tokens = tokenize(path.read_text(encoding="utf-8"))
+    file = str(path.relative_to(directory))
+    findings = (
+        _check_non_sargable(file, tokens)
+        + _check_catch_all(file, tokens)
+        + _check_cross_joins(file, tokens)
+        + _check_in_lists(file, tokens)
+        + _check_duplicate_ctes(directory, path, tokens)
+    )
+    return sorted(findings, key=lambda finding: (finding.line, finding.rule))
+
+
+def lint_directory(directory: Path = SQL_DIR) -> List[Finding]:
+    """All findings of every SQL file in `directory`."""
+    findings = []
+    for path in sorted(Path(directory).glob("*.sql")):
+        findings.extend(lint_file(path, directory))
+    return findings
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Counter:
+    if not path.exists():
+        return Counter()
+    with open(path, 'r', encoding='utf-8') as f:
+        return Counter(tuple(entry[key] for key in ("file", "rule", "snippet")) for entry in json.load(f))
+
+
+def save_baseline(findings: List[Finding], path: Path = BASELINE_PATH):
+    entries = [{key: value for key, value in asdict(finding).items() if key != "message"} for finding in findings]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, indent=2)
+        f.write("\n")
+
+
+def new_findings(findings: List[Finding], baseline: Counter) -> List[Finding]:
+    """Findings not covered by the baseline. Each baseline entry covers one occurrence."""
+    remaining = Counter(baseline)
+    new = []
+    for finding in findings:
+        if remaining[finding.fingerprint()] > 0:
+            remaining[finding.fingerprint()] -= 1
+        else:
+            new.append(finding)
+    return new
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Check the SQL files for non-sargable filters, catch-all predicates, cross joins, duplicated CTEs and parenthesized IN-list parameters.")
+    parser.add_argument("--all", action="store_true", help="Also list findings accepted in the baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="Accept every current finding")
+    args = parser.parse_args(argv)
+
+    findings = lint_directory()
+    if args.update_baseline:
+        save_baseline(findings)
+        print(f"Baseline updated with {len(findings)} finding(s): {BASELINE_PATH.relative_to(PROJECT_ROOT)}")
+        return 0
+
+    new = new_findings(findings, load_baseline())
+    for finding in findings if args.all else new:
+        marker = "" if finding in new else " (baseline)"
+        print(f"data_logic/sql/{finding.file}:{finding.line}: [{finding.rule}]{marker} {finding.message}")
+    print(f"{len(new)} new finding(s), {len(findings) - len(new)} in the baseline")
+    return 1 if new else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Result Summaries
+
+Totals of a full result (sums, distinct counts and ratios), computed over every row instead of
+the preview rows: from the materialized copy of the result when there is one
+(`summarize_frame`), else by the database over the data query (`summary_sql`), e.g. for a
+result refused as too large to export. Each data source declares its summary in the "summary"
+entry of DATA_SOURCE_CONFIGS:
+
+    "summary": {
+        "sums": {"cost": "Cost", "click": "Clicks"},         # column -> label
+        "distinct": {"keyword": "Keywords"},                 # column -> label
+        "ratios": {"CPC": ["cost", "click"]},                # label -> [numerator, denominator]
+        "grain": ["keyword", "storefront_id"],               # optional
+    }
+
+Ratios divide the totals of their columns (SUM(cost) / SUM(click)), so every row weighs in
+by its volume, unlike an average of the per-row ratios. When the data query repeats a value
+over several rows, e.g. the ad metrics of a keyword on every display type row, "grain" names
+the columns that identify one value: the rows are first reduced to one per grain, taking the
+MAX of the summed and ratio columns, and distinct counts are then limited to grain columns.
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from utils.input_config import DATA_SOURCE_CONFIGS
+
+# Summary values, by label in the order of the spec; None where the result has no value
+Summary = Dict[str, Optional[float]]
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+def get_summary_spec(data_source: str) -> Optional[Dict[str, Any]]:
+    return DATA_SOURCE_CONFIGS.get(data_source, {}).get("summary")
+
+
+def summary_sql(spec: Dict[str, Any], sql: str) -> str:
+    """Wrap the data query `sql` in a single-row query computing the summary of `spec`."""
+    grain = spec.get("grain")
+    for column in _columns(spec):
+        if not _IDENTIFIER.match(column):
+            raise ValueError(f"Summary column '{column}' is not a plain identifier")
+    if grain and not set(spec.get("distinct", {})) <= set(grain):
+        raise ValueError("With a summary grain, distinct counts are only possible on grain columns")
+
+    # Newlines keep a trailing `--` comment in the SQL file from swallowing the closing parenthesis
+    source = f"(\n{sql}\n) AS _q"
+    if grain:
+        reduced = ", ".join(grain + [f"MAX({column}) AS {column}" for column in _measures(spec)])
+        source = f"(SELECT {reduced} FROM {source} GROUP BY {', '.join(grain)}) AS _g"
+
+    selected = [f"{expression} AS s{index}" for index, (_, expression) in enumerate(_expressions(spec))]
+    return f"SELECT {', '.join(selected)} FROM {source}"
+
+
+def read_summary(spec: Dict[str, Any], df: pd.DataFrame) -> Summary:
+    """Label the single row returned by a `summary_sql` query."""
+    row = df.iloc[0] if not df.empty else None
+    return {
+        label: _to_number(row[f"s{index}"] if row is not None else None)
+        for index, (label, _) in enumerate(_expressions(spec))
+    }
+
+
+def summary_columns(spec: Dict[str, Any]) -> List[str]:
+    """The result columns the summary of `spec` reads, each once."""
+    return list(dict.fromkeys(_columns(spec)))
+
+
+def summarize_frame(spec: Dict[str, Any], df: pd.DataFrame) -> Summary:
+    """The summary of `spec` computed from a result already in memory or read from its materialized copy."""
+    measures = _measures(spec)
+    grain = spec.get("grain")
+    if grain:
+        df = df.groupby(grain, dropna=False, observed=True)[measures].max().reset_index()
+    totals = {column: df[column].sum(min_count=1) for column in measures}
+
+    summary = {label: _to_number(totals[column]) for column, label in spec.get("sums", {}).items()}
+    summary.update({label: float(df[column].nunique()) for column, label in spec.get("distinct", {}).items()})
+    for label, (numerator, denominator) in spec.get("ratios", {}).items():
+        numerator_total, denominator_total = _to_number(totals[numerator]), _to_number(totals[denominator])
+        summary[label] = numerator_total / denominator_total if numerator_total is not None and denominator_total else None
+    return summary
+
+
+def _expressions(spec: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(label, SQL expression) of every summary value, sums first, then distinct counts, then ratios."""
+    expressions = [(label, f"SUM({column})") for column, label in spec.get("sums", {}).items()]
+    expressions += [(label, f"COUNT(DISTINCT {column})") for column, label in spec.get("distinct", {}).items()]
+    expressions += [
+        # Multiplying by 1.0 keeps integer columns from being divided as integers
+        (label, f"SUM({numerator}) * 1.0 / NULLIF(SUM({denominator}), 0)")
+        for label, (numerator, denominator) in spec.get("ratios", {}).items()
+    ]
+    return expressions
+
+
+def _measures(spec: Dict[str, Any]) -> List[str]:
+    """The summed columns and the columns ratios are computed from, each once."""
+    columns = list(spec.get("sums", {}))
+    for numerator, denominator in spec.get("ratios", {}).values():
+        columns += [column for column in (numerator, denominator) if column not in columns]
+    return columns
+
+
+def _columns(spec: Dict[str, Any]) -> List[str]:
+    return _measures(spec) + list(spec.get("distinct", {})) + list(spec.get("grain") or [])
+
+
+def _to_number(value: Any) -> Optional[float]:
+    if value is None or pd.isna(value):
+        return None
+    return float(value)
@@ -0,0 +1,164 @@
+"""
+Call Tracing
+
+`trace_function_call` records calls of the decorated functions for the debug panel. It is
+off by default (TRACE_SAMPLE_RATE=0) and then costs one comparison per call. When enabled,
+a sampled call is timed with a monotonic clock and stored as a single record holding short
+summaries of its arguments and result (e.g. `DataFrame[500x12]`), never their full repr.
+Records go into a fixed-size ring buffer (TRACE_BUFFER_SIZE) shared by all sessions, so
+memory stays bounded however long the app runs.
+
+Background jobs run on worker threads outside any script run. A job carries the session id
+of the script run that submitted it and runs inside `session_scope`, so its calls (and those
+of its partitions, which copy the job's context) are still recorded for that session.
+"""
+
+import functools
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import pandas as pd
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.config import TRACE_BUFFER_SIZE, TRACE_SAMPLE_RATE
+
+# Longest string or scalar repr kept in an argument summary
+_MAX_VALUE_CHARS = 60
+
+
+@dataclass
+class TraceRecord:
+    """One traced call."""
+    function: str
+    module: str
+    started_at: float  # Wall-clock time, for display only
+    duration_ms: float
+    status: str  # "ok" or "error"
+    args: Tuple[str, ...]
+    kwargs: Dict[str, str]
+    result: Optional[str] = None
+    error: Optional[str] = None
+    session_id: Optional[str] = field(default=None, repr=False)  # None outside a script run and a session scope
+
+
+_records: "deque[TraceRecord]" = deque(maxlen=TRACE_BUFFER_SIZE)
+_records_lock = threading.Lock()
+_sample_rate = TRACE_SAMPLE_RATE
+
+# Session of the job running on this thread, for calls made outside a script run
+_job_session_id: ContextVar[Optional[str]] = ContextVar("job_session_id", default=None)
+
+
+def set_sample_rate(rate: float):
+    """Trace this fraction of calls from now on (0 disables tracing, 1 traces every call)."""
+    global _sample_rate
+    _sample_rate = min(max(float(rate), 0.0), 1.0)
+
+
+def get_sample_rate() -> float:
+    return _sample_rate
+
+
+def summarize(value: Any) -> str:
+    """A short description of `value` whose cost does not depend on its size."""
+    if value is None or isinstance(value, (bool, int, float)):
+        return repr(value)[:_MAX_VALUE_CHARS]
+    if isinstance(value, str):
+        return repr(value if len(value) <= _MAX_VALUE_CHARS else value[:_MAX_VALUE_CHARS] + "...")
+    if isinstance(value, pd.DataFrame):
+        return f"DataFrame[{value.shape[0]}x{value.shape[1]}]"
+    if isinstance(value, (list, tuple, set, frozenset, dict)):
+        return f"{type(value).__name__}[{len(value)}]"
+    return type(value).__name__
+
+
+def current_session_id() -> Optional[str]:
+    """The Streamlit session of the current script run, else that of the enclosing `session_scope`."""
+    ctx = get_script_run_ctx(suppress_warning=True)
+    return ctx.session_id if ctx is not None else _job_session_id.get()
+
+
+@contextmanager
+def session_scope(session_id: Optional[str]) -> Iterator[None]:
+    """Record the calls made inside this block for `session_id`, e.g. while a job runs on a worker thread."""
+    reset = _job_session_id.set(session_id)
+    try:
+        yield
+    finally:
+        _job_session_id.reset(reset)
+
+
+def trace_function_call(func: Callable) -> Callable:
+    """Decorator recording a sampled share of the calls of `func` in the trace buffer."""
+    name, module = func.__name__, func.__module__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        rate = _sample_rate
+        if rate <= 0.0 or (rate < 1.0 and random.random() >= rate):
+            return func(*args, **kwargs)
+
+        started_at = time.time()
+        start = time.perf_counter_ns()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            _record(name, module, started_at, start, args, kwargs, status="error", error=f"{type(e).__name__}: {e}"[:200])
+            raise
+        _record(name, module, started_at, start, args, kwargs, status="ok", result=summarize(result))
+        return result
+
+    return wrapper
+
+
+def _record(name: str, module: str, started_at: float, start: int, args: tuple, kwargs: dict, **outcome):
+    duration_ms = (time.perf_counter_ns() - start) / 1e6
+    # deque.append with a maxlen is atomic, so writers need no lock
+    _records.append(TraceRecord(
+        function=name,
+        module=module,
+        started_at=started_at,
+        duration_ms=round(duration_ms, 3),
+        args=tuple(summarize(arg) for arg in args),
+        kwargs={key: summarize(value) for key, value in kwargs.items()},
+        session_id=current_session_id(),
+        **outcome,
+    ))
+
+
+def get_traces(session_id: Optional[str] = None) -> List[TraceRecord]:
+    """Traced calls of a session (all sessions if None), oldest first."""
+    with _records_lock:
+        records = list(_records)
+    if session_id is not None:
+        records = [record for record in records if record.session_id == session_id]
+    return records
+
+
+def clear_traces(session_id: Optional[str] = None):
+    """Drop the traced calls of a session (all sessions if None)."""
+    with _records_lock:
+        if session_id is None:
+            _records.clear()
+            return
+        kept = [record for record in _records if record.session_id != session_id]
+        _records.clear()
+        _records.extend(kept)
+
+
+def get_session_traces() -> List[TraceRecord]:
+    """Traced calls of the current Streamlit session."""
+    return get_traces(current_session_id())
+
+
+def clear_session_traces():
+    """Drop the traced calls of the current Streamlit session, e.g. when a new action starts."""
+    session_id = current_session_id()
+    if session_id is not None:
+        clear_traces(session_id)